@@ -0,0 +1,77 @@
+"""
+Diagnostics API
+Admin-only endpoints for inspecting a running worker
+"""
+
+import asyncio
+import hmac
+import os
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.core.logging import logger
+from app.services.profiler import SamplingProfiler
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Requests must carry ADMIN_API_TOKEN in X-Admin-Token (disabled when unset)"""
+    expected = os.getenv("ADMIN_API_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Diagnostics are disabled (ADMIN_API_TOKEN not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# One profile at a time per worker keeps the overhead bounded
+_profile_lock = asyncio.Lock()
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    request: Request,
+    seconds: float = Query(10.0, gt=0, le=300),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    claim_id: Optional[str] = None
+):
+    """
+    Sample this worker's stacks for `seconds` and return collapsed stacks
+    (flamegraph.pl / speedscope input), each prefixed with the claim and
+    open pipeline spans. With claim_id only that claim's samples are
+    kept and sampling stops early when the claim finishes.
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+
+    async with _profile_lock:
+        results = request.app.state.results
+
+        def claim_finished() -> bool:
+            status = results.status(claim_id)
+            return bool(status) and status["status"] in ("completed", "error", "rejected")
+
+        profiler = SamplingProfiler(
+            interval=interval_ms / 1000,
+            claim_id=claim_id,
+            loop=asyncio.get_running_loop(),
+            loop_thread=threading.get_ident()
+        )
+        logger.info(f"Profiling worker {os.getpid()} for {seconds}s" + (f" (claim {claim_id})" if claim_id else ""))
+        await asyncio.to_thread(profiler.run, seconds, claim_finished if claim_id else None)
+
+    summary = profiler.summary()
+    logger.info(f"Profile finished: {summary}")
+    headers = {f"X-Profile-{key.replace('_', '-').title()}": str(value) for key, value in summary.items()}
+    return PlainTextResponse(profiler.collapsed(), headers=headers)
+
+@router.get("/shadow")
+async def shadow_report(request: Request, limit: int = Query(20, ge=0, le=200)):
+    """
+    Shadow evaluation of the candidate profile: agreement with the
+    baseline and speedup per stage over recent claims, followed by the
+    latest per-claim reports.
+    """
+    shadow = request.app.state.shadow
+    reports = list(shadow.reports)[-limit:][::-1] if limit else []
+    return {**shadow.summary(), "reports": reports}
@@ -4,11 +4,13 @@ Core intelligence for VA claims document analysis
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+import time
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 from datetime import datetime, date
 import re
 import json
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
+from types import SimpleNamespace
 import numpy as np
 from enum import Enum
 
@@ -17,11 +19,21 @@ from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassifica
 from sentence_transformers import SentenceTransformer
 import torch
 from anthropic import AsyncAnthropic
-from sklearn.metrics.pairwise import cosine_similarity
 
 from app.core.logging import logger
 from app.models.claims import ClaimType, EvidenceType, ConfidenceLevel
 from app.services.va_knowledge import VAKnowledgeBase
+from app.services.knowledge_index import KnowledgeIndex
+from app.services.boilerplate import BoilerplateFilter, BoilerplateSession
+from app.services.deduplication import within_claim
+from app.services.evidence_store import DocumentEvidenceRecord, EvidenceStore
+from app.services.degradation import FidelityLevel, FidelityProfile, PROFILES
+from app.services.progress import progress
+from app.services.llm_gateway import LLMGateway
+from app.services.instrumentation import span, timed
+from app.services.artifact_store import (
+    ArtifactStore, paragraph_key, embeddings_table, read_embeddings, entities_table, read_entities
+)
 
 class EvidenceRelevance(Enum):
     """Evidence relevance levels"""
@@ -71,16 +83,33 @@ class ClaimAnalysis:
     presumptive_conditions: List[str]
     confidence_score: float
     processing_time: float
+    processing_report: Dict[str, Any] = field(default_factory=dict)
+    version: int = 1  # Increases with each published refinement
+    provisional: bool = False  # Partial result; a later version will replace it
 
 class AIEngine:
     """Main AI engine for evidence analysis"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        boilerplate_path: Optional[str] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        llm_options: Optional[Dict] = None,
+        knowledge_index_path: Optional[str] = None
+    ):
         self.nlp = None
+        self._nlp_models = {}  # spaCy models by name, loaded on first use
         self.classifier = None
         self.embedder = None
+        self.embedder_name = 'all-MiniLM-L6-v2'
         self.anthropic = None
+        self.llm = None  # All LLM calls go through the gateway, never the raw client
+        self.llm_options = llm_options or {}
+        self.artifacts = artifacts  # Embeddings and entities shared across claims and restarts
         self.knowledge_base = VAKnowledgeBase()
+        self.knowledge_index = KnowledgeIndex.load_or_compile(self.knowledge_base, knowledge_index_path)
+        self.boilerplate = BoilerplateFilter(boilerplate_path)
+        self.partial_interval = 5.0  # Seconds between provisional results during evidence extraction
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
     async def initialize(self):
@@ -90,6 +119,7 @@ class AIEngine:
         # Load spaCy model with custom NER for VA terms
         self.nlp = spacy.load("en_core_web_lg")
         await self._add_va_entities()
+        self._nlp_models["en_core_web_lg"] = self.nlp
         
         # Load classifier for document types
         self.classifier = pipeline(
@@ -99,15 +129,18 @@ class AIEngine:
         )
         
         # Load sentence embedder for semantic search
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedder = SentenceTransformer(self.embedder_name)
         
-        # Initialize Anthropic client
-        self.anthropic = AsyncAnthropic()
+        # Initialize Anthropic client; retries are left to the gateway
+        # (ANTHROPIC_BASE_URL points it at benchmarks.fake_llm_server locally)
+        self.anthropic = AsyncAnthropic(max_retries=0)
+        self.llm = LLMGateway(self.anthropic, **self.llm_options)
         
         logger.info("✅ AI models initialized")
     
-    async def _add_va_entities(self):
+    async def _add_va_entities(self, nlp=None):
         """Add VA-specific entities to NLP model"""
+        nlp = nlp or self.nlp
         # Add custom entity patterns for VA terminology
         patterns = [
             {"label": "CONDITION", "pattern": "PTSD"},
@@ -121,54 +154,190 @@ class AIEngine:
             {"label": "MILITARY_UNIT", "pattern": [{"TEXT": {"REGEX": r"\d{1,3}(st|nd|rd|th)\s+\w+"}}]},
         ]
         
-        ruler = self.nlp.add_pipe("entity_ruler", before="ner")
+        ruler = nlp.add_pipe("entity_ruler", before="ner")
         ruler.add_patterns(patterns)
     
+    async def _get_nlp(self, model_name: str):
+        """spaCy model for a fidelity profile (falls back to the default model)"""
+        if model_name not in self._nlp_models:
+            try:
+                nlp = await asyncio.to_thread(spacy.load, model_name)
+                await self._add_va_entities(nlp)
+            except OSError as e:
+                logger.warning(f"spaCy model {model_name} unavailable, using default: {e}")
+                nlp = self.nlp
+            self._nlp_models[model_name] = nlp
+        return self._nlp_models[model_name]
+    
     async def analyze_claim_evidence(
         self, 
         claim_id: str, 
-        documents: List[Dict]
+        documents: List[Dict],
+        store: Optional[EvidenceStore] = None,
+        removed_documents: Optional[List[str]] = None,
+        fidelity: Optional[FidelityProfile] = None,
+        duplicates: Optional[Dict] = None,
+        on_partial: Optional[Callable[[ClaimAnalysis], Awaitable[None]]] = None
     ) -> ClaimAnalysis:
         """
         Main analysis pipeline for claim evidence
+        
+        With an evidence store, documents already analyzed for this claim
+        are not re-extracted: their stored records are combined with the
+        new documents and only the aggregates are recomputed. Stored
+        records are rescored only for conditions they have not seen.
+        
+        A reduced fidelity profile (chosen under load) trades relevance
+        and NER quality for speed; a later full-fidelity run re-extracts
+        the documents it is given that were analyzed at reduced fidelity.
+        Other reduced records keep contributing evidence and are listed in
+        the incremental report as pending until they are uploaded again.
+        
+        Copies of documents and pages earlier in the same claim are
+        skipped; duplicates is the detector's report for the processing
+        report.
+        
+        With on_partial, a provisional analysis of the evidence extracted
+        so far is passed to it at most every partial_interval seconds
+        while documents are still being extracted.
         """
         start_time = datetime.now()
-        logger.info(f"Analyzing claim {claim_id} with {len(documents)} documents")
+        fidelity = fidelity or PROFILES[FidelityLevel.FULL]
+        logger.info(f"Analyzing claim {claim_id} with {len(documents)} documents ({fidelity.level.value} fidelity)")
+        
+        records = store.load_claim(claim_id) if store else {}
+        incremental = {
+            "documents_reused": 0,
+            "documents_extracted": 0,
+            "documents_rescored": 0,
+            "documents_removed": 0,
+            "reduced_fidelity_pending": []
+        }
         
-        # Extract claimed conditions
-        claimed_conditions = await self._extract_claimed_conditions(documents)
+        # Drop documents the upload replaces by id (names are not unique: many
+        # uploads are "scan.pdf"). At full fidelity, reduced-fidelity records of
+        # documents in this run are re-extracted; the others are kept until they
+        # are uploaded again
+        current_hashes = {doc["content_hash"] for doc in documents}
+        for content_hash, record in list(records.items()):
+            reduced = fidelity.level == FidelityLevel.FULL and record.fidelity != FidelityLevel.FULL.value
+            if record.document_id in (removed_documents or []) or (reduced and content_hash in current_hashes):
+                del records[content_hash]
+                incremental["documents_removed"] += 1
+                if store:
+                    store.delete(claim_id, content_hash)
+            elif reduced:
+                incremental["reduced_fidelity_pending"].append(record.document_id)
+        
+        # Only new content needs claimed conditions and service history read
+        new_documents = [
+            doc for doc in documents
+            if not within_claim(doc.get("duplicate_of"), claim_id) and doc["content_hash"] not in records
+        ]
+        incremental["documents_reused"] = len(records)
+        new_claimed = {}
+        new_service_info = {}
+        for doc in new_documents:
+            new_claimed[doc["content_hash"]] = await self._extract_claimed_conditions([doc])
+            new_service_info[doc["content_hash"]] = await self._extract_service_info([doc])
         
-        # Process each document
-        all_evidence = []
-        for doc in documents:
-            evidence = await self._extract_evidence(doc, claimed_conditions)
-            all_evidence.extend(evidence)
+        # Extract claimed conditions
+        claimed_conditions = sorted(
+            set(c for record in records.values() for c in record.claimed_conditions)
+            | set(c for conditions in new_claimed.values() for c in conditions)
+        )
         
-        # Group evidence by condition
-        conditions = await self._group_evidence_by_condition(all_evidence, claimed_conditions)
+        # Process each new document, skipping paragraphs known to be boilerplate
+        progress.publish("stage", {"stage": "evidence", "documents": len(new_documents), "reused": len(records)})
+        boilerplate = self.boilerplate.session(claimed_conditions)
+        last_partial = time.monotonic()
+        for position, doc in enumerate(new_documents, 1):
+            with span("evidence_extraction", document_id=doc["id"]):
+                record = await self._build_evidence_record(
+                    doc, claimed_conditions, boilerplate, fidelity, claim_id=claim_id
+                )
+            record.claimed_conditions = new_claimed[doc["content_hash"]]
+            record.service_info = new_service_info[doc["content_hash"]]
+            records[record.content_hash] = record
+            incremental["documents_extracted"] += 1
+            progress.publish("evidence", {"document_id": record.document_id, "items": len(record.evidence)})
+            if store:
+                store.put(claim_id, record)
+            
+            partial_due = time.monotonic() - last_partial >= self.partial_interval
+            if on_partial and partial_due and position < len(new_documents):
+                partial = await self._aggregate(claim_id, documents, records, claimed_conditions)
+                partial.provisional = True
+                partial.processing_time = (datetime.now() - start_time).total_seconds()
+                partial.processing_report = {
+                    "stage": "evidence",
+                    "documents_extracted": position,
+                    "documents_to_extract": len(new_documents)
+                }
+                await on_partial(partial)
+                last_partial = time.monotonic()
+        
+        # Learn this claim's paragraphs for future claims
+        self.boilerplate.commit(boilerplate)
+        
+        # A changed claimed-condition set only rescores the conditions that changed
+        for record in records.values():
+            if record.conditions != tuple(claimed_conditions):
+                await self._rescore_record(record, claimed_conditions)
+                incremental["documents_rescored"] += 1
+                if store:
+                    store.put(claim_id, record)
+        
+        progress.publish("stage", {"stage": "aggregation"})
+        analysis = await self._aggregate(claim_id, documents, records, claimed_conditions)
+        analysis.processing_time = (datetime.now() - start_time).total_seconds()
+        
+        # Report work skipped because of duplicate copies and earlier analysis
+        analysis.processing_report = {
+            "deduplication": duplicates or {},
+            "boilerplate": boilerplate.report(),
+            "incremental": incremental,
+            "fidelity": fidelity.to_dict()
+        }
+        return analysis
+    
+    async def _aggregate(
+        self,
+        claim_id: str,
+        documents: List[Dict],
+        records: Dict[str, DocumentEvidenceRecord],
+        claimed_conditions: List[str]
+    ) -> ClaimAnalysis:
+        """Claim-level analysis from the per-document evidence records"""
+        all_evidence = [e for record in records.values() for e in record.evidence]
+        service_info = {}
+        for record in records.values():
+            service_info.update(record.service_info)
         
-        # Build timeline
-        timeline = await self._build_timeline(all_evidence)
+        with span("aggregation"):
+            # Group evidence by condition
+            conditions = await self._group_evidence_by_condition(all_evidence, claimed_conditions)
         
-        # Analyze evidence strength
-        evidence_strength = await self._calculate_evidence_strength(conditions)
+            # Build timeline
+            timeline = await self._build_timeline(all_evidence)
         
-        # Identify missing evidence
-        missing_evidence = await self._identify_missing_evidence(conditions, claimed_conditions)
+            # Analyze evidence strength
+            evidence_strength = await self._calculate_evidence_strength(conditions)
         
-        # Generate recommendations
-        recommendations = await self._generate_recommendations(conditions, missing_evidence)
+            # Identify missing evidence
+            missing_evidence = await self._identify_missing_evidence(conditions, claimed_conditions)
         
-        # Determine needed DBQs
-        dbq_needed = await self._determine_dbqs(conditions)
+            # Generate recommendations
+            recommendations = await self._generate_recommendations(conditions, missing_evidence)
         
-        # Check for presumptive conditions
-        presumptive = await self._check_presumptive_conditions(documents, conditions)
+            # Determine needed DBQs
+            dbq_needed = await self._determine_dbqs(conditions)
         
-        # Calculate overall confidence
-        confidence = await self._calculate_confidence(conditions, evidence_strength)
+            # Check for presumptive conditions
+            presumptive = await self._check_presumptive_conditions(documents, conditions, service_info)
         
-        processing_time = (datetime.now() - start_time).total_seconds()
+            # Calculate overall confidence
+            confidence = await self._calculate_confidence(conditions, evidence_strength)
         
         return ClaimAnalysis(
             claim_id=claim_id,
@@ -181,32 +350,84 @@ class AIEngine:
             dbq_needed=dbq_needed,
             presumptive_conditions=presumptive,
             confidence_score=confidence,
-            processing_time=processing_time
+            processing_time=0.0
+        )
+    
+    async def triage_claim(
+        self,
+        claim_id: str,
+        documents: List[Dict],
+        version: int = 1
+    ) -> ClaimAnalysis:
+        """
+        Quick provisional analysis: claimed conditions, document inventory
+        and presumptive flags, without evidence extraction
+        
+        Works on text-layer-only documents; the evidence-based fields stay
+        empty until the full analysis replaces this result.
+        """
+        start_time = datetime.now()
+        
+        claimed_conditions = await self._extract_claimed_conditions(documents)
+        
+        # No evidence yet: each claimed condition stands alone for the presumptive check
+        conditions = [
+            MedicalCondition(name=name, icd10_codes=[], evidence_items=[], continuity_evidence=[])
+            for name in claimed_conditions
+        ]
+        presumptive = await self._check_presumptive_conditions(documents, conditions)
+        
+        inventory = [
+            {
+                "document_id": doc["id"],
+                "filename": doc.get("filename"),
+                "type": doc.get("type"),
+                "page_count": len(doc.get("pages", [])),
+                "segments": doc.get("segments", []),
+                "needs_ocr": doc.get("needs_ocr", False)
+            }
+            for doc in documents
+        ]
+        
+        return ClaimAnalysis(
+            claim_id=claim_id,
+            claim_type=await self._determine_claim_type(claimed_conditions),
+            conditions=conditions,
+            timeline=[],
+            evidence_strength=0.0,
+            missing_evidence=[],
+            recommendations=[],
+            dbq_needed=await self._determine_dbqs(conditions),
+            presumptive_conditions=presumptive,
+            confidence_score=0.0,
+            processing_time=(datetime.now() - start_time).total_seconds(),
+            processing_report={"stage": "triage", "inventory": inventory},
+            version=version,
+            provisional=True
         )
     
     async def _extract_claimed_conditions(self, documents: List[Dict]) -> List[str]:
         """Extract claimed conditions from 526EZ or similar forms"""
         conditions = []
         
-        for doc in documents:
-            if "21-526" in doc.get("type", "").lower():
-                # Use NLP to extract conditions
-                doc_nlp = self.nlp(doc["text"])
-                
-                for ent in doc_nlp.ents:
-                    if ent.label_ == "CONDITION":
-                        conditions.append(ent.text)
-                
-                # Also use pattern matching for common conditions
-                patterns = [
-                    r"claiming?\s+(?:for\s+)?(.+?)(?:\.|,|;|$)",
-                    r"conditions?\s+claimed:\s*(.+?)(?:\.|$)",
-                    r"disability\s+for\s+(.+?)(?:\.|,|$)"
-                ]
-                
-                for pattern in patterns:
-                    matches = re.findall(pattern, doc["text"], re.IGNORECASE)
-                    conditions.extend(matches)
+        for _, doc_text in self._iter_sub_documents(documents, "21-526"):
+            # Use NLP to extract conditions
+            doc_nlp = self.nlp(doc_text)
+            
+            for ent in doc_nlp.ents:
+                if ent.label_ == "CONDITION":
+                    conditions.append(ent.text)
+            
+            # Also use pattern matching for common conditions
+            patterns = [
+                r"claiming?\s+(?:for\s+)?(.+?)(?:\.|,|;|$)",
+                r"conditions?\s+claimed:\s*(.+?)(?:\.|$)",
+                r"disability\s+for\s+(.+?)(?:\.|,|$)"
+            ]
+            
+            for pattern in patterns:
+                matches = re.findall(pattern, doc_text, re.IGNORECASE)
+                conditions.extend(matches)
         
         # Normalize and deduplicate
         conditions = list(set([c.strip().lower() for c in conditions]))
@@ -214,97 +435,248 @@ class AIEngine:
         logger.info(f"Identified claimed conditions: {conditions}")
         return conditions
     
-    async def _extract_evidence(
+    def _iter_sub_documents(self, documents: List[Dict], type_marker: str):
+        """Yield (document, text) for every sub-document whose type matches"""
+        for doc in documents:
+            content = doc["content"]
+            matched = False
+            for segment in doc.get("segments") or []:
+                if type_marker in segment["type"].lower():
+                    matched = True
+                    pages = range(segment["start_page"], segment["end_page"] + 1)
+                    yield doc, "\n\n".join(content.page(p) for p in pages)
+
+            # Page headers can miss a form the whole-text classifier recognizes
+            if not matched and type_marker in doc.get("type", "").lower():
+                yield doc, content.text
+    
+    async def _build_evidence_record(
         self, 
         document: Dict, 
-        claimed_conditions: List[str]
-    ) -> List[Evidence]:
-        """Extract evidence from a single document"""
-        evidence_items = []
-        doc_text = document["text"]
-        doc_id = document["id"]
-        
-        # Split into paragraphs for analysis
-        paragraphs = doc_text.split("\n\n")
+        claimed_conditions: List[str],
+        boilerplate: Optional[BoilerplateSession] = None,
+        fidelity: Optional[FidelityProfile] = None,
+        claim_id: Optional[str] = None
+    ) -> DocumentEvidenceRecord:
+        """Embed a document's candidate paragraphs and extract its evidence"""
+        fidelity = fidelity or PROFILES[FidelityLevel.FULL]
+        candidates = list(document["content"].iter_paragraphs(min_length=20))
+        keep = []
+        
+        # Pages copied from elsewhere in this claim are analyzed there
+        duplicate_pages = {
+            page["page_number"] for page in document.get("pages", [])
+            if within_claim(page.get("duplicate_of"), claim_id)
+        }
         
-        for page_num, paragraph in enumerate(paragraphs):
-            if len(paragraph.strip()) < 20:
+        # Walk paragraphs page by page so evidence keeps its real page number
+        for i, (page_num, paragraph) in enumerate(candidates):
+            if page_num in duplicate_pages:
                 continue
             
-            # Check relevance to claimed conditions
-            relevance, condition = await self._check_relevance(paragraph, claimed_conditions)
+            # Form instructions, privacy notices, headers: no NLP or embedding
+            if boilerplate and boilerplate.is_boilerplate(paragraph):
+                continue
             
-            if relevance != EvidenceRelevance.NEUTRAL:
-                # Extract structured information
-                nlp_doc = self.nlp(paragraph)
-                
-                # Extract dates
-                dates = self._extract_dates(nlp_doc)
-                
-                # Extract medical providers
-                providers = self._extract_providers(nlp_doc)
-                
-                # Extract diagnosis codes
-                icd_codes = self._extract_icd_codes(paragraph)
-                
-                # Calculate confidence
-                confidence = await self._calculate_evidence_confidence(
-                    paragraph, condition, relevance
-                )
-                
-                # Identify key phrases to highlight
-                highlights = self._identify_highlights(paragraph, condition)
-                
-                evidence_items.append(Evidence(
-                    document_id=doc_id,
-                    page_number=page_num,
-                    text=paragraph[:500],  # Truncate for storage
-                    type=self._determine_evidence_type(document),
-                    relevance=relevance,
-                    confidence=confidence,
-                    condition=condition,
-                    date=dates[0] if dates else None,
-                    provider=providers[0] if providers else None,
-                    diagnosis_codes=icd_codes,
-                    highlights=highlights
-                ))
+            keep.append(i)
         
-        return evidence_items
+        paragraphs = [candidates[i] for i in keep]
+        evidence_types = [self._determine_evidence_type(document, page_num) for page_num, _ in paragraphs]
+        
+        if fidelity.relevance == "embedding":
+            embeddings = self._paragraph_embeddings(document["content_hash"], candidates, keep)
+        else:
+            embeddings = np.zeros((len(paragraphs), 0), dtype=np.float32)
+        
+        record = DocumentEvidenceRecord(
+            document_id=document["id"],
+            content_hash=document["content_hash"],
+            filename=document.get("filename", ""),
+            conditions=(),
+            paragraphs=paragraphs,
+            evidence_types=evidence_types,
+            embeddings=embeddings,
+            fidelity=fidelity.level.value
+        )
+        await self._rescore_record(record, claimed_conditions)
+        return record
     
-    async def _check_relevance(
-        self, 
-        text: str, 
-        claimed_conditions: List[str]
-    ) -> Tuple[EvidenceRelevance, Optional[str]]:
-        """Check if text is relevant to claimed conditions"""
+    def _paragraph_embeddings(
+        self,
+        content_hash: str,
+        candidates: List[Tuple[int, str]],
+        keep: List[int]
+    ) -> np.ndarray:
+        """
+        Embeddings of the kept candidate paragraphs, read from the artifact
+        store where available; only paragraphs never embedded are encoded
+        """
+        if self.artifacts is None:
+            return self._embed([candidates[i][1] for i in keep])
+        
+        name = f"embeddings-{self.embedder_name}"
+        keys = [paragraph_key(paragraph) for _, paragraph in candidates]
+        table = self.artifacts.read(content_hash, name)
+        if table is not None:
+            stored_keys, embeddings, valid = read_embeddings(table)
+            if stored_keys != keys:  # Paragraph splitting changed since it was written
+                table = None
+        if table is None:
+            dim = self.embedder.get_sentence_embedding_dimension()
+            embeddings = np.zeros((len(candidates), dim), dtype=np.float32)
+            valid = np.zeros(len(candidates), dtype=bool)
+        
+        missing = [i for i in keep if not valid[i]]
+        if missing:
+            embeddings, valid = np.array(embeddings), valid.copy()  # Mapped arrays are read-only
+            embeddings[missing] = self._embed([candidates[i][1] for i in missing])
+            valid[missing] = True
+            self.artifacts.write(content_hash, name, embeddings_table(keys, embeddings, valid))
+        
+        # All kept: the mapped rows are used as they are
+        return embeddings if len(keep) == len(candidates) else embeddings[keep]
+    
+    async def _rescore_record(self, record: DocumentEvidenceRecord, claimed_conditions: List[str]):
+        """Score stored paragraphs against conditions not scored yet and rebuild evidence"""
+        added = [c for c in claimed_conditions if c not in record.scores]
+        if added and len(record.paragraphs):
+            if PROFILES[FidelityLevel(record.fidelity)].relevance == "lexical":
+                for condition in added:
+                    record.scores[condition] = self._lexical_scores(record.paragraphs, condition)
+            else:
+                similarities = record.embeddings @ self._embed(added).T
+                for i, condition in enumerate(added):
+                    record.scores[condition] = similarities[:, i]
+        
+        for condition in list(record.scores):
+            if condition not in claimed_conditions:
+                del record.scores[condition]
+        
+        record.conditions = tuple(claimed_conditions)
+        record.evidence = await self._extract_evidence(record)
+    
+    async def _extract_evidence(self, record: DocumentEvidenceRecord) -> List[Evidence]:
+        """Extract evidence from a document's scored paragraphs"""
+        evidence_items = []
+        if not record.conditions or not record.paragraphs:
+            return evidence_items
+        
+        scores = np.stack([record.scores[c] for c in record.conditions], axis=1)
+        best = scores.argmax(axis=1)
+        
+        relevant = []
+        for idx, (_, paragraph) in enumerate(record.paragraphs):
+            relevance = self._relevance_from_score(paragraph, float(scores[idx, best[idx]]))
+            if relevance != EvidenceRelevance.NEUTRAL:
+                relevant.append((idx, record.conditions[best[idx]], relevance))
         
-        # Embed text and conditions
-        text_embedding = self.embedder.encode(text)
+        # Extract structured information (once per paragraph, whatever it is scored against)
+        await self._extract_details(record, [idx for idx, _, _ in relevant if idx not in record.details])
         
-        best_match = None
-        best_score = 0
+        for idx, condition, relevance in relevant:
+            page_num, paragraph = record.paragraphs[idx]
+            details = record.details[idx]
+            
+            # Extract diagnosis codes
+            icd_codes = self._extract_icd_codes(paragraph)
+            
+            # Calculate confidence
+            confidence = await self._calculate_evidence_confidence(
+                paragraph, condition, relevance
+            )
+            
+            # Identify key phrases to highlight
+            highlights = self._identify_highlights(paragraph, condition)
+            
+            evidence_items.append(Evidence(
+                document_id=record.document_id,
+                page_number=page_num,
+                text=paragraph[:500],  # Truncate for storage
+                type=record.evidence_types[idx],
+                relevance=relevance,
+                confidence=confidence,
+                condition=condition,
+                date=details["date"],
+                provider=details["provider"],
+                diagnosis_codes=icd_codes,
+                highlights=highlights
+            ))
         
-        for condition in claimed_conditions:
-            condition_embedding = self.embedder.encode(condition)
-            similarity = cosine_similarity(
-                [text_embedding], 
-                [condition_embedding]
-            )[0][0]
+        return evidence_items
+    
+    async def _extract_details(self, record: DocumentEvidenceRecord, indices: List[int]):
+        """Dates and providers for paragraphs, from stored entities or spaCy"""
+        if not indices:
+            return
+        
+        model = PROFILES[FidelityLevel(record.fidelity)].spacy_model
+        name = f"entities-{model}"
+        table = self.artifacts.read(record.content_hash, name) if self.artifacts else None
+        entities = read_entities(table) if table is not None else {}
+        parsed = 0
+        nlp = None
+        
+        for idx in indices:
+            paragraph = record.paragraphs[idx][1]
+            key = paragraph_key(paragraph)
+            if key not in entities:
+                nlp = nlp or await self._get_nlp(model)
+                with span("ner"):
+                    entities[key] = [(ent.label_, ent.text) for ent in nlp(paragraph).ents]
+                parsed += 1
+            
+            nlp_doc = SimpleNamespace(ents=[SimpleNamespace(label_=label, text=text) for label, text in entities[key]])
             
-            if similarity > best_score:
-                best_score = similarity
-                best_match = condition
+            # Extract dates
+            dates = self._extract_dates(nlp_doc)
+            
+            # Extract medical providers
+            providers = self._extract_providers(nlp_doc)
+            
+            record.details[idx] = {
+                "date": dates[0] if dates else None,
+                "provider": providers[0] if providers else None
+            }
         
-        # Determine relevance level
-        if best_score > 0.7:
+        if parsed and self.artifacts:
+            self.artifacts.write(record.content_hash, name, entities_table(entities))
+    
+    @timed("relevance_embedding")
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Normalized embeddings, so a dot product is the cosine similarity"""
+        if not texts:
+            return np.zeros((0, self.embedder.get_sentence_embedding_dimension()), dtype=np.float32)
+        return self.embedder.encode(
+            texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)
+    
+    def _lexical_scores(self, paragraphs: List[Tuple[int, str]], condition: str) -> np.ndarray:
+        """
+        Similarity stand-in without embeddings: the share of the condition's
+        words found in each paragraph, scaled so a full match is DIRECT
+        and a half match SUPPORTING
+        """
+        terms = set(re.findall(r"[a-z0-9]+", condition.lower()))
+        if not terms:
+            return np.zeros(len(paragraphs), dtype=np.float32)
+        
+        scores = np.empty(len(paragraphs), dtype=np.float32)
+        for i, (_, paragraph) in enumerate(paragraphs):
+            words = set(re.findall(r"[a-z0-9]+", paragraph.lower()))
+            scores[i] = 0.9 * len(terms & words) / len(terms)
+        return scores
+    
+    def _relevance_from_score(self, text: str, score: float) -> EvidenceRelevance:
+        """Determine relevance level from the best condition similarity"""
+        if score > 0.7:
             # Check for contradictory language
             if any(word in text.lower() for word in ["denied", "no evidence", "not related", "unrelated"]):
-                return EvidenceRelevance.CONTRADICTORY, best_match
-            return EvidenceRelevance.DIRECT, best_match
-        elif best_score > 0.4:
-            return EvidenceRelevance.SUPPORTING, best_match
+                return EvidenceRelevance.CONTRADICTORY
+            return EvidenceRelevance.DIRECT
+        elif score > 0.4:
+            return EvidenceRelevance.SUPPORTING
         else:
-            return EvidenceRelevance.NEUTRAL, None
+            return EvidenceRelevance.NEUTRAL
     
     def _extract_dates(self, doc) -> List[date]:
         """Extract dates from text"""
@@ -381,9 +753,13 @@ class AIEngine:
         
         return highlights
     
-    def _determine_evidence_type(self, document: Dict) -> EvidenceType:
-        """Determine type of evidence document"""
-        doc_type = document.get("type", "").lower()
+    def _determine_evidence_type(self, document: Dict, page_number: Optional[int] = None) -> EvidenceType:
+        """Determine type of evidence document (per page for bundled uploads)"""
+        doc_type = document.get("type", "")
+        pages = document.get("pages", [])
+        if page_number and page_number <= len(pages) and pages[page_number - 1].get("type"):
+            doc_type = pages[page_number - 1]["type"]
+        doc_type = doc_type.lower()
         
         if "dd-214" in doc_type:
             return EvidenceType.SERVICE_RECORD
@@ -558,7 +934,7 @@ class AIEngine:
         
         # Check for secondary conditions
         for condition in conditions:
-            secondaries = self.knowledge_base.get_secondary_conditions(condition.name)
+            secondaries = self.knowledge_index.secondary_conditions(condition.name, condition.icd10_codes)
             if secondaries:
                 recommendations.append(f"Consider claiming secondary conditions to {condition.name}: {', '.join(secondaries)}")
         
@@ -570,7 +946,7 @@ class AIEngine:
         
         for condition in conditions:
             # Map conditions to appropriate DBQs
-            dbq = self.knowledge_base.get_dbq_for_condition(condition.name)
+            dbq = self.knowledge_index.dbq_for_condition(condition.name, condition.icd10_codes)
             if dbq and dbq not in dbqs:
                 dbqs.append(dbq)
         
@@ -579,33 +955,32 @@ class AIEngine:
     async def _check_presumptive_conditions(
         self, 
         documents: List[Dict], 
-        conditions: List[MedicalCondition]
+        conditions: List[MedicalCondition],
+        service_info: Optional[Dict] = None
     ) -> List[str]:
         """Check for presumptive conditions based on service history"""
         presumptive = []
         
         # Extract service information
-        service_info = await self._extract_service_info(documents)
+        if service_info is None:
+            service_info = await self._extract_service_info(documents)
         
         # Check Agent Orange presumptives
         if service_info.get("vietnam_service"):
-            ao_conditions = self.knowledge_base.get_agent_orange_conditions()
             for condition in conditions:
-                if condition.name in ao_conditions:
+                if self.knowledge_index.is_presumptive(condition.name, "agent_orange", condition.icd10_codes):
                     presumptive.append(f"{condition.name} (Agent Orange presumptive)")
         
         # Check Gulf War presumptives
         if service_info.get("gulf_war_service"):
-            gw_conditions = self.knowledge_base.get_gulf_war_conditions()
             for condition in conditions:
-                if condition.name in gw_conditions:
+                if self.knowledge_index.is_presumptive(condition.name, "gulf_war", condition.icd10_codes):
                     presumptive.append(f"{condition.name} (Gulf War presumptive)")
         
         # Check PACT Act presumptives
         if service_info.get("burn_pit_exposure"):
-            pact_conditions = self.knowledge_base.get_pact_act_conditions()
             for condition in conditions:
-                if condition.name in pact_conditions:
+                if self.knowledge_index.is_presumptive(condition.name, "pact_act", condition.icd10_codes):
                     presumptive.append(f"{condition.name} (PACT Act presumptive)")
         
         return presumptive
@@ -614,22 +989,22 @@ class AIEngine:
         """Extract military service information"""
         info = {}
         
-        for doc in documents:
-            if "dd-214" in doc.get("type", "").lower():
-                text = doc["text"].lower()
-                
-                # Check for Vietnam service
-                if any(term in text for term in ["vietnam", "republic of vietnam", "rvn"]):
-                    info["vietnam_service"] = True
-                
-                # Check for Gulf War service
-                if any(term in text for term in ["desert storm", "desert shield", "iraq", "kuwait"]):
-                    info["gulf_war_service"] = True
-                
-                # Check for burn pit exposure locations
-                burn_pit_locations = ["iraq", "afghanistan", "djibouti", "syria", "jordan"]
-                if any(loc in text for loc in burn_pit_locations):
-                    info["burn_pit_exposure"] = True
+        # Only DD-214 pages are scanned, not the whole bundle
+        for _, doc_text in self._iter_sub_documents(documents, "dd-214"):
+            text = doc_text.lower()
+            
+            # Check for Vietnam service
+            if any(term in text for term in ["vietnam", "republic of vietnam", "rvn"]):
+                info["vietnam_service"] = True
+            
+            # Check for Gulf War service
+            if any(term in text for term in ["desert storm", "desert shield", "iraq", "kuwait"]):
+                info["gulf_war_service"] = True
+            
+            # Check for burn pit exposure locations
+            burn_pit_locations = ["iraq", "afghanistan", "djibouti", "syria", "jordan"]
+            if any(loc in text for loc in burn_pit_locations):
+                info["burn_pit_exposure"] = True
         
         return info
     
@@ -816,5 +1191,8 @@ class AIEngine:
     async def cleanup(self):
         """Cleanup resources"""
         logger.info("Cleaning up AI engine resources")
+        
+        # Persist boilerplate counts learned since the last save
+        await asyncio.to_thread(self.boilerplate.save)
         # Clear models from memory if needed
         pass
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Archive Ingestion
+Streams claim packet ZIP members into the document pipeline with bounded parallelism
+"""
+
+import asyncio
+import hashlib
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.core.logging import logger
+
+class ArchiveLimitExceeded(ValueError):
+    """Archive rejected as a whole (too many members or too much data)"""
+
+@dataclass
+class ArchiveLimits:
+    """Zip-bomb and size limits, checked against actual decompressed bytes"""
+    max_members: int = 2000
+    max_member_bytes: int = 200 * 1024 * 1024
+    max_total_bytes: int = 2 * 1024 * 1024 * 1024
+    max_compression_ratio: float = 100.0
+
+@dataclass
+class ArchiveMember:
+    """Extracted member, usable wherever an UploadFile is expected"""
+    filename: str
+    content: bytes
+    content_hash: str
+    _position: int = field(default=0, repr=False)
+
+    async def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = self.content[self._position:]
+        else:
+            data = self.content[self._position:self._position + size]
+        self._position += len(data)
+        return data
+
+    async def seek(self, offset: int):
+        self._position = offset
+
+class ArchiveIngestor:
+    """
+    Reads a ZIP claim packet member by member and hands each supported
+    document to the DocumentProcessor as soon as it is extracted, so the
+    first documents are being processed while later members are still
+    being decompressed. Identical members are processed once.
+
+    The archive must be complete and seekable: ZIP's central directory,
+    which lists the members, is at the end of the file, so ingestion
+    cannot overlap with the upload itself.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        supported_formats: List[str],
+        limits: Optional[ArchiveLimits] = None,
+        concurrency: int = 4
+    ):
+        self.supported_formats = supported_formats
+        self.limits = limits or ArchiveLimits()
+        self.concurrency = concurrency
+
+    def iter_members(self, fileobj: BinaryIO, report: Dict) -> Iterator[ArchiveMember]:
+        """Yield supported, unique members, enforcing the limits as bytes are read"""
+        seen_hashes = set()
+        total_bytes = 0
+
+        with zipfile.ZipFile(fileobj) as archive:
+            infos = [info for info in archive.infolist() if not info.is_dir()]
+            if len(infos) > self.limits.max_members:
+                raise ArchiveLimitExceeded(f"Archive has {len(infos)} members (limit {self.limits.max_members})")
+
+            for info in infos:
+                path = PurePosixPath(info.filename)
+                if path.name.startswith(".") or "__MACOSX" in path.parts:
+                    continue
+                if path.suffix.lower() not in self.supported_formats:
+                    report["skipped"].append({"filename": info.filename, "reason": "unsupported format"})
+                    continue
+                if info.file_size > self.limits.max_member_bytes:
+                    report["skipped"].append({"filename": info.filename, "reason": "member too large"})
+                    continue
+
+                content = self._read_member(archive, info, report)
+                if content is None:
+                    continue
+
+                total_bytes += len(content)
+                if total_bytes > self.limits.max_total_bytes:
+                    raise ArchiveLimitExceeded(
+                        f"Archive expands beyond {self.limits.max_total_bytes} bytes"
+                    )
+
+                content_hash = hashlib.sha256(content).hexdigest()
+                if content_hash in seen_hashes:
+                    report["duplicates"].append(info.filename)
+                    continue
+                seen_hashes.add(content_hash)
+
+                # The full member path: "a/scan.pdf" and "b/scan.pdf" are different documents
+                yield ArchiveMember(info.filename, content, content_hash)
+
+        report["bytes_extracted"] = total_bytes
+
+    def _read_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo, report: Dict) -> Optional[bytes]:
+        """Decompress one member, counting real bytes (headers can lie)"""
+        chunks = []
+        size = 0
+        with archive.open(info) as member:
+            while True:
+                chunk = member.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                ratio = size / max(info.compress_size, 1)
+                if size > self.limits.max_member_bytes or ratio > self.limits.max_compression_ratio:
+                    logger.warning(f"Rejecting archive member {info.filename}: exceeds size or ratio limit")
+                    report["skipped"].append({"filename": info.filename, "reason": "size or compression ratio limit"})
+                    return None
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def process(self, fileobj: BinaryIO, doc_processor, fidelity=None) -> Tuple[List[Dict], Dict]:
+        """Extract and process every member; returns documents in archive order and a report"""
+        report = {"documents": 0, "duplicates": [], "skipped": [], "errors": [], "bytes_extracted": 0}
+        members = self.iter_members(fileobj, report)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: Dict[int, Dict] = {}
+        tasks = []
+        aborted: List[BaseException] = []  # Claim-level failures (memory budget) end the whole archive
+
+        async def process_member(index: int, member: ArchiveMember):
+            try:
+                results[index] = await doc_processor.process_document(member, fidelity=fidelity)
+            except Exception as e:
+                logger.error(f"Failed to process archive member {member.filename}: {e}")
+                report["errors"].append({"filename": member.filename, "error": str(e)})
+            except BaseException as e:
+                aborted.append(e)
+                raise
+            finally:
+                semaphore.release()
+
+        index = 0
+        try:
+            while True:
+                # Waiting for a slot first bounds both parallelism and extracted-but-unprocessed bytes
+                await semaphore.acquire()
+                if aborted:
+                    raise aborted[0]
+                member = await asyncio.to_thread(next, members, None)
+                if member is None:
+                    semaphore.release()
+                    break
+                tasks.append(asyncio.create_task(process_member(index, member)))
+                index += 1
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A rejected archive or claim stops the members still running
+            for task in tasks:
+                task.cancel()
+            raise
+
+        documents = [results[i] for i in sorted(results)]
+        report["documents"] = len(documents)
+        logger.info(
+            f"Archive ingested: {len(documents)} documents, {len(report['duplicates'])} duplicates, "
+            f"{len(report['skipped'])} skipped, {len(report['errors'])} errors"
+        )
+        return documents, report
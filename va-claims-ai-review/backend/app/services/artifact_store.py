@@ -0,0 +1,140 @@
+"""
+Document Artifact Store
+Memory-mapped Arrow IPC files of per-document pipeline outputs, keyed by content hash
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from app.core.logging import logger
+
+# Bump an artifact's version when the code producing it changes; old files are ignored
+ARTIFACT_VERSIONS = {
+    "pages": 1,
+    "embeddings": 1,
+    "entities": 1,
+}
+
+def paragraph_key(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+class ArtifactStore:
+    """
+    Per-document artifacts: page text, paragraph embeddings, NER entities.
+
+    Each artifact is an Arrow IPC file at
+    <directory>/<hash[:2]>/<hash>/<name>-v<version>.arrow, written once
+    (atomically) and read through a memory map, so numeric columns such
+    as embeddings are used in place without being copied or parsed.
+    Artifacts depend only on document content and pipeline version, so
+    they are shared across claims and survive restarts.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stats = {"reads": 0, "misses": 0, "writes": 0}
+        self._lock = threading.Lock()
+
+    def path(self, content_hash: str, name: str) -> Path:
+        version = ARTIFACT_VERSIONS[name.split("-", 1)[0]]
+        return self.directory / content_hash[:2] / content_hash / f"{name}-v{version}.arrow"
+
+    def read(self, content_hash: str, name: str) -> Optional[pa.Table]:
+        """Memory-mapped table, or None if the artifact does not exist"""
+        path = self.path(content_hash, name)
+        try:
+            source = pa.memory_map(str(path), "r")
+            table = ipc.open_file(source).read_all()
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except (OSError, pa.ArrowInvalid) as e:
+            logger.warning(f"Discarding unreadable artifact {path}: {e}")
+            self._count("misses")
+            return None
+        self._count("reads")
+        return table
+
+    def write(self, content_hash: str, name: str, table: pa.Table):
+        path = self.path(content_hash, name)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with pa.OSFile(str(tmp_path), "wb") as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+            self._count("writes")
+        except OSError as e:
+            logger.warning(f"Could not write artifact {path}: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+# Pages: text plus per-page extraction metadata; document-level flags in schema metadata
+
+def pages_table(texts: List[str], pages: List[Dict], document_info: Dict) -> pa.Table:
+    table = pa.table({
+        "page_number": pa.array([page["page_number"] for page in pages], pa.int32()),
+        "text": pa.array(texts, pa.large_string()),
+        "info": pa.array([json.dumps(page, default=str) for page in pages], pa.string())
+    })
+    return table.replace_schema_metadata({"document": json.dumps(document_info)})
+
+def read_pages(table: pa.Table) -> Tuple[List[str], List[Dict], Dict]:
+    document_info = json.loads(table.schema.metadata[b"document"])
+    texts = table.column("text").to_pylist()
+    pages = [json.loads(info) for info in table.column("info").to_pylist()]
+    return texts, pages, document_info
+
+# Embeddings: one row per candidate paragraph; rows never embedded are null
+
+def embeddings_table(keys: List[str], embeddings: np.ndarray, valid: np.ndarray) -> pa.Table:
+    dim = embeddings.shape[1]
+    values = pa.array(np.ascontiguousarray(embeddings, dtype=np.float32).reshape(-1), pa.float32())
+    vectors = pa.FixedSizeListArray.from_arrays(values, dim, mask=pa.array(~valid))
+    return pa.table({"paragraph": pa.array(keys, pa.string()), "embedding": vectors})
+
+def read_embeddings(table: pa.Table) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """(paragraph keys, (rows, dim) float32 view of the mapped file, validity mask)"""
+    column = table.column("embedding").combine_chunks()
+    dim = column.type.list_size
+    # Null rows still occupy their slots in the child array, so rows stay aligned
+    values = column.values.to_numpy(zero_copy_only=True)
+    embeddings = values[column.offset * dim:(column.offset + len(column)) * dim].reshape(len(column), dim)
+    valid = column.is_valid().to_numpy(zero_copy_only=False)
+    return table.column("paragraph").to_pylist(), embeddings, valid
+
+# Entities: named entities per paragraph, for the spaCy model named in the artifact
+
+def entities_table(entities: Dict[str, List[Tuple[str, str]]]) -> pa.Table:
+    rows = [(key, label, text) for key, ents in entities.items() for label, text in ents]
+    # Paragraphs without entities are recorded too, so they are not re-parsed
+    rows += [(key, None, None) for key, ents in entities.items() if not ents]
+    return pa.table({
+        "paragraph": pa.array([row[0] for row in rows], pa.string()),
+        "label": pa.array([row[1] for row in rows], pa.string()),
+        "text": pa.array([row[2] for row in rows], pa.string())
+    })
+
+def read_entities(table: pa.Table) -> Dict[str, List[Tuple[str, str]]]:
+    entities: Dict[str, List[Tuple[str, str]]] = {}
+    for key, label, text in zip(*(table.column(name).to_pylist() for name in ("paragraph", "label", "text"))):
+        ents = entities.setdefault(key, [])
+        if label is not None:
+            ents.append((label, text))
+    return entities
@@ -0,0 +1,254 @@
+"""
+Boilerplate Paragraph Filter
+Corpus-level paragraph fingerprint counts learned across processed claims
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.logging import logger
+
+# Paragraphs carrying evidence are never suppressed, however common their
+# wording: ICD-10 codes, dates and clinical readings (blood pressure)
+EVIDENCE_PATTERNS = re.compile(
+    r"\b[A-TV-Z]\d{2}\.\d{1,4}[A-Z]?\b"
+    r"|\b\d{1,2}/\d{1,2}/\d{2,4}\b"
+    r"|\b\d{4}-\d{2}-\d{2}\b"
+    r"|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(?:\d{1,2},?\s+)?\d{4}\b"
+    r"|\b\d{2,3}/\d{2,3}\b",
+    re.IGNORECASE
+)
+
+class BoilerplateSession:
+    """
+    Per-claim view of the table; records which paragraphs the claim
+    contained. Paragraphs naming one of the claim's conditions or carrying
+    an ICD code, date or reading are kept even when their wording is common.
+    """
+
+    def __init__(self, table: "BoilerplateFilter", conditions: Iterable[str] = ()):
+        self.table = table
+        self.conditions = [c.lower() for c in conditions if c]
+        self.fingerprints: Set[str] = set()
+        self.checked = 0
+        self.skipped = 0
+        self.kept_evidence = 0
+
+    def is_boilerplate(self, paragraph: str) -> bool:
+        fingerprint = self.table.fingerprint(paragraph)
+        if fingerprint is None:
+            return False
+
+        self.fingerprints.add(fingerprint)
+        self.checked += 1
+        if self.table.count(fingerprint) < self.table.threshold:
+            return False
+        if self.has_evidence(paragraph):
+            self.kept_evidence += 1
+            return False
+        self.skipped += 1
+        return True
+
+    def has_evidence(self, paragraph: str) -> bool:
+        if EVIDENCE_PATTERNS.search(paragraph):
+            return True
+        lowered = paragraph.lower()
+        return any(condition in lowered for condition in self.conditions)
+
+    def report(self) -> Dict:
+        return {
+            "paragraphs_checked": self.checked,
+            "paragraphs_skipped": self.skipped,
+            "evidence_kept": self.kept_evidence,
+            "threshold": self.table.threshold
+        }
+
+class BoilerplateFilter:
+    """
+    Counts in how many claims each paragraph fingerprint has appeared.
+
+    A paragraph seen in at least ``threshold`` claims (privacy act notices,
+    form instructions, facility headers) is treated as boilerplate. The
+    table is bounded to ``max_entries``: when it overflows, it is cut to
+    ``prune_to`` of that in one batch, keeping the fingerprints with the
+    highest count aged by how many claims ago they were last seen (halved
+    every ``half_life_claims``). New paragraphs therefore survive long
+    enough to be counted, and stale ones make room. The table is persisted
+    as JSON; saving merges this worker's new counts into whatever is on
+    disk, so several workers refine the same table.
+    """
+
+    VERSION = 2
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: int = 25,
+        max_entries: int = 200_000,
+        min_length: int = 40,
+        save_every: int = 20,
+        half_life_claims: int = 2000,
+        prune_to: float = 0.75
+    ):
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.min_length = min_length
+        self.save_every = save_every
+        self.half_life_claims = half_life_claims
+        self.prune_to = prune_to
+        self._counts: Dict[str, int] = {}
+        self._last_seen: Dict[str, int] = {}  # Fingerprint -> claims_observed when last seen
+        self._pending: Dict[str, int] = {}  # Increments not yet written to disk
+        self._claims_observed = 0
+        self._claims_since_save = 0
+        self._saving = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One read/merge/write at a time
+
+        if self.path and self.path.exists():
+            self.load()
+
+    def fingerprint(self, paragraph: str) -> Optional[str]:
+        """Fingerprint of a normalised paragraph (None if too short to judge)"""
+        normalized = re.sub(r"\d", "0", paragraph.lower())
+        normalized = re.sub(r"[^a-z0\s]", "", normalized)
+        normalized = " ".join(normalized.split())
+        if len(normalized) < self.min_length:
+            return None
+        return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+    def count(self, fingerprint: str) -> int:
+        return self._counts.get(fingerprint, 0)
+
+    def is_boilerplate(self, paragraph: str) -> bool:
+        return self.session().is_boilerplate(paragraph)
+
+    def session(self, conditions: Iterable[str] = ()) -> BoilerplateSession:
+        return BoilerplateSession(self, conditions)
+
+    def observe(self, fingerprints: Iterable[str]):
+        """Count one claim's distinct paragraph fingerprints"""
+        with self._lock:
+            self._claims_observed += 1
+            self._claims_since_save += 1
+            for fingerprint in set(fingerprints):
+                self._counts[fingerprint] = self._counts.get(fingerprint, 0) + 1
+                self._pending[fingerprint] = self._pending.get(fingerprint, 0) + 1
+                self._last_seen[fingerprint] = self._claims_observed
+
+            self._prune()
+            save_due = (
+                self.path is not None and self._claims_since_save >= self.save_every and not self._saving
+            )
+            if save_due:
+                self._saving = True
+
+        # Called from the event loop: the read/merge/write happens on a thread
+        if save_due:
+            threading.Thread(target=self._save_in_background, name="boilerplate-save", daemon=True).start()
+
+    def _save_in_background(self):
+        try:
+            self.save()
+        except Exception as e:
+            logger.warning(f"Could not save boilerplate table {self.path}: {e}")
+        finally:
+            with self._lock:
+                self._saving = False
+
+    def commit(self, session: BoilerplateSession):
+        """Fold a finished claim's paragraphs into the table"""
+        self.observe(session.fingerprints)
+
+    def load(self):
+        """Replace the in-memory table with the persisted one"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load boilerplate table {self.path}: {e}")
+            return
+
+        if data.get("version") not in (1, self.VERSION):
+            logger.warning(f"Ignoring boilerplate table {self.path} with unknown version")
+            return
+
+        with self._lock:
+            self._counts = {fp: count + self._pending.get(fp, 0) for fp, count in data["counts"].items()}
+            for fp, count in self._pending.items():
+                self._counts.setdefault(fp, count)
+            claims_on_disk = data.get("claims_observed", 0)
+            self._claims_observed = claims_on_disk + self._claims_since_save
+            # Version 1 tables have no ages: their entries count as seen at the last save
+            last_seen = data.get("last_seen", {})
+            self._last_seen = {
+                fp: max(last_seen.get(fp, claims_on_disk), self._last_seen.get(fp, 0))
+                for fp in self._counts
+            }
+            self._prune()
+
+    def save(self):
+        """Merge pending counts into the table on disk and write it atomically"""
+        if not self.path:
+            return
+
+        with self._save_lock:
+            # Pick up counts written by other workers before adding ours
+            if self.path.exists():
+                self.load()
+
+            with self._lock:
+                data = {
+                    "version": self.VERSION,
+                    "claims_observed": self._claims_observed,
+                    "counts": dict(self._counts),
+                    "last_seen": dict(self._last_seen)
+                }
+                written, self._pending = self._pending, {}
+                claims_written, self._claims_since_save = self._claims_since_save, 0
+
+            # Claims observed during the write stay pending for the next save
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                with self._lock:
+                    for fp, count in written.items():
+                        self._pending[fp] = self._pending.get(fp, 0) + count
+                    self._claims_since_save += claims_written
+                raise
+
+        logger.info(f"Saved boilerplate table ({len(self._counts)} fingerprints) to {self.path}")
+
+    def stats(self) -> Dict:
+        return {
+            "fingerprints": len(self._counts),
+            "boilerplate_fingerprints": sum(1 for c in self._counts.values() if c >= self.threshold),
+            "claims_observed": self._claims_observed
+        }
+
+    def _prune(self):
+        """Cut an overflowing table to prune_to of max_entries, evicting the lowest aged counts"""
+        if len(self._counts) <= self.max_entries:
+            return
+
+        now = self._claims_observed
+
+        def score(fingerprint: str) -> float:
+            age = now - self._last_seen.get(fingerprint, 0)
+            return self._counts[fingerprint] * 0.5 ** (age / self.half_life_claims)
+
+        kept = heapq.nlargest(int(self.max_entries * self.prune_to), self._counts, key=score)
+        self._counts = {fp: self._counts[fp] for fp in kept}
+        self._last_seen = {fp: self._last_seen.get(fp, now) for fp in kept}
+        self._pending = {fp: c for fp, c in self._pending.items() if fp in self._counts}
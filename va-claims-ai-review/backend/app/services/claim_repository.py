@@ -0,0 +1,363 @@
+"""
+Claim Repository
+Async persistence for claims, analyses and evidence on a pooled SQLite backend
+"""
+
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.core.logging import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    id TEXT PRIMARY KEY,
+    claim_number TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    status TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    provisional INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_claims_number ON claims (claim_number);
+CREATE INDEX IF NOT EXISTS idx_claims_status ON claims (status, updated_at);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    claim_id TEXT NOT NULL REFERENCES claims (id),
+    version INTEGER NOT NULL,
+    provisional INTEGER NOT NULL,
+    claim_type TEXT,
+    evidence_strength REAL,
+    confidence_score REAL,
+    summary TEXT NOT NULL,
+    exam_request TEXT,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (claim_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS evidence (
+    claim_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    document_id TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    condition TEXT NOT NULL,
+    type TEXT NOT NULL,
+    relevance TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    date TEXT,
+    provider TEXT,
+    diagnosis_codes TEXT,
+    highlights TEXT,
+    text TEXT NOT NULL,
+    PRIMARY KEY (claim_id, version, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_evidence_condition ON evidence (claim_id, version, condition, confidence DESC);
+CREATE INDEX IF NOT EXISTS idx_evidence_page ON evidence (claim_id, version, document_id, page_number);
+
+CREATE TABLE IF NOT EXISTS timeline (
+    claim_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    event TEXT NOT NULL,
+    type TEXT NOT NULL,
+    condition TEXT,
+    source TEXT,
+    PRIMARY KEY (claim_id, version, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_timeline_date ON timeline (claim_id, version, date);
+
+CREATE TABLE IF NOT EXISTS annotations (
+    claim_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    page INTEGER,
+    title TEXT,
+    start INTEGER,
+    "end" INTEGER,
+    color TEXT,
+    note TEXT,
+    PRIMARY KEY (claim_id, version, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_annotations_page ON annotations (claim_id, version, page);
+"""
+
+def _value(obj: Any) -> Any:
+    return obj.value if isinstance(obj, Enum) else obj
+
+class ConnectionPool:
+    """
+    Fixed set of SQLite connections used from a matching thread pool.
+
+    Each operation borrows a connection, runs on an executor thread and
+    returns it, so the event loop never blocks on disk I/O and at most
+    `size` statements run at once.
+    """
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.size = size
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="claims-db")
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            self._connections.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        # WAL lets readers proceed during a write; NORMAL sync is durable at checkpoints
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    async def run(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        def call():
+            with self.connection() as connection:
+                return operation(connection)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+@contextmanager
+def transaction(connection: sqlite3.Connection):
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+class ClaimRepository:
+    """
+    Claims, published analyses and their evidence, timeline and annotation rows.
+
+    Status updates touch one claims row. Each published analysis version
+    is written in one transaction, with evidence, timeline and annotation
+    rows inserted in batches. Provisional versions keep only their summary
+    row, and only the latest one: row sets are written for final versions.
+    """
+
+    def __init__(self, path: str = "processed/claims.db", pool_size: int = 4, batch_size: int = 500):
+        self.path = path
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.pool: Optional[ConnectionPool] = None
+
+    async def initialize(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.pool = ConnectionPool(self.path, self.pool_size)
+        await self.pool.run(lambda connection: connection.executescript(SCHEMA))
+        logger.info(f"Claim repository ready at {self.path}")
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    async def create_claim(self, claim_number: str, priority: str) -> str:
+        claim_id = str(uuid.uuid4())
+        now = datetime.utcnow().isoformat()
+
+        def insert(connection):
+            connection.execute(
+                "INSERT INTO claims (id, claim_number, priority, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (claim_id, claim_number, priority, "processing", now, now)
+            )
+
+        await self.pool.run(insert)
+        return claim_id
+
+    async def update_status(self, claim_id: str, status: str, error: Optional[str] = None):
+        def update(connection):
+            connection.execute(
+                "UPDATE claims SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, datetime.utcnow().isoformat(), claim_id)
+            )
+
+        await self.pool.run(update)
+
+    async def save_analysis(
+        self,
+        claim_id: str,
+        status: str,
+        analysis,
+        annotations: Optional[Dict] = None,
+        exam_request: Optional[Dict] = None
+    ):
+        """
+        Write the claim's next analysis version and its rows in a single transaction
+
+        The version is allocated in the transaction as the claim's current
+        version + 1, so versions never go backwards or overwrite an earlier
+        analysis, whatever the caller numbered it; analysis.version is set
+        to it. A provisional version replaces the claim's earlier provisional
+        summaries and writes no evidence, timeline or annotation rows, so
+        progressive updates stay cheap. Returns the number of rows written.
+        """
+        now = datetime.utcnow().isoformat()
+        summary = {
+            "conditions": [
+                {"name": c.name, "icd10_codes": c.icd10_codes, "evidence_count": len(c.evidence_items)}
+                for c in analysis.conditions
+            ],
+            "missing_evidence": analysis.missing_evidence,
+            "recommendations": analysis.recommendations,
+            "dbq_needed": analysis.dbq_needed,
+            "presumptive_conditions": analysis.presumptive_conditions,
+            "processing_time": analysis.processing_time,
+            "processing_report": analysis.processing_report
+        }
+
+        # Rows without their (claim_id, version) prefix, added once the version is known
+        final = not analysis.provisional
+        evidence_rows = [] if not final else [
+            (
+                seq, e.document_id, e.page_number, e.condition,
+                _value(e.type), _value(e.relevance), float(e.confidence),
+                e.date.isoformat() if e.date else None, e.provider,
+                json.dumps(e.diagnosis_codes or []), json.dumps(e.highlights or []), e.text
+            )
+            for seq, e in enumerate(e for c in analysis.conditions for e in c.evidence_items)
+        ]
+        timeline_rows = [] if not final else [
+            (seq, t["date"], t["event"], t["type"], t.get("condition"), t.get("source"))
+            for seq, t in enumerate(analysis.timeline)
+        ]
+        annotation_rows = []
+        if annotations and final:
+            for kind in ("tabs", "bookmarks", "highlights"):
+                for item in annotations.get(kind, []):
+                    annotation_rows.append((
+                        len(annotation_rows), kind, item.get("page"),
+                        item.get("title") or item.get("name"), item.get("start"), item.get("end"),
+                        item.get("color"), item.get("note")
+                    ))
+
+        def write(connection):
+            with transaction(connection):
+                current = connection.execute("SELECT version FROM claims WHERE id = ?", (claim_id,)).fetchone()
+                if current is None:
+                    raise KeyError(f"Unknown claim {claim_id}")
+                version = current["version"] + 1
+                prefix = (claim_id, version)
+
+                # Superseded provisional summaries; final versions are kept as history
+                connection.execute(
+                    "DELETE FROM analyses WHERE claim_id = ? AND provisional = 1", (claim_id,)
+                )
+
+                connection.execute(
+                    "INSERT INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        claim_id, version, int(analysis.provisional), _value(analysis.claim_type),
+                        float(analysis.evidence_strength), float(analysis.confidence_score),
+                        json.dumps(summary, default=str),
+                        json.dumps(exam_request, default=str) if exam_request else None, now
+                    )
+                )
+                self._insert_batches(
+                    connection, "INSERT INTO evidence VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [prefix + row for row in evidence_rows]
+                )
+                self._insert_batches(
+                    connection, "INSERT INTO timeline VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [prefix + row for row in timeline_rows]
+                )
+                self._insert_batches(
+                    connection, "INSERT INTO annotations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [prefix + row for row in annotation_rows]
+                )
+                connection.execute(
+                    "UPDATE claims SET status = ?, version = ?, provisional = ?, error = NULL, updated_at = ? WHERE id = ?",
+                    (status, version, int(analysis.provisional), now, claim_id)
+                )
+                return version
+
+        analysis.version = await self.pool.run(write)
+        return len(evidence_rows) + len(timeline_rows) + len(annotation_rows)
+
+    def _insert_batches(self, connection: sqlite3.Connection, sql: str, rows: List[tuple]):
+        for start in range(0, len(rows), self.batch_size):
+            connection.executemany(sql, rows[start:start + self.batch_size])
+
+    async def get_claim(self, claim_id: str) -> Optional[Dict]:
+        def select(connection):
+            row = connection.execute("SELECT * FROM claims WHERE id = ?", (claim_id,)).fetchone()
+            return dict(row) if row else None
+
+        return await self.pool.run(select)
+
+    async def list_claims(self, status: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Most recently updated claims, optionally by status (reviewer queue)"""
+        def select(connection):
+            if status:
+                rows = connection.execute(
+                    "SELECT * FROM claims WHERE status = ? ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+                    (status, limit, offset)
+                )
+            else:
+                rows = connection.execute(
+                    "SELECT * FROM claims ORDER BY updated_at DESC LIMIT ? OFFSET ?", (limit, offset)
+                )
+            return [dict(row) for row in rows]
+
+        return await self.pool.run(select)
+
+    async def list_evidence(
+        self,
+        claim_id: str,
+        condition: Optional[str] = None,
+        document_id: Optional[str] = None,
+        page: Optional[int] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Dict]:
+        """Evidence of the claim's latest final version, strongest first within a condition"""
+        def select(connection):
+            sql = (
+                "SELECT e.* FROM evidence e WHERE e.claim_id = ? AND e.version = "
+                "(SELECT MAX(version) FROM analyses WHERE claim_id = ? AND provisional = 0)"
+            )
+            params: List[Any] = [claim_id, claim_id]
+            if condition is not None:
+                sql += " AND e.condition = ?"
+                params.append(condition)
+            if document_id is not None:
+                sql += " AND e.document_id = ?"
+                params.append(document_id)
+                if page is not None:
+                    sql += " AND e.page_number = ?"
+                    params.append(page)
+            sql += " ORDER BY e.confidence DESC" if condition is not None else " ORDER BY e.seq"
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+            return [dict(row) for row in connection.execute(sql, params)]
+
+        return await self.pool.run(select)
@@ -0,0 +1,269 @@
+"""
+Near-Duplicate Detection
+MinHash/LSH fingerprinting of documents and pages within a claim and
+across a claimant's history
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.core.logging import logger
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+class MinHasher:
+    """MinHash signatures over word shingles"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)
+
+    def tokens(self, text: str) -> List[str]:
+        """Normalised word tokens (case, punctuation and spacing ignored)"""
+        return re.findall(r"[a-z0-9]+", text.lower())
+
+    def shingle_hashes(self, tokens: List[str]) -> np.ndarray:
+        """32-bit hashes of the distinct word k-grams"""
+        k = self.shingle_size
+        shingles = {" ".join(tokens[i:i + k]) for i in range(max(len(tokens) - k + 1, 1))}
+        return np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        """MinHash signature of a token sequence"""
+        hashes = self.shingle_hashes(tokens)
+        # Universal hashing (a*x + b) mod p; uint64 wraparound is intended
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(self._a, hashes) + self._b[:, None]) % MERSENNE_PRIME
+        return np.bitwise_and(permuted, MAX_HASH).min(axis=1)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(sig_a == sig_b))
+
+class LSHIndex:
+    """Banded locality-sensitive hash index over MinHash signatures"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: List[Dict[bytes, List[Any]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Any, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def insert(self, key: Any, signature: np.ndarray):
+        self._signatures[key] = signature
+        for band, bucket in zip(self._band_keys(signature), self._buckets):
+            bucket.setdefault(band, []).append(key)
+
+    def query(self, signature: np.ndarray, threshold: float, prefer: Any = None) -> Optional[Tuple[Any, float]]:
+        """
+        Best indexed key whose estimated similarity reaches the threshold;
+        ties go to keys whose first element is prefer
+        """
+        candidates = set()
+        for band, bucket in zip(self._band_keys(signature), self._buckets):
+            candidates.update(bucket.get(band, ()))
+
+        best, best_rank = None, None
+        for key in candidates:
+            score = MinHasher.similarity(signature, self._signatures[key])
+            rank = (score, prefer is not None and key[0] == prefer)
+            if score >= threshold and (best_rank is None or rank > best_rank):
+                best, best_rank = (key, score), rank
+        return best
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+@dataclass
+class _ClaimantIndex:
+    """Fingerprints of everything seen for one claimant"""
+    documents: LSHIndex
+    pages: LSHIndex
+    content_hashes: Dict[str, Dict]
+    lock: threading.Lock = field(default_factory=threading.Lock)  # One claim at a time per claimant
+
+def within_claim(link: Optional[Dict], claim_id: str) -> bool:
+    """Whether a duplicate_of link points into the same claim, so the copy can be skipped"""
+    return bool(link) and link["claim_id"] == claim_id
+
+class DuplicateDetector:
+    """
+    Marks near-duplicate documents and pages. Duplicates get a
+    ``duplicate_of`` link to the canonical copy, which may live in the
+    current claim or in an earlier claim of the same claimant. Analysis
+    skips only copies within the claim: an earlier claim's evidence is not
+    part of this one, so copies of it are still analyzed.
+
+    Thread-safe: claims run on worker threads, claims of different
+    claimants in parallel and claims of one claimant one after another.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 16,
+        min_page_tokens: int = 25,
+        max_claimants: int = 1000
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.min_page_tokens = min_page_tokens
+        self.max_claimants = max_claimants
+        self.hasher = MinHasher(num_perm=num_perm)
+        self._history: "OrderedDict[str, _ClaimantIndex]" = OrderedDict()
+        self._history_lock = threading.Lock()
+
+    def mark_duplicates(
+        self,
+        claim_id: str,
+        documents: List[Dict],
+        claimant_id: Optional[str] = None
+    ) -> Dict:
+        """Fingerprint a claim's documents, link duplicates and report skipped work"""
+        index = self._index_for(claimant_id)
+        with index.lock:
+            return self._mark_duplicates(index, claim_id, documents)
+
+    def _mark_duplicates(self, index: _ClaimantIndex, claim_id: str, documents: List[Dict]) -> Dict:
+        report = {
+            "documents_total": len(documents),
+            "duplicate_documents": 0,
+            "pages_total": 0,
+            "duplicate_pages": 0,
+            "earlier_claim_copies": 0,
+            "chars_total": 0,
+            "chars_skipped": 0,
+            "links": []
+        }
+
+        for doc in documents:
+            content = doc["content"]
+            report["pages_total"] += content.page_count
+            report["chars_total"] += content.char_count
+
+            canonical = self._find_document(index, doc, claim_id)
+            if canonical:
+                doc["duplicate_of"] = canonical
+                report["links"].append({"document_id": doc["id"], "duplicate_of": canonical})
+                if within_claim(canonical, claim_id):
+                    report["duplicate_documents"] += 1
+                    report["duplicate_pages"] += content.page_count
+                    report["chars_skipped"] += content.char_count
+                    continue
+                # Analyzed again: its pages become canonical for the rest of the claim
+                report["earlier_claim_copies"] += 1
+
+            for page, (page_num, page_text) in zip(doc["pages"], content.iter_pages()):
+                tokens = self.hasher.tokens(page_text)
+                if len(tokens) < self.min_page_tokens:
+                    continue
+
+                signature = self.hasher.signature(tokens)
+                match = index.pages.query(signature, self.threshold, prefer=claim_id)
+                if match:
+                    (canonical_claim, canonical_doc, canonical_page), score = match
+                    page["duplicate_of"] = {
+                        "claim_id": canonical_claim,
+                        "document_id": canonical_doc,
+                        "page_number": canonical_page,
+                        "similarity": round(score, 3)
+                    }
+                    report["links"].append({
+                        "document_id": doc["id"],
+                        "page_number": page_num,
+                        "duplicate_of": page["duplicate_of"]
+                    })
+                    if not within_claim(page["duplicate_of"], claim_id):
+                        report["earlier_claim_copies"] += 1
+                        index.pages.insert((claim_id, doc["id"], page_num), signature)
+                        continue
+                    report["duplicate_pages"] += 1
+                    report["chars_skipped"] += len(page_text)
+                else:
+                    index.pages.insert((claim_id, doc["id"], page_num), signature)
+
+        report["work_skipped_ratio"] = round(
+            report["chars_skipped"] / max(report["chars_total"], 1), 3
+        )
+        logger.info(
+            f"Claim {claim_id}: {report['duplicate_documents']} duplicate documents, "
+            f"{report['duplicate_pages']} duplicate pages ({report['work_skipped_ratio']:.0%} skipped), "
+            f"{report['earlier_claim_copies']} copies from earlier claims"
+        )
+        return report
+
+    def _find_document(self, index: _ClaimantIndex, doc: Dict, claim_id: str) -> Optional[Dict]:
+        """
+        Canonical copy of a document, registering it if it is new. A copy
+        of an earlier claim's document is analyzed again, so it becomes the
+        canonical copy for the rest of this claim.
+        """
+        link = {"claim_id": claim_id, "document_id": doc["id"]}
+
+        # Exact byte-level copies need no fingerprinting
+        canonical = None
+        content_hash = doc.get("content_hash")
+        if content_hash:
+            canonical = index.content_hashes.get(content_hash)
+            if within_claim(canonical, claim_id):
+                return {**canonical, "similarity": 1.0}
+            index.content_hashes[content_hash] = link
+            if canonical:
+                canonical = {**canonical, "similarity": 1.0}
+
+        tokens = self.hasher.tokens(doc["content"].text)
+        if len(tokens) < self.min_page_tokens:
+            return canonical
+
+        signature = self.hasher.signature(tokens)
+        match = None if canonical else index.documents.query(signature, self.threshold, prefer=claim_id)
+        if match:
+            (canonical_claim, canonical_doc), score = match
+            canonical = {"claim_id": canonical_claim, "document_id": canonical_doc, "similarity": round(score, 3)}
+
+        if not within_claim(canonical, claim_id):
+            index.documents.insert((claim_id, doc["id"]), signature)
+        return canonical
+
+    def _index_for(self, claimant_id: Optional[str]) -> _ClaimantIndex:
+        """Claimant history index; claims without a claimant only dedupe internally"""
+        if claimant_id is None:
+            return self._new_index()
+
+        with self._history_lock:
+            if claimant_id in self._history:
+                self._history.move_to_end(claimant_id)
+            else:
+                self._history[claimant_id] = self._new_index()
+                if len(self._history) > self.max_claimants:
+                    self._history.popitem(last=False)
+            return self._history[claimant_id]
+
+    def _new_index(self) -> _ClaimantIndex:
+        return _ClaimantIndex(
+            documents=LSHIndex(self.num_perm, self.bands),
+            pages=LSHIndex(self.num_perm, self.bands),
+            content_hashes={}
+        )
@@ -0,0 +1,138 @@
+"""
+Load-Adaptive Degradation
+Switches new work to cheaper analysis paths while queue wait or stage latency is over SLO
+"""
+
+import threading
+import time
+from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Dict, Optional
+
+from app.core.logging import logger
+
+class FidelityLevel(Enum):
+    """Analysis fidelity, from most to least expensive"""
+    FULL = "full"
+    REDUCED = "reduced"
+    MINIMAL = "minimal"
+
+@dataclass(frozen=True)
+class FidelityProfile:
+    """Pipeline configuration used at a fidelity level"""
+    level: FidelityLevel
+    preprocess: str  # OCR preprocessing tier: "full", "fast" or "grayscale"
+    relevance: str  # "embedding" or "lexical"
+    spacy_model: str
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["level"] = self.level.value
+        return data
+
+PROFILES = {
+    FidelityLevel.FULL: FidelityProfile(FidelityLevel.FULL, "full", "embedding", "en_core_web_lg"),
+    FidelityLevel.REDUCED: FidelityProfile(FidelityLevel.REDUCED, "fast", "embedding", "en_core_web_sm"),
+    FidelityLevel.MINIMAL: FidelityProfile(FidelityLevel.MINIMAL, "grayscale", "lexical", "en_core_web_sm"),
+}
+
+LEVELS = list(FidelityLevel)
+
+class DegradationController:
+    """
+    Picks the fidelity level for new work from smoothed latency signals.
+
+    Queue wait and per-stage latencies are tracked as exponentially
+    weighted moving averages. Stage latency is seconds per page, so a
+    large document on an idle server is not read as load, and every
+    average starts at zero, so no single observation sets it outright.
+    Pressure is the largest ratio of an average
+    to its SLO: above 1.0 the controller steps one level down, below
+    recover_ratio it steps one level back up. Each step must be held for
+    min_dwell_seconds, so a burst does not make the level flap.
+    """
+
+    def __init__(
+        self,
+        queue_wait_slo: float = 30.0,
+        stage_slos: Optional[Dict[str, float]] = None,
+        alpha: float = 0.2,
+        recover_ratio: float = 0.5,
+        min_dwell_seconds: float = 60.0,
+        enabled: bool = True
+    ):
+        self.queue_wait_slo = queue_wait_slo
+        # Seconds per page
+        self.stage_slos = stage_slos if stage_slos is not None else {"document": 3.0, "analysis": 1.0}
+        self.alpha = alpha
+        self.recover_ratio = recover_ratio
+        self.min_dwell_seconds = min_dwell_seconds
+        self.enabled = enabled
+        self._averages: Dict[str, float] = {}
+        self._level = FidelityLevel.FULL
+        self._changed_at = time.monotonic()
+        self._transitions = 0
+        self._lock = threading.Lock()
+
+    def record_queue_wait(self, seconds: float):
+        self._observe("queue_wait", seconds)
+
+    def record_stage(self, stage: str, seconds: float, pages: int = 1):
+        """Wall time of a stage that processed pages pages"""
+        self._observe(stage, seconds / max(pages, 1))
+
+    def current(self) -> FidelityProfile:
+        """Profile to use for work starting now"""
+        with self._lock:
+            return PROFILES[self._level]
+
+    def pressure(self) -> float:
+        with self._lock:
+            return self._pressure()
+
+    def state(self) -> Dict:
+        with self._lock:
+            return {
+                "level": self._level.value,
+                "pressure": round(self._pressure(), 3),
+                "averages": {name: round(value, 3) for name, value in self._averages.items()},
+                "seconds_at_level": round(time.monotonic() - self._changed_at, 1),
+                "transitions": self._transitions
+            }
+
+    def _observe(self, name: str, seconds: float):
+        with self._lock:
+            previous = self._averages.get(name, 0.0)
+            self._averages[name] = self.alpha * seconds + (1 - self.alpha) * previous
+            self._update_level()
+
+    def _pressure(self) -> float:
+        ratios = [self._averages.get("queue_wait", 0.0) / self.queue_wait_slo]
+        for stage, slo in self.stage_slos.items():
+            if stage in self._averages:
+                ratios.append(self._averages[stage] / slo)
+        return max(ratios)
+
+    def _update_level(self):
+        if not self.enabled:
+            return
+
+        now = time.monotonic()
+        if now - self._changed_at < self.min_dwell_seconds:
+            return
+
+        pressure = self._pressure()
+        index = LEVELS.index(self._level)
+        if pressure > 1.0 and index < len(LEVELS) - 1:
+            new_level = LEVELS[index + 1]
+        elif pressure < self.recover_ratio and index > 0:
+            new_level = LEVELS[index - 1]
+        else:
+            return
+
+        logger.warning(
+            f"Analysis fidelity {self._level.value} -> {new_level.value} (pressure {pressure:.2f})"
+        )
+        self._level = new_level
+        self._changed_at = now
+        self._transitions += 1
@@ -6,11 +6,18 @@ Handles OCR, classification, and text extraction from various formats
 import asyncio
 from typing import List, Dict, Any, Optional, BinaryIO
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import hashlib
 import io
 from datetime import datetime
+import math
+import os
 import re
 import json
+import tempfile
+import time
 
 import PyPDF2
 from pdf2image import convert_from_bytes
@@ -18,76 +25,214 @@ import pytesseract
 from PIL import Image
 import numpy as np
 import cv2
-from docx import Document as DocxDocument
 import fitz  # PyMuPDF for better PDF handling
 from pdfplumber import PDF
 
 from app.core.logging import logger
 from app.models.documents import DocumentType, ProcessingStatus
+from app.services.document_text import DocumentText
+from app.services.page_classifier import PageSegmenter, classify_page_header
+from app.services.deduplication import DuplicateDetector
+from app.services.ocr_cache import OCRCache
+from app.services.docx_stream import DocxStreamReader
+from app.services.degradation import FidelityProfile
+from app.services.progress import progress
+from app.services.artifact_store import ArtifactStore, pages_table, read_pages
+from app.services.resource_governor import ResourceGovernor, ThreadBudget
+from app.services.instrumentation import span, exporting, PAGES_PROCESSED, DOCUMENTS_PROCESSED
+
+# Processor used by shard worker processes (one per process)
+_shard_processor: Optional["DocumentProcessor"] = None
+
+def _init_shard_worker(ocr_cache_dir: Optional[str], thread_budget: Optional[ThreadBudget] = None):
+    """Process pool initializer for PDF shard workers"""
+    global _shard_processor
+    if thread_budget is not None:
+        ResourceGovernor(thread_budget).init_ocr_worker()
+    _shard_processor = DocumentProcessor(ocr_cache_dir=ocr_cache_dir, shard_workers=0)
+
+def _extract_pdf_shard(path: str, first_page: int, last_page: int, preprocess: str = "full") -> List[Dict]:
+    """Shard worker: open the PDF from disk and extract pages [first_page, last_page)"""
+    pages = []
+    with fitz.open(path) as pdf:
+        for index in range(first_page, last_page):
+            page_data = _shard_processor._extract_pdf_page(pdf[index], preprocess=preprocess)
+            # Header classification runs here so the parent only merges labels
+            page_data["header_type"], page_data["starts_document"] = classify_page_header(page_data["text"])
+            pages.append(page_data)
+    return pages
 
 class DocumentProcessor:
     """Main document processing pipeline"""
     
-    def __init__(self):
+    def __init__(
+        self, 
+        ocr_cache_dir: Optional[str] = None,
+        shard_page_threshold: int = 200,
+        shard_workers: Optional[int] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        thread_budget: Optional[ThreadBudget] = None
+    ):
         self.supported_formats = ['.pdf', '.docx', '.txt', '.png', '.jpg', '.jpeg', '.tiff']
         self.ocr_config = '--oem 3 --psm 6'  # OCR Engine Mode 3, Page Segmentation Mode 6
-        
-    async def process_document(self, file) -> Dict:
+        self.duplicates = DuplicateDetector()
+        self.ocr_cache_dir = ocr_cache_dir
+        self.ocr_cache = OCRCache(ocr_cache_dir)
+        self.artifacts = artifacts  # Extracted page text shared across claims and restarts
+        self.min_page_text_chars = 50  # Less text than this means the layer is missing
+        self.min_ocr_region_ratio = 0.01  # Smallest image region worth OCRing (of page area)
+        
+        # PDFs with at least shard_page_threshold pages are split into page
+        # ranges and extracted by worker processes (0 workers disables sharding)
+        self.shard_page_threshold = shard_page_threshold
+        self.shard_workers = (os.cpu_count() or 1) if shard_workers is None else shard_workers
+        self.min_shard_pages = 25
+        self.thread_budget = thread_budget  # Thread limits and CPUs for shard workers
+        self._shard_pool: Optional[ProcessPoolExecutor] = None
+        
+    async def process_document(
+        self,
+        file,
+        ocr: bool = True,
+        fidelity: Optional[FidelityProfile] = None
+    ) -> Dict:
         """
         Process a single document through the pipeline
+        
+        With ocr=False only the text layer is read (triage): scanned pages
+        and images come back empty and the document is flagged "needs_ocr".
+        A fidelity profile selects a cheaper OCR preprocessing tier.
         """
+        preprocess = fidelity.preprocess if fidelity else "full"
         logger.info(f"Processing document: {file.filename}")
         
         # Generate document ID
         doc_id = self._generate_doc_id(file.filename)
         
         # Read file content
-        content = await file.read()
+        with span("upload_read"):
+            content = await file.read()
+        content_hash = hashlib.sha256(content).hexdigest()
         
         # Determine file type
         file_extension = Path(file.filename).suffix.lower()
         
-        # Process based on type
-        if file_extension == '.pdf':
-            result = await self._process_pdf(content, doc_id)
-        elif file_extension == '.docx':
-            result = await self._process_docx(content, doc_id)
-        elif file_extension == '.txt':
-            result = await self._process_text(content, doc_id)
-        elif file_extension in ['.png', '.jpg', '.jpeg', '.tiff']:
-            result = await self._process_image(content, doc_id)
+        # Text already extracted from this content (OCR included) is never redone
+        result = self._load_page_artifact(content_hash)
+        if result is not None:
+            if exporting():
+                PAGES_PROCESSED.labels("artifact").inc(len(result["pages"]))
         else:
-            raise ValueError(f"Unsupported file format: {file_extension}")
-        
-        # Classify document type
-        result["type"] = await self._classify_document(result["text"])
+            with span("extraction", format=file_extension):
+                result = await self._extract_content(content, doc_id, file_extension, ocr, preprocess)
+            if exporting():
+                PAGES_PROCESSED.labels("extracted").inc(len(result["pages"]))
+            
+            # Only full-fidelity extractions are kept for reuse; a text-layer
+            # pass that found nothing to OCR is complete, so the deep pass of
+            # a progressive claim reads it back instead of extracting again
+            if (ocr and preprocess == "full") or not result.get("needs_ocr", False):
+                self._save_page_artifact(content_hash, result, ocr)
+        
+        # Label pages and split bundled uploads into sub-documents
+        with span("classification"):
+            segmenter = await self._segment_pages(result)
+            result["segments"] = [segment.to_dict() for segment in segmenter.segments]
+            
+            # Classify document type (whole-text scan only if no page was recognised)
+            result["type"] = segmenter.dominant_type()
+            if result["type"] == DocumentType.OTHER:
+                result["type"] = await self._classify_document(result["content"].text)
         
         # Extract metadata
-        result["metadata"] = await self._extract_metadata(result["text"])
+        with span("metadata_extraction"):
+            result["metadata"] = await self._extract_metadata(result["content"].text)
         
         # Add processing info
         result.update({
             "id": doc_id,
             "filename": file.filename,
             "format": file_extension,
+            "content_hash": content_hash,
             "processed_at": datetime.utcnow().isoformat(),
-            "status": ProcessingStatus.COMPLETED
+            "status": ProcessingStatus.COMPLETED,
+            "ocr_skipped": not ocr,
+            "fidelity": fidelity.level.value if fidelity else "full"
         })
         
+        if exporting():
+            DOCUMENTS_PROCESSED.labels(file_extension).inc()
         logger.info(f"Document processed successfully: {doc_id}")
+        progress.publish("document", {
+            "document_id": doc_id,
+            "filename": file.filename,
+            "type": result["type"],
+            "pages": len(result["pages"]),
+            "ocr_skipped": not ocr
+        })
         return result
     
+    async def _extract_content(
+        self,
+        content: bytes,
+        doc_id: str,
+        file_extension: str,
+        ocr: bool,
+        preprocess: str
+    ) -> Dict:
+        """Extract pages and text based on file type"""
+        if file_extension == '.pdf':
+            return await self._process_pdf(content, doc_id, ocr, preprocess)
+        elif file_extension == '.docx':
+            return await self._process_docx(content, doc_id)
+        elif file_extension == '.txt':
+            return await self._process_text(content, doc_id)
+        elif file_extension in ['.png', '.jpg', '.jpeg', '.tiff']:
+            return await self._process_image(content, doc_id, ocr, preprocess)
+        else:
+            raise ValueError(f"Unsupported file format: {file_extension}")
+    
+    def _load_page_artifact(self, content_hash: str) -> Optional[Dict]:
+        """Rebuild an extraction result from the stored page artifact"""
+        if self.artifacts is None:
+            return None
+        table = self.artifacts.read(content_hash, "pages")
+        if table is None:
+            return None
+        
+        texts, pages, document_info = read_pages(table)
+        return {"pages": pages, "content": DocumentText(texts), **document_info, "from_artifacts": True}
+    
+    def _save_page_artifact(self, content_hash: str, result: Dict, ocr: bool):
+        if self.artifacts is None or any("error" in page for page in result["pages"]):
+            return
+        # Shard header labels are recomputed from the text when the artifact is loaded
+        pages = [
+            {k: v for k, v in page.items() if k not in ("header_type", "starts_document")}
+            for page in result["pages"]
+        ]
+        texts = [text for _, text in result["content"].iter_pages()]
+        # needs_ocr is stored as "OCR still outstanding": a reload of an OCRed
+        # document must not send a progressive claim through triage again
+        document_info = {
+            "has_images": result["has_images"],
+            "needs_ocr": result.get("needs_ocr", False) and not ocr
+        }
+        if "tables" in result:
+            document_info["tables"] = result["tables"]
+        self.artifacts.write(content_hash, "pages", pages_table(texts, pages, document_info))
+    
     def _generate_doc_id(self, filename: str) -> str:
         """Generate unique document ID"""
         timestamp = datetime.utcnow().isoformat()
         hash_input = f"{filename}{timestamp}".encode()
         return hashlib.sha256(hash_input).hexdigest()[:16]
     
-    async def _process_pdf(self, content: bytes, doc_id: str) -> Dict:
+    async def _process_pdf(self, content: bytes, doc_id: str, ocr: bool = True, preprocess: str = "full") -> Dict:
         """Process PDF document"""
         result = {
             "pages": [],
-            "text": "",
+            "content": DocumentText(),
             "has_images": False,
             "needs_ocr": False
         }
@@ -95,34 +240,25 @@ class DocumentProcessor:
         try:
             # Try text extraction first
             with fitz.open(stream=content, filetype="pdf") as pdf:
-                for page_num, page in enumerate(pdf, 1):
-                    # Extract text
-                    page_text = page.get_text()
+                if ocr and self.shard_workers and pdf.page_count >= self.shard_page_threshold:
+                    # Large document: page ranges are extracted in parallel
+                    page_results = await self._extract_pdf_sharded(content, pdf.page_count, preprocess)
+                else:
+                    page_results = (self._extract_pdf_page(page, ocr, preprocess) for page in pdf)
+                
+                for page_num, page_data in enumerate(page_results, 1):
+                    # Store page data (text lives once, in the content buffer)
+                    result["content"].append_page(page_data.pop("text"))
+                    result["pages"].append({"page_number": page_num, **page_data})
                     
-                    # Check if page has meaningful text
-                    if len(page_text.strip()) < 50:
-                        # Page might be scanned, needs OCR
+                    if page_data["ocr_regions"]:
                         result["needs_ocr"] = True
-                        
-                        # Convert page to image for OCR
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x scaling for better OCR
-                        img_data = pix.tobytes("png")
-                        img = Image.open(io.BytesIO(img_data))
-                        
-                        # Preprocess image for OCR
-                        img = await self._preprocess_image_for_ocr(img)
-                        
-                        # Perform OCR
-                        page_text = pytesseract.image_to_string(img, config=self.ocr_config)
-                    
-                    # Store page data
-                    result["pages"].append({
-                        "page_number": page_num,
-                        "text": page_text,
-                        "has_images": len(page.get_images()) > 0
-                    })
-                    
-                    result["text"] += f"\n[Page {page_num}]\n{page_text}\n"
+                        if ocr:
+                            progress.publish("page_ocr", {
+                                "document_id": doc_id,
+                                "page_number": page_num,
+                                "ocr_regions": page_data["ocr_regions"]
+                            })
                 
                 # Check for images
                 if any(p["has_images"] for p in result["pages"]):
@@ -130,16 +266,174 @@ class DocumentProcessor:
         
         except Exception as e:
             logger.error(f"Error processing PDF: {e}")
+            if not ocr:
+                result["needs_ocr"] = True
+                return result
             # Fallback to pure OCR
-            result = await self._process_pdf_with_ocr(content, doc_id)
+            result = await self._process_pdf_with_ocr(content, doc_id, preprocess)
         
         return result
     
-    async def _process_pdf_with_ocr(self, content: bytes, doc_id: str) -> Dict:
+    async def _extract_pdf_sharded(self, content: bytes, page_count: int, preprocess: str = "full") -> List[Dict]:
+        """Extract a large PDF in page-range shards on the worker pool, in page order"""
+        # Workers open the file themselves rather than receiving pickled bytes
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(content)
+            path = tmp.name
+        
+        shard_size = max(self.min_shard_pages, math.ceil(page_count / (self.shard_workers * 2)))
+        ranges = [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+        logger.info(f"Extracting {page_count} pages in {len(ranges)} shards on {self.shard_workers} workers")
+        
+        try:
+            loop = asyncio.get_running_loop()
+            pool = self._get_shard_pool()
+            shards = await asyncio.gather(*[
+                loop.run_in_executor(pool, _extract_pdf_shard, path, first, last, preprocess)
+                for first, last in ranges
+            ], return_exceptions=True)
+            
+            # A failed shard (a crashed worker, a page that breaks extraction)
+            # is redone here page by page; the other shards' pages are kept
+            for index, ((first, last), shard) in enumerate(zip(ranges, shards)):
+                if not isinstance(shard, BaseException):
+                    continue
+                if not isinstance(shard, Exception):
+                    raise shard
+                if isinstance(shard, BrokenProcessPool):
+                    self.close()  # The next document gets a fresh pool
+                logger.warning(f"Shard of pages {first + 1}-{last} failed ({shard!r}); extracting it in process")
+                shards[index] = await asyncio.to_thread(self._extract_pdf_range, path, first, last, preprocess)
+        finally:
+            os.unlink(path)
+        
+        return [page for shard in shards for page in shard]
+    
+    def _extract_pdf_range(self, path: str, first_page: int, last_page: int, preprocess: str = "full") -> List[Dict]:
+        """
+        Extract pages [first_page, last_page) in this process. A page that
+        fails extraction is OCR'd as a whole page; if that fails too it is
+        kept as an error page rather than failing the document.
+        """
+        pages = []
+        with fitz.open(path) as pdf:
+            for index in range(first_page, last_page):
+                page = pdf[index]
+                try:
+                    page_data = self._extract_pdf_page(page, preprocess=preprocess)
+                except Exception as e:
+                    logger.error(f"Extraction failed for page {index + 1}: {e}")
+                    page_data = self._ocr_pdf_page(page, preprocess)
+                pages.append(page_data)
+        return pages
+    
+    def _ocr_pdf_page(self, page, preprocess: str = "full") -> Dict:
+        """Whole-page OCR of one PDF page, for pages whose block extraction failed"""
+        try:
+            with span("rasterize"):
+                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+                img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            text = self._ocr_image(img, preprocess)
+            return {"text": text.strip(), "has_images": True, "ocr_regions": 1, "ocr_pixels": pix.width * pix.height}
+        except Exception as e:
+            logger.error(f"OCR failed for page {page.number + 1}: {e}")
+            return {"text": "[OCR Failed]", "has_images": True, "ocr_regions": 0, "ocr_pixels": 0, "error": str(e)}
+    
+    def _get_shard_pool(self) -> ProcessPoolExecutor:
+        """Lazily start the shard worker pool"""
+        if self._shard_pool is None:
+            # Spawn rather than fork: the parent holds model and BLAS threads
+            self._shard_pool = ProcessPoolExecutor(
+                max_workers=self.shard_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_shard_worker,
+                initargs=(self.ocr_cache_dir, self.thread_budget)
+            )
+        return self._shard_pool
+    
+    def close(self):
+        """Stop worker processes"""
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown(wait=False, cancel_futures=True)
+            self._shard_pool = None
+    
+    def _extract_pdf_page(self, page, ocr: bool = True, preprocess: str = "full") -> Dict:
+        """
+        Extract a PDF page, OCRing only the image regions that have no text layer.
+        
+        Text-layer blocks are kept as they are; each embedded image without
+        text over it is rasterized on its own and OCR'd, and the blocks are
+        merged back in reading order. With ocr=False the regions are only
+        counted.
+        """
+        # (x0, y0, x1, y1, text, block_no, block_type); block_type 0 is text
+        with span("pdf_text"):
+            text_blocks = [
+                (fitz.Rect(block[:4]), block[4])
+                for block in page.get_text("blocks")
+                if block[6] == 0 and block[4].strip()
+            ]
+            image_rects = [fitz.Rect(info["bbox"]) & page.rect for info in page.get_image_info()]
+        
+        ocr_rects = self._find_ocr_regions(page, text_blocks, image_rects)
+        
+        # No text layer and nothing recognisable as an image: OCR the full page
+        text_chars = sum(len(text.strip()) for _, text in text_blocks)
+        if not ocr_rects and text_chars < self.min_page_text_chars:
+            ocr_rects = [page.rect]
+        
+        blocks = list(text_blocks)
+        ocr_pixels = 0
+        for rect in (ocr_rects if ocr else []):
+            with span("rasterize"):
+                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), clip=rect)  # 2x scaling for better OCR
+                img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            ocr_pixels += pix.width * pix.height
+            
+            # Preprocess and OCR (or reuse the text of an identical region)
+            region_text = self._ocr_image(img, preprocess)
+            if region_text.strip():
+                blocks.append((rect, region_text))
+        
+        # Reading order: top to bottom, then left to right
+        blocks.sort(key=lambda block: (round(block[0].y0), block[0].x0))
+        
+        return {
+            "text": "\n".join(text.strip() for _, text in blocks),
+            "has_images": bool(image_rects),
+            "ocr_regions": len(ocr_rects),
+            "ocr_pixels": ocr_pixels
+        }
+    
+    def _find_ocr_regions(self, page, text_blocks: List, image_rects: List) -> List:
+        """Image regions large enough to hold text and not covered by a text layer"""
+        min_area = page.rect.get_area() * self.min_ocr_region_ratio
+        regions = []
+        
+        for rect in sorted(image_rects, key=lambda r: r.get_area(), reverse=True):
+            if rect.is_empty or rect.get_area() < min_area:
+                continue
+            
+            # Skip images already OCR'd into the file (searchable scans) or
+            # contained in a larger region we are rasterizing anyway
+            covered_chars = sum(
+                len(text.strip()) for block_rect, text in text_blocks
+                if (block_rect & rect).get_area() > 0.5 * block_rect.get_area()
+            )
+            if covered_chars >= self.min_page_text_chars:
+                continue
+            if any(region.contains(rect) for region in regions):
+                continue
+            
+            regions.append(rect)
+        
+        return regions
+    
+    async def _process_pdf_with_ocr(self, content: bytes, doc_id: str, preprocess: str = "full") -> Dict:
         """Process PDF using OCR for all pages"""
         result = {
             "pages": [],
-            "text": "",
+            "content": DocumentText(),
             "has_images": True,
             "needs_ocr": True
         }
@@ -148,55 +442,82 @@ class DocumentProcessor:
         images = convert_from_bytes(content, dpi=300)
         
         for page_num, img in enumerate(images, 1):
-            # Preprocess for OCR
-            img = await self._preprocess_image_for_ocr(img)
-            
-            # Perform OCR with error handling
+            # Preprocess and OCR with error handling
             try:
-                page_text = pytesseract.image_to_string(img, config=self.ocr_config)
+                page_text = self._ocr_image(img, preprocess)
                 
                 # Clean OCR output
                 page_text = await self._clean_ocr_text(page_text)
                 
+                result["content"].append_page(page_text)
                 result["pages"].append({
                     "page_number": page_num,
-                    "text": page_text,
                     "ocr_confidence": await self._calculate_ocr_confidence(page_text)
                 })
-                
-                result["text"] += f"\n[Page {page_num}]\n{page_text}\n"
+                progress.publish("page_ocr", {"document_id": doc_id, "page_number": page_num, "ocr_regions": 1})
                 
             except Exception as e:
                 logger.error(f"OCR failed for page {page_num}: {e}")
+                result["content"].append_page("[OCR Failed]")
                 result["pages"].append({
                     "page_number": page_num,
-                    "text": "[OCR Failed]",
                     "error": str(e)
                 })
         
         return result
     
-    async def _preprocess_image_for_ocr(self, image: Image.Image) -> Image.Image:
-        """Preprocess image to improve OCR accuracy"""
+    def _ocr_image(self, image: Image.Image, preprocess: str = "full") -> str:
+        """OCR a page image, skipping preprocessing and Tesseract on a cache hit"""
+        # Cheaper preprocessing gives different text, so it is cached separately
+        variant = self.ocr_config if preprocess == "full" else f"{self.ocr_config}|{preprocess}"
+        fingerprint = self.ocr_cache.fingerprint(image)
+        cached = self.ocr_cache.get(fingerprint, variant)
+        if cached is not None:
+            return cached
+        
+        started = time.perf_counter()
+        image = self._preprocess_image_for_ocr(image, preprocess)
+        with span("ocr"):
+            text = pytesseract.image_to_string(image, config=self.ocr_config)
+        self.ocr_cache.put(fingerprint, text, time.perf_counter() - started, variant)
+        return text
+    
+    def _preprocess_image_for_ocr(self, image: Image.Image, tier: str = "full") -> Image.Image:
+        """
+        Preprocess image to improve OCR accuracy
+        
+        Tiers: "full" thresholds, denoises and deskews; "fast" skips the
+        (slow) denoising; "grayscale" only converts to grayscale.
+        """
         # Convert PIL to OpenCV
         img_array = np.array(image)
         
         # Convert to grayscale
-        if len(img_array.shape) == 3:
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = img_array
+        with span("preprocess_grayscale"):
+            if len(img_array.shape) == 3:
+                gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+            else:
+                gray = img_array
+        
+        if tier == "grayscale":
+            return Image.fromarray(gray)
         
         # Apply thresholding to get black and white image
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        with span("preprocess_threshold"):
+            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
         # Denoise
-        denoised = cv2.fastNlMeansDenoising(thresh, h=30)
+        if tier == "full":
+            with span("preprocess_denoise"):
+                denoised = cv2.fastNlMeansDenoising(thresh, h=30)
+        else:
+            denoised = thresh
         
         # Deskew
-        angle = self._get_skew_angle(denoised)
-        if abs(angle) > 0.5:
-            denoised = self._rotate_image(denoised, angle)
+        with span("preprocess_deskew"):
+            angle = self._get_skew_angle(denoised)
+            if abs(angle) > 0.5:
+                denoised = self._rotate_image(denoised, angle)
         
         # Convert back to PIL
         return Image.fromarray(denoised)
@@ -278,88 +599,111 @@ class DocumentProcessor:
         """Process Word document"""
         result = {
             "pages": [],
-            "text": "",
+            "content": DocumentText(),
             "has_images": False,
             "tables": []
         }
         
-        doc = DocxDocument(io.BytesIO(content))
-        
-        # Extract text from paragraphs
-        full_text = []
-        for paragraph in doc.paragraphs:
-            full_text.append(paragraph.text)
-        
-        result["text"] = "\n".join(full_text)
-        
-        # Extract tables
-        for table_num, table in enumerate(doc.tables, 1):
-            table_data = []
-            for row in table.rows:
-                row_data = [cell.text for cell in row.cells]
-                table_data.append(row_data)
-            result["tables"].append({
-                "table_number": table_num,
-                "data": table_data
-            })
-        
-        # Check for images
-        if doc.inline_shapes:
-            result["has_images"] = True
-        
-        # Simulate pages (Word doesn't have explicit pages)
-        # Split text into chunks of ~3000 characters per "page"
-        page_size = 3000
-        text_chunks = [result["text"][i:i+page_size] 
-                      for i in range(0, len(result["text"]), page_size)]
-        
-        for page_num, chunk in enumerate(text_chunks, 1):
-            result["pages"].append({
-                "page_number": page_num,
-                "text": chunk
-            })
+        # Stream the body; rows and paragraphs are never held as objects
+        with DocxStreamReader(io.BytesIO(content)) as reader:
+            result["has_images"] = reader.has_images()
+            
+            # Pages follow Word's page breaks; documents without any are
+            # grouped into ~3000 character pages of whole paragraphs
+            page_size = 3000
+            page_lines = []
+            page_length = 0
+            saw_page_break = False
+            
+            for block in reader.iter_blocks():
+                if block.kind == "page_break":
+                    saw_page_break = True
+                    self._append_docx_page(result, page_lines)
+                    page_lines, page_length = [], 0
+                elif block.kind == "paragraph":
+                    if not saw_page_break and page_lines and page_length + len(block.text) > page_size:
+                        self._append_docx_page(result, page_lines)
+                        page_lines, page_length = [], 0
+                    page_lines.append(block.text)
+                    page_length += len(block.text) + 1
+                elif block.kind == "row":
+                    if not result["tables"] or result["tables"][-1]["table_number"] != block.table_number:
+                        result["tables"].append({
+                            "table_number": block.table_number,
+                            "data": []
+                        })
+                    result["tables"][-1]["data"].append(block.cells)
+        
+        if page_lines or not result["pages"]:
+            self._append_docx_page(result, page_lines)
         
         return result
     
+    def _append_docx_page(self, result: Dict, lines: List[str]):
+        """Append a simulated DOCX page built from whole paragraphs"""
+        page_num = result["content"].append_page("\n".join(lines))
+        result["pages"].append({
+            "page_number": page_num
+        })
+    
     async def _process_text(self, content: bytes, doc_id: str) -> Dict:
         """Process plain text document"""
         text = content.decode('utf-8', errors='ignore')
         
         result = {
             "pages": [{
-                "page_number": 1,
-                "text": text
+                "page_number": 1
             }],
-            "text": text,
+            "content": DocumentText([text]),
             "has_images": False
         }
         
         return result
     
-    async def _process_image(self, content: bytes, doc_id: str) -> Dict:
+    async def _process_image(self, content: bytes, doc_id: str, ocr: bool = True, preprocess: str = "full") -> Dict:
         """Process image file"""
-        img = Image.open(io.BytesIO(content))
+        if not ocr:
+            return {
+                "pages": [{"page_number": 1}],
+                "content": DocumentText([""]),
+                "has_images": True,
+                "needs_ocr": True
+            }
         
-        # Preprocess for OCR
-        img = await self._preprocess_image_for_ocr(img)
+        img = Image.open(io.BytesIO(content))
         
-        # Perform OCR
-        text = pytesseract.image_to_string(img, config=self.ocr_config)
+        # Preprocess and OCR
+        text = self._ocr_image(img, preprocess)
         text = await self._clean_ocr_text(text)
         
         result = {
             "pages": [{
                 "page_number": 1,
-                "text": text,
                 "ocr_confidence": await self._calculate_ocr_confidence(text)
             }],
-            "text": text,
+            "content": DocumentText([text]),
             "has_images": True,
             "needs_ocr": True
         }
         
         return result
     
+    async def _segment_pages(self, result: Dict) -> PageSegmenter:
+        """Classify each page from its header and merge runs into sub-documents"""
+        segmenter = PageSegmenter()
+        
+        for page, (page_num, page_text) in zip(result["pages"], result["content"].iter_pages()):
+            if "header_type" in page:
+                # Header already classified by a shard worker
+                label = segmenter.feed_label(
+                    page_num, page.pop("header_type"), page.pop("starts_document"), page_text
+                )
+            else:
+                label = segmenter.feed(page_num, page_text)
+            page["type"] = label.type
+        
+        return segmenter
+    
     async def _classify_document(self, text: str) -> str:
         """Classify document type based on content"""
         text_lower = text.lower()
@@ -447,6 +791,16 @@ class DocumentProcessor:
         
         return list(set(found_terms))
     
+    async def find_duplicates(
+        self, 
+        claim_id: str, 
+        documents: List[Dict], 
+        claimant_id: Optional[str] = None
+    ) -> Dict:
+        """Link near-duplicate documents and pages to their canonical copies"""
+        # MinHash signatures of every page are CPU work: keep them off the event loop
+        return await asyncio.to_thread(self.duplicates.mark_duplicates, claim_id, documents, claimant_id)
+    
     async def batch_process(self, files: List) -> List[Dict]:
         """Process multiple documents in parallel"""
         tasks = [self.process_document(file) for file in files]
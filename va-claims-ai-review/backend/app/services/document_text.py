@@ -0,0 +1,102 @@
+"""
+Document Text Container
+Single-buffer page text storage with a page offset table
+"""
+
+from bisect import bisect_right
+from typing import List, Iterator, Optional, Tuple
+
+class DocumentText:
+    """
+    Page-addressable document text.
+
+    Pages are appended while a document is being extracted and held once.
+    The first time the full text is requested the pages are joined into a
+    single buffer (one linear pass) and the per-page strings are released;
+    from then on page access is a slice of that buffer located through the
+    offset table.
+    """
+
+    PAGE_SEPARATOR = "\n\n"
+
+    def __init__(self, pages: Optional[List[str]] = None):
+        self._pending: List[str] = []
+        self._starts: List[int] = []  # Page start offsets within the full text
+        self._ends: List[int] = []  # Page end offsets within the full text
+        self._buffer: Optional[str] = None
+
+        for page_text in pages or []:
+            self.append_page(page_text)
+
+    def append_page(self, text: str) -> int:
+        """Append a page and return its 1-based page number"""
+        if self._buffer is not None:
+            # Re-open the buffer; only happens if pages arrive after a full-text read
+            self._pending = [self._slice(i) for i in range(self.page_count)]
+            self._buffer = None
+
+        start = self._ends[-1] + len(self.PAGE_SEPARATOR) if self._ends else 0
+        self._starts.append(start)
+        self._ends.append(start + len(text))
+        self._pending.append(text)
+        return self.page_count
+
+    @property
+    def page_count(self) -> int:
+        return len(self._starts)
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    @property
+    def char_count(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    @property
+    def text(self) -> str:
+        """Full document text (pages joined by PAGE_SEPARATOR)"""
+        if self._buffer is None:
+            self._buffer = self.PAGE_SEPARATOR.join(self._pending)
+            self._pending = []
+        return self._buffer
+
+    def page(self, page_number: int) -> str:
+        """Text of a single page (1-based)"""
+        index = self._index(page_number)
+        if self._buffer is None:
+            return self._pending[index]
+        return self._slice(index)
+
+    def page_span(self, page_number: int) -> Tuple[int, int]:
+        """Start and end offsets of a page within the full text"""
+        index = self._index(page_number)
+        return self._starts[index], self._ends[index]
+
+    def page_at(self, offset: int) -> int:
+        """Page number containing a full-text offset"""
+        if not self._starts:
+            raise IndexError("Document has no pages")
+        return max(bisect_right(self._starts, offset), 1)
+
+    def iter_pages(self) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) for every page"""
+        for page_number in range(1, self.page_count + 1):
+            yield page_number, self.page(page_number)
+
+    def iter_paragraphs(self, min_length: int = 0) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, paragraph) pairs without building the full text"""
+        for page_number, page_text in self.iter_pages():
+            for paragraph in page_text.split("\n\n"):
+                if len(paragraph.strip()) >= min_length:
+                    yield page_number, paragraph
+
+    def _index(self, page_number: int) -> int:
+        if not 1 <= page_number <= self.page_count:
+            raise IndexError(f"Page {page_number} out of range (1-{self.page_count})")
+        return page_number - 1
+
+    def _slice(self, index: int) -> str:
+        return self._buffer[self._starts[index]:self._ends[index]]
+
+    def __repr__(self) -> str:
+        return f"DocumentText(pages={self.page_count}, chars={self.char_count})"
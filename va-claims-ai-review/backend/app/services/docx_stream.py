@@ -0,0 +1,129 @@
+"""
+Streaming DOCX Reader
+Iter-parses word/document.xml from the zip without building an object model
+"""
+
+import zipfile
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, List, Optional
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+IMAGE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+DOCUMENT_PART = "word/document.xml"
+DOCUMENT_RELS_PART = "word/_rels/document.xml.rels"
+
+@dataclass
+class DocxBlock:
+    """One body-level item, in document order"""
+    kind: str  # "paragraph", "row" or "page_break"
+    text: str = ""
+    table_number: Optional[int] = None
+    cells: List[str] = field(default_factory=list)
+
+class DocxStreamReader:
+    """
+    Streams paragraphs, table rows and explicit page breaks out of a DOCX file.
+
+    Elements are discarded as soon as they have been yielded, so memory
+    stays flat no matter how many table rows the document has. Paragraphs
+    inside tables are folded into their cell text, matching python-docx.
+    """
+
+    def __init__(self, source: BinaryIO):
+        self._zip = zipfile.ZipFile(source)
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def has_images(self) -> bool:
+        """Whether the document references any image part (images are not read)"""
+        try:
+            with self._zip.open(DOCUMENT_RELS_PART) as rels:
+                for _, elem in ET.iterparse(rels):
+                    if elem.tag == f"{REL_NS}Relationship" and elem.get("Type") == IMAGE_REL_TYPE:
+                        return True
+        except KeyError:
+            pass
+        return False
+
+    def iter_blocks(self) -> Iterator[DocxBlock]:
+        table_depth = 0
+        table_count = 0
+        paragraph: List[str] = []
+        page_break_before = False
+        page_break_after = False
+        row: List[str] = []
+        cell: List[str] = []
+        cell_span = 1
+        body = None
+
+        with self._zip.open(DOCUMENT_PART) as document:
+            for event, elem in ET.iterparse(document, events=("start", "end")):
+                tag = elem.tag
+
+                if event == "start":
+                    if tag == f"{W_NS}body":
+                        body = elem
+                    elif tag == f"{W_NS}tbl":
+                        table_depth += 1
+                        if table_depth == 1:
+                            table_count += 1
+                    elif tag == f"{W_NS}p":
+                        paragraph = []
+                        page_break_before = page_break_after = False
+                    elif tag == f"{W_NS}tc" and table_depth == 1:
+                        cell, cell_span = [], 1
+                    continue
+
+                if tag == f"{W_NS}t":
+                    paragraph.append(elem.text or "")
+                elif tag == f"{W_NS}tab":
+                    paragraph.append("\t")
+                elif tag == f"{W_NS}br":
+                    # Only explicit breaks count: Word also writes a
+                    # lastRenderedPageBreak after each one (and wherever its
+                    # layout last wrapped), which would add empty pages
+                    if elem.get(f"{W_NS}type") == "page":
+                        # A break before any text moves the whole paragraph to the next page
+                        if "".join(paragraph).strip():
+                            page_break_after = True
+                        else:
+                            page_break_before = True
+                    elif elem.get(f"{W_NS}type") in (None, "textWrapping"):
+                        paragraph.append("\n")
+                elif tag == f"{W_NS}gridSpan" and table_depth == 1:
+                    cell_span = int(elem.get(f"{W_NS}val", "1"))
+                elif tag == f"{W_NS}p":
+                    text = "".join(paragraph)
+                    if table_depth:
+                        cell.append(text)
+                    else:
+                        if page_break_before:
+                            yield DocxBlock("page_break")
+                        yield DocxBlock("paragraph", text=text)
+                        if page_break_after:
+                            yield DocxBlock("page_break")
+                    elem.clear()
+                elif tag == f"{W_NS}tc" and table_depth == 1:
+                    # Merged cells repeat their text across the span, like python-docx
+                    row.extend(["\n".join(cell)] * cell_span)
+                elif tag == f"{W_NS}tr" and table_depth == 1:
+                    yield DocxBlock("row", table_number=table_count, cells=row)
+                    row = []
+                    elem.clear()
+                elif tag == f"{W_NS}tbl":
+                    table_depth -= 1
+                    elem.clear()
+
+                # Drop finished body-level elements so the tree never grows
+                if body is not None and table_depth == 0 and tag in (f"{W_NS}p", f"{W_NS}tbl", f"{W_NS}sectPr"):
+                    body.clear()
@@ -0,0 +1,130 @@
+"""
+Evidence Store
+Per-document evidence extraction results persisted for incremental re-analysis
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from app.core.logging import logger
+
+if TYPE_CHECKING:
+    from app.services.ai_engine import Evidence
+
+@dataclass
+class DocumentEvidenceRecord:
+    """
+    Everything evidence extraction learned about one document.
+
+    Paragraph embeddings and per-condition similarity scores are kept so a
+    change in the claimed-condition set only needs the new conditions
+    scored; NER output is cached per paragraph so it runs at most once.
+    """
+    document_id: str
+    content_hash: str
+    conditions: Tuple[str, ...]  # Claimed conditions the scores cover
+    paragraphs: List[Tuple[int, str]]  # (page_number, paragraph) candidates
+    evidence_types: List[Any]  # EvidenceType per paragraph
+    embeddings: np.ndarray  # (paragraphs, dim) normalized float32
+    scores: Dict[str, np.ndarray] = field(default_factory=dict)  # condition -> similarity per paragraph
+    details: Dict[int, Dict] = field(default_factory=dict)  # paragraph index -> NER-derived fields
+    claimed_conditions: List[str] = field(default_factory=list)  # Conditions claimed in this document
+    service_info: Dict[str, bool] = field(default_factory=dict)  # Service flags found in this document
+    evidence: List["Evidence"] = field(default_factory=list)
+    fidelity: str = "full"  # FidelityLevel value the record was extracted at
+    filename: str = ""  # Upload name (archive members: path inside the archive)
+
+class EvidenceStore:
+    """
+    Evidence records keyed by claim and document content hash.
+
+    Records are pickled to <directory>/<claim_id>/<content_hash>.pkl when
+    a directory is configured; the most recently used max_claims claims
+    are also kept in memory. Without a directory the memory cache is the
+    store, and a claim evicted from it is analyzed from scratch next time.
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory: Optional[str] = None, max_claims: int = 64):
+        self.directory = Path(directory) if directory else None
+        self.max_claims = max_claims
+        self._claims: "OrderedDict[str, Dict[str, DocumentEvidenceRecord]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load_claim(self, claim_id: str) -> Dict[str, DocumentEvidenceRecord]:
+        """All stored records for a claim, by content hash"""
+        with self._lock:
+            if claim_id in self._claims:
+                self._claims.move_to_end(claim_id)
+                return dict(self._claims[claim_id])
+
+        records = {}
+        claim_dir = self._claim_dir(claim_id)
+        if claim_dir is not None and claim_dir.exists():
+            for path in claim_dir.glob("*.pkl"):
+                record = self._read(path)
+                if record is not None:
+                    records[record.content_hash] = record
+
+        with self._lock:
+            self._cache(claim_id)[claim_id] = records
+        return dict(records)
+
+    def put(self, claim_id: str, record: DocumentEvidenceRecord):
+        with self._lock:
+            # A claim evicted from memory is re-read from disk in full, never cached partially
+            if claim_id in self._claims:
+                self._cache(claim_id)[claim_id][record.content_hash] = record
+            elif self.directory is None:
+                self._cache(claim_id)[claim_id] = {record.content_hash: record}
+
+        claim_dir = self._claim_dir(claim_id)
+        if claim_dir is not None:
+            claim_dir.mkdir(parents=True, exist_ok=True)
+            path = claim_dir / f"{record.content_hash}.pkl"
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump((self.VERSION, record), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+
+    def delete(self, claim_id: str, content_hash: str):
+        with self._lock:
+            self._claims.get(claim_id, {}).pop(content_hash, None)
+
+        claim_dir = self._claim_dir(claim_id)
+        if claim_dir is not None:
+            (claim_dir / f"{content_hash}.pkl").unlink(missing_ok=True)
+
+    def _cache(self, claim_id: str) -> "OrderedDict[str, Dict[str, DocumentEvidenceRecord]]":
+        """The memory cache with room for claim_id (lock held)"""
+        if claim_id in self._claims:
+            self._claims.move_to_end(claim_id)
+        else:
+            while len(self._claims) >= self.max_claims:
+                self._claims.popitem(last=False)
+        return self._claims
+
+    def _claim_dir(self, claim_id: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / Path(claim_id).name  # claim ids never contain path parts
+
+    def _read(self, path: Path) -> Optional[DocumentEvidenceRecord]:
+        try:
+            with open(path, "rb") as f:
+                version, record = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError) as e:
+            logger.warning(f"Discarding unreadable evidence record {path}: {e}")
+            return None
+
+        if version != self.VERSION:
+            return None
+        return record
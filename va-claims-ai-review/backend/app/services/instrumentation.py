@@ -0,0 +1,145 @@
+"""
+Pipeline Instrumentation
+Stage spans, Prometheus histograms / counters and optional OpenTelemetry traces
+"""
+
+import functools
+import inspect
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+)
+
+from app.services.memory_accounting import current_tracker
+from app.services.profiler import spans as profiler_spans
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # Optional: spans are still timed into the histograms
+    otel_trace = None
+
+_tracer = otel_trace.get_tracer("va-claims-ai-review") if otel_trace else None
+
+# Sub-millisecond steps (cache lookups) up to whole-claim analysis
+_STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "claim_stage_seconds", "Time spent in a pipeline stage", ["stage"], buckets=_STAGE_BUCKETS
+)
+STAGE_ERRORS = Counter(
+    "claim_stage_errors_total", "Pipeline stages that raised", ["stage"]
+)
+PAGES_PROCESSED = Counter(
+    "claim_pages_processed_total", "Pages extracted, by how their text was obtained", ["source"]
+)
+DOCUMENTS_PROCESSED = Counter(
+    "claim_documents_processed_total", "Documents processed", ["format"]
+)
+CLAIMS_PROCESSED = Counter(
+    "claims_processed_total", "Claims finished, by final status", ["status"]
+)
+# livesum: with several worker processes the exported value is the sum over live processes
+QUEUE_DEPTH = Gauge(
+    "claim_queue_depth", "Claims waiting to start or running", ["state"], multiprocess_mode="livesum"
+)
+
+class _StageTimes:
+    def __init__(self, export: bool):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.export = export
+
+# Set by collect_stage_times() for the code running in its context
+_stage_times: ContextVar[Optional[_StageTimes]] = ContextVar("stage_times", default=None)
+
+@contextmanager
+def collect_stage_times(export: bool = True):
+    """
+    Yield a dict that sums the seconds of every span opened in this
+    context, by stage. With export=False those spans (and the page and
+    document counters) stay out of the Prometheus metrics, for work that
+    is not serving a request, such as shadow evaluation runs.
+    """
+    collector = _StageTimes(export)
+    token = _stage_times.set(collector)
+    try:
+        yield collector.seconds
+    finally:
+        _stage_times.reset(token)
+
+def exporting() -> bool:
+    """Whether work in this context is counted in the Prometheus metrics"""
+    collector = _stage_times.get()
+    return collector is None or collector.export
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Time a pipeline stage into claim_stage_seconds{stage} (and an
+    OpenTelemetry span when a tracer provider is configured).
+
+    Spans nest: OCR inside PDF extraction is counted in both. When the
+    claim's memory is being accounted, the span is also its memory stage
+    and entering it raises MemoryBudgetExceeded once the budget is spent.
+    While a sampling profile runs, open spans label the sampled stacks.
+    Inside collect_stage_times() the span's time is also summed there.
+    """
+    tracker = current_tracker.get()
+    memory_stage = tracker.enter_span(stage) if tracker is not None else None
+    profiled = profiler_spans.push(stage) if profiler_spans.active else None
+    collector = _stage_times.get()
+    export = collector is None or collector.export
+    started = time.perf_counter()
+    try:
+        with _tracer.start_as_current_span(stage, attributes=attributes) if _tracer else nullcontext():
+            yield
+    except BaseException:
+        if export:
+            STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        if export:
+            STAGE_SECONDS.labels(stage).observe(elapsed)
+        if collector is not None:
+            collector.seconds[stage] += elapsed
+        if memory_stage is not None:
+            tracker.exit_span(memory_stage)
+        if profiled is not None:
+            profiler_spans.pop(profiled)
+
+def timed(stage: str):
+    """Decorator form of span() for sync and async functions"""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Prometheus exposition of all metrics.
+
+    With PROMETHEUS_MULTIPROC_DIR set (several uvicorn workers, PDF shard
+    processes) the values of every process are merged.
+    """
+    registry: Optional[CollectorRegistry] = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,359 @@
+"""
+Compiled Knowledge Base Index
+Normalized condition lookup over VAKnowledgeBase, precomputed once and snapshotted
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from app.core.logging import logger
+
+# Canonical condition -> other names it is written as (normalized on compile)
+CONDITION_SYNONYMS = {
+    "ptsd": ["post traumatic stress disorder", "posttraumatic stress disorder"],
+    "tbi": ["traumatic brain injury"],
+    "mst": ["military sexual trauma"],
+    "tinnitus": ["ringing in the ears", "ringing in ears"],
+    "hearing loss": ["sensorineural hearing loss", "hearing impairment"],
+    "sleep apnea": ["obstructive sleep apnea", "osa"],
+    "depression": ["major depressive disorder", "mdd"],
+    "migraine": ["migraines", "migraine headaches"],
+    "lumbar strain": ["lumbosacral strain", "low back strain", "low back pain", "lower back pain"],
+    "hypertension": ["htn", "high blood pressure"],
+    "ischemic heart disease": ["ihd", "coronary artery disease", "cad"],
+    "type 2 diabetes": ["diabetes mellitus type 2", "diabetes mellitus type ii", "type ii diabetes", "t2dm", "dm2"],
+    "copd": ["chronic obstructive pulmonary disease"],
+    "gerd": ["gastroesophageal reflux disease", "acid reflux"],
+    "ibs": ["irritable bowel syndrome"],
+    "chronic fatigue syndrome": ["cfs"],
+    "fibromyalgia": [],
+    "asthma": [],
+    "chronic sinusitis": [],
+    "chronic rhinitis": [],
+    "peripheral neuropathy": [],
+    # Presumptive for Agent Orange only when early-onset; never folded into the general condition
+    "early onset peripheral neuropathy": ["peripheral neuropathy early onset", "acute and subacute peripheral neuropathy"],
+    "parkinsons disease": ["parkinson disease", "parkinsonism"],
+    "prostate cancer": ["prostate carcinoma", "carcinoma of the prostate"],
+    "multiple myeloma": [],
+    "chronic lymphocytic leukemia": ["cll"],
+}
+
+# ICD-10-CM code prefix -> canonical condition; the longest matching prefix wins
+ICD10_PREFIXES = {
+    "F43.1": "ptsd",
+    "S06": "tbi",
+    "F32": "depression",
+    "F33": "depression",
+    "H93.1": "tinnitus",
+    "H90": "hearing loss",
+    "H91": "hearing loss",
+    "G47.3": "sleep apnea",
+    "G43": "migraine",
+    "M54.5": "lumbar strain",
+    "S39.01": "lumbar strain",
+    "I10": "hypertension",
+    "I20": "ischemic heart disease",
+    "I25": "ischemic heart disease",
+    "E11": "type 2 diabetes",
+    "J44": "copd",
+    "J45": "asthma",
+    "J31": "chronic rhinitis",
+    "J32": "chronic sinusitis",
+    "K21": "gerd",
+    "K58": "ibs",
+    "G93.3": "chronic fatigue syndrome",
+    "M79.7": "fibromyalgia",
+    "G62": "peripheral neuropathy",
+    "G20": "parkinsons disease",
+    "C61": "prostate cancer",
+    "C90.0": "multiple myeloma",
+    "C91.1": "chronic lymphocytic leukemia",
+}
+
+# Laterality and severity words that do not change which condition is meant
+QUALIFIERS = frozenset({"bilateral", "left", "right", "mild", "moderate", "severe"})
+
+# Words that narrow a condition enough to change presumptive eligibility; a name
+# carrying one is its own condition, not the general one it contains
+ELIGIBILITY_QUALIFIERS = frozenset({"early", "onset", "acute", "subacute"})
+
+PROGRAMS = ("agent_orange", "gulf_war", "pact_act")
+
+def normalize_condition(text: str) -> str:
+    """Lowercase, drop apostrophes, punctuation and qualifiers, collapse whitespace"""
+    text = text.lower().replace("'", "").replace("’", "")
+    tokens = re.sub(r"[^a-z0-9]+", " ", text).split()
+    return " ".join(token for token in tokens if token not in QUALIFIERS)
+
+def _code_key(code: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "", code.upper())
+
+@dataclass(frozen=True)
+class KnowledgeIndex:
+    """
+    VAKnowledgeBase compiled into lookup tables.
+
+    Condition text resolves to a canonical name by an exact lookup of its
+    normalized form, then by the longest known phrase inside it (token
+    trie), then by ICD-10 code prefix (character trie). Secondary
+    conditions, DBQs and presumptive programs are precomputed per
+    canonical name, so each lookup is a few dict probes. Names the index
+    cannot resolve fall back to the knowledge base when one is attached.
+
+    A narrowed condition ("peripheral neuropathy, early-onset") keeps its
+    own presumptive programs and borrows secondaries and DBQ from the
+    general condition when the knowledge base has none for it.
+    """
+
+    VERSION = 3
+
+    surface_forms: Dict[str, str]
+    phrase_trie: Dict
+    icd10_trie: Dict
+    secondaries: Dict[str, Tuple[str, ...]]
+    dbqs: Dict[str, str]
+    programs: Dict[str, FrozenSet[str]]
+    fingerprint: str
+    fallback: Optional[object] = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def compile(cls, knowledge_base) -> "KnowledgeIndex":
+        program_lists = _program_lists(knowledge_base)
+
+        surface_forms: Dict[str, str] = {}
+        phrase_trie: Dict = {}
+        spellings: Dict[str, set] = {}  # canonical -> spellings to query the knowledge base with
+        for canonical, aliases in CONDITION_SYNONYMS.items():
+            for name in [canonical, *aliases]:
+                normalized = normalize_condition(name)
+                surface_forms.setdefault(normalized, canonical)
+                _insert_phrase(phrase_trie, normalized, canonical)
+                spellings.setdefault(canonical, set()).add(name)
+
+        # Knowledge base names such as "Type 2 diabetes (diabetes mellitus II)" join a
+        # known condition when they contain one, otherwise they become their own entry
+        listed = [name for names in program_lists.values() for name in names]
+        for name in listed:
+            normalized = normalize_condition(name)
+            if not normalized:
+                continue
+            canonical = surface_forms.get(normalized)
+            if canonical is None:
+                # Only a known condition carrying the same eligibility qualifiers absorbs the name
+                tokens = normalized.split()
+                known = _longest_phrase(phrase_trie, tokens)
+                if known and ELIGIBILITY_QUALIFIERS.intersection(tokens) <= set(known.split()):
+                    canonical = known
+            if canonical is None:
+                canonical = normalized
+                _insert_phrase(phrase_trie, normalized, canonical)
+            surface_forms[normalized] = canonical
+            spellings.setdefault(canonical, set()).update({name, normalized})
+
+        # Merge what the knowledge base says about any spelling of a condition
+        secondaries: Dict[str, Tuple[str, ...]] = {}
+        dbqs: Dict[str, str] = {}
+        for canonical, names in spellings.items():
+            found = []
+            # Knowledge base keys may be capitalized ("PTSD", "Hearing Loss")
+            variants = {v for name in names for v in (name, name.title(), name.upper() if len(name) <= 5 else name)}
+            for name in sorted(variants):
+                for secondary in knowledge_base.get_secondary_conditions(name) or []:
+                    if secondary not in found:
+                        found.append(secondary)
+                dbq = knowledge_base.get_dbq_for_condition(name)
+                if dbq and canonical not in dbqs:
+                    dbqs[canonical] = dbq
+            if found:
+                secondaries[canonical] = tuple(found)
+
+        # Narrowed conditions are rated and examined like the general one
+        for canonical in spellings:
+            tokens = canonical.split()
+            if ELIGIBILITY_QUALIFIERS.isdisjoint(tokens):
+                continue
+            general = _longest_phrase(phrase_trie, [t for t in tokens if t not in ELIGIBILITY_QUALIFIERS])
+            if general and general != canonical:
+                if general in secondaries:
+                    secondaries.setdefault(canonical, secondaries[general])
+                if general in dbqs:
+                    dbqs.setdefault(canonical, dbqs[general])
+
+        programs: Dict[str, set] = {}
+        for program, names in program_lists.items():
+            for name in names:
+                canonical = surface_forms.get(normalize_condition(name))
+                if canonical:
+                    programs.setdefault(canonical, set()).add(program)
+
+        icd10_trie: Dict = {}
+        for prefix, canonical in ICD10_PREFIXES.items():
+            node = icd10_trie
+            for char in _code_key(prefix):
+                node = node.setdefault(char, {})
+            node["$"] = canonical
+
+        return cls(
+            surface_forms=surface_forms,
+            phrase_trie=phrase_trie,
+            icd10_trie=icd10_trie,
+            secondaries=secondaries,
+            dbqs=dbqs,
+            programs={name: frozenset(p) for name, p in programs.items()},
+            fingerprint=_fingerprint(knowledge_base, program_lists),
+            fallback=knowledge_base
+        )
+
+    @classmethod
+    def load_or_compile(cls, knowledge_base, path: Optional[str] = None) -> "KnowledgeIndex":
+        """Snapshot at path if it matches the knowledge base, else compile (and save)"""
+        if path:
+            index = cls.load(path, knowledge_base)
+            if index is not None:
+                return index
+
+        index = cls.compile(knowledge_base)
+        logger.info(f"Compiled knowledge index: {len(index.surface_forms)} condition names")
+        if path:
+            index.save(path)
+        return index
+
+    @classmethod
+    def load(cls, path: str, knowledge_base=None) -> Optional["KnowledgeIndex"]:
+        try:
+            with open(path, "rb") as f:
+                version, index = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable knowledge index {path}: {e}")
+            return None
+
+        if version != cls.VERSION:
+            return None
+        if knowledge_base is not None:
+            if index.fingerprint != _fingerprint(knowledge_base, _program_lists(knowledge_base)):
+                logger.info(f"Knowledge index {path} is stale, recompiling")
+                return None
+            object.__setattr__(index, "fallback", knowledge_base)
+        return index
+
+    def save(self, path: str):
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                # The knowledge base itself is not part of the snapshot
+                snapshot = KnowledgeIndex(**{**self.__dict__, "fallback": None})
+                pickle.dump((self.VERSION, snapshot), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write knowledge index {path}: {e}")
+
+    def resolve(self, name: str, icd10_codes: Iterable[str] = ()) -> Optional[str]:
+        """Canonical condition for free-text name and/or ICD-10 codes"""
+        normalized = normalize_condition(name)
+        canonical = self.surface_forms.get(normalized)
+        if canonical:
+            return canonical
+
+        canonical = _longest_phrase(self.phrase_trie, normalized.split())
+        if canonical:
+            return canonical
+
+        for code in icd10_codes or ():
+            node, found = self.icd10_trie, None
+            for char in _code_key(code):
+                node = node.get(char)
+                if node is None:
+                    break
+                found = node.get("$", found)
+            if found:
+                return found
+        return None
+
+    def secondary_conditions(self, name: str, icd10_codes: Iterable[str] = ()) -> Tuple[str, ...]:
+        canonical = self.resolve(name, icd10_codes)
+        if canonical is None:
+            return tuple(self.fallback.get_secondary_conditions(name) or ()) if self.fallback else ()
+        return self.secondaries.get(canonical, ())
+
+    def dbq_for_condition(self, name: str, icd10_codes: Iterable[str] = ()) -> Optional[str]:
+        canonical = self.resolve(name, icd10_codes)
+        if canonical is None:
+            return self.fallback.get_dbq_for_condition(name) if self.fallback else None
+        return self.dbqs.get(canonical)
+
+    def is_presumptive(self, name: str, program: str, icd10_codes: Iterable[str] = ()) -> bool:
+        """Whether the condition is presumptive under "agent_orange", "gulf_war" or "pact_act"""
+        canonical = self.resolve(name, icd10_codes)
+        return canonical is not None and program in self.programs.get(canonical, ())
+
+def _insert_phrase(trie: Dict, normalized: str, canonical: str):
+    node = trie
+    for token in normalized.split():
+        node = node.setdefault(token, {})
+    node.setdefault("$", canonical)
+
+def _longest_phrase(trie: Dict, tokens) -> Optional[str]:
+    """Canonical name of the longest known phrase in tokens (earliest wins ties)"""
+    best, best_length = None, 0
+    for start in range(len(tokens)):
+        node = trie
+        for end in range(start, len(tokens)):
+            node = node.get(tokens[end])
+            if node is None:
+                break
+            if "$" in node and end - start + 1 > best_length:
+                best, best_length = node["$"], end - start + 1
+    return best
+
+def _program_lists(knowledge_base) -> Dict[str, list]:
+    return {
+        "agent_orange": list(knowledge_base.get_agent_orange_conditions() or []),
+        "gulf_war": list(knowledge_base.get_gulf_war_conditions() or []),
+        "pact_act": list(knowledge_base.get_pact_act_conditions() or []),
+    }
+
+def _knowledge_base_source(knowledge_base) -> str:
+    """
+    Cheap stand-in for the knowledge base's contents: its VERSION when it
+    declares one, else a hash of the module that defines its tables
+    """
+    version = getattr(knowledge_base, "VERSION", None)
+    if version is not None:
+        return f"version:{version}"
+    module = sys.modules.get(type(knowledge_base).__module__)
+    path = getattr(module, "__file__", None)
+    if not path:
+        return f"class:{type(knowledge_base).__qualname__}"
+    try:
+        with open(path, "rb") as f:
+            return "source:" + hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return f"class:{type(knowledge_base).__qualname__}"
+
+def _fingerprint(knowledge_base, program_lists: Dict[str, list]) -> str:
+    """Hash of the inputs the compiled tables depend on; cheap enough to check at every load"""
+    source = [
+        _knowledge_base_source(knowledge_base), program_lists, CONDITION_SYNONYMS, ICD10_PREFIXES,
+        sorted(QUALIFIERS), sorted(ELIGIBILITY_QUALIFIERS)
+    ]
+    return hashlib.sha256(json.dumps(source, sort_keys=True, default=str).encode()).hexdigest()
+
+if __name__ == "__main__":
+    # Precompile the snapshot at build time: python -m app.services.knowledge_index <path>
+    from app.services.va_knowledge import VAKnowledgeBase
+
+    snapshot_path = sys.argv[1] if len(sys.argv) > 1 else "processed/knowledge-index.pkl"
+    KnowledgeIndex.compile(VAKnowledgeBase()).save(snapshot_path)
+    print(f"Wrote {snapshot_path}")
@@ -0,0 +1,297 @@
+"""
+LLM Gateway
+Rate-limited, cached and coalesced access to the Anthropic Messages API
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import anthropic
+
+from app.core.logging import logger
+
+DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
+
+@dataclass
+class LLMResponse:
+    """Text and usage of one completion"""
+    text: str
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0  # Prompt prefix tokens served from the provider's cache
+    cached: bool = False  # Served from the gateway's response cache
+    coalesced: bool = False  # Shared with an identical in-flight request
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`; acquire waits for enough tokens"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        tokens = min(tokens, self.capacity)  # An oversized request waits for a full bucket
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+class LLMGateway:
+    """
+    Single entry point for LLM calls.
+
+    - Concurrency: a global limit, plus a per-claim limit so one large
+      claim cannot take every slot.
+    - Rate limits: token buckets for requests and input tokens per minute.
+    - Response cache: LRU keyed by a hash of model, parameters and prompt.
+    - Coalescing: identical requests in flight share one API call, run
+      as its own task so it outlives any one caller being cancelled.
+    - Prefix reuse: shared claim context goes in a system block marked
+      for prompt caching, so calls about the same claim reuse it.
+    - Retries: rate-limit, overload, 5xx and connection errors retry
+      with exponential backoff and jitter, honouring retry-after.
+    """
+
+    RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+    def __init__(
+        self,
+        client: Optional[anthropic.AsyncAnthropic] = None,
+        model: str = DEFAULT_MODEL,
+        max_concurrency: int = 16,
+        per_claim_concurrency: int = 4,
+        requests_per_minute: float = 1000,
+        input_tokens_per_minute: float = 400_000,
+        cache_entries: int = 4096,
+        cache_ttl_seconds: float = 24 * 3600,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0
+    ):
+        # Retries are handled here, where they are visible to the rate limiters
+        self.client = client or anthropic.AsyncAnthropic(max_retries=0)
+        self.model = model
+        self.per_claim_concurrency = per_claim_concurrency
+        self.cache_entries = cache_entries
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._claims: Dict[str, List] = {}  # claim_id -> [semaphore, users]
+        self._requests = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60))
+        self._input_tokens = TokenBucket(input_tokens_per_minute / 60, input_tokens_per_minute / 6)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, _Inflight] = {}
+        self._stats = {
+            "requests": 0,
+            "api_calls": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "retries": 0,
+            "errors": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_tokens": 0
+        }
+
+    async def complete(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        context: Optional[str] = None,
+        claim_id: Optional[str] = None,
+        model: Optional[str] = None,
+        max_tokens: int = 1024,
+        temperature: float = 0.0,
+        use_cache: bool = True
+    ) -> LLMResponse:
+        """
+        Complete a prompt.
+
+        `context` is shared material (e.g. the claim's evidence digest)
+        that many prompts for the same claim start with; it is sent as a
+        cacheable prefix ahead of `system`.
+        """
+        model = model or self.model
+        self._stats["requests"] += 1
+        key = self._cache_key(model, system, context, prompt, max_tokens, temperature)
+
+        if use_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._stats["cache_hits"] += 1
+                return cached
+
+        inflight = self._inflight.get(key)
+        coalesced = inflight is not None
+        if coalesced:
+            self._stats["coalesced"] += 1
+        else:
+            task = asyncio.create_task(self._call(model, system, context, prompt, max_tokens, temperature, claim_id))
+            inflight = self._inflight[key] = _Inflight(task)
+            task.add_done_callback(lambda _: self._finish(key, inflight, use_cache))
+
+        # Callers are cancelled independently; the call is abandoned only when nobody waits for it
+        inflight.waiters += 1
+        try:
+            response = await asyncio.shield(inflight.task)
+        except asyncio.CancelledError:
+            if inflight.waiters == 1 and not inflight.task.done():
+                inflight.task.cancel()
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+            raise
+        finally:
+            inflight.waiters -= 1
+        return LLMResponse(**{**response.__dict__, "coalesced": True}) if coalesced else response
+
+    def _finish(self, key: str, inflight: "_Inflight", use_cache: bool):
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+        task = inflight.task
+        if task.cancelled():
+            return
+        if task.exception() is None and use_cache:  # exception() also marks a failure retrieved
+            self._cache_put(key, task.result())
+
+    async def _call(
+        self,
+        model: str,
+        system: Optional[str],
+        context: Optional[str],
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        claim_id: Optional[str]
+    ) -> LLMResponse:
+        system_blocks = []
+        if context:
+            system_blocks.append({"type": "text", "text": context, "cache_control": {"type": "ephemeral"}})
+        if system:
+            system_blocks.append({"type": "text", "text": system})
+
+        estimated_tokens = (len(prompt) + len(system or "") + len(context or "")) / 4
+        claim_slot = self._claim_semaphore(claim_id)
+        try:
+            for attempt in range(self.max_retries + 1):
+                # Slots are held only for the request itself, never through
+                # rate-limit waits or backoff sleeps
+                await self._requests.acquire()
+                await self._input_tokens.acquire(estimated_tokens)
+                try:
+                    async with claim_slot, self._global:
+                        self._stats["api_calls"] += 1
+                        message = await self.client.messages.create(
+                            model=model,
+                            max_tokens=max_tokens,
+                            temperature=temperature,
+                            system=system_blocks or anthropic.NOT_GIVEN,
+                            messages=[{"role": "user", "content": prompt}]
+                        )
+                    break
+                except (anthropic.APIConnectionError, anthropic.APIStatusError) as e:
+                    status = getattr(e, "status_code", None)
+                    retryable = status is None or status in self.RETRYABLE_STATUS
+                    if not retryable or attempt == self.max_retries:
+                        self._stats["errors"] += 1
+                        raise
+                    delay = self._backoff(attempt, e)
+                    self._stats["retries"] += 1
+                    logger.warning(f"LLM call failed ({status or type(e).__name__}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+        finally:
+            self._release_claim(claim_id)
+
+        usage = message.usage
+        response = LLMResponse(
+            text="".join(block.text for block in message.content if block.type == "text"),
+            model=message.model,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_read_tokens=getattr(usage, "cache_read_input_tokens", None) or 0
+        )
+        self._stats["input_tokens"] += response.input_tokens
+        self._stats["output_tokens"] += response.output_tokens
+        self._stats["cache_read_tokens"] += response.cache_read_tokens
+        return response
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter keeps retries from many callers from arriving together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _claim_semaphore(self, claim_id: Optional[str]):
+        if claim_id is None:
+            return _NoLimit()
+        entry = self._claims.setdefault(claim_id, [asyncio.Semaphore(self.per_claim_concurrency), 0])
+        entry[1] += 1
+        return entry[0]
+
+    def _release_claim(self, claim_id: Optional[str]):
+        if claim_id is None:
+            return
+        entry = self._claims[claim_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._claims[claim_id]
+
+    def _cache_key(self, *parts) -> str:
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[LLMResponse]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, response = entry
+        if time.monotonic() - stored_at > self.cache_ttl_seconds:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return LLMResponse(**{**response.__dict__, "cached": True})
+
+    def _cache_put(self, key: str, response: LLMResponse):
+        self._cache[key] = (time.monotonic(), response)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats["cache_entries"] = len(self._cache)
+        stats["inflight"] = len(self._inflight)
+        return stats
+
+@dataclass
+class _Inflight:
+    """An API call shared by identical requests, and how many are waiting on it"""
+    task: asyncio.Task
+    waiters: int = 0
+
+class _NoLimit:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
@@ -0,0 +1,261 @@
+"""
+Claim Memory Accounting
+RSS sampling and tracemalloc snapshots per pipeline stage, with a per-claim memory budget
+"""
+
+import contextvars
+import gc
+import os
+import resource
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from app.core.logging import logger
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_MB = 1024 * 1024
+
+# tracemalloc is process-wide: it runs while any tracker wants it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+# Tracker of the claim the current task is processing
+current_tracker: contextvars.ContextVar[Optional["ClaimMemoryTracker"]] = contextvars.ContextVar(
+    "current_memory_tracker", default=None
+)
+
+# Stages open in the current task, innermost last: concurrent tasks of one
+# claim (archive members, parallel documents) each nest their own
+_open_stages: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar(
+    "open_memory_stages", default=()
+)
+
+class MemoryBudgetExceeded(BaseException):
+    """
+    A claim grew the process past its memory budget and was stopped.
+
+    Not an Exception: the pipeline's per-document and per-page fallbacks
+    (OCR retries, archive member errors) must not absorb it, so it unwinds
+    to the claim task like a cancellation.
+    """
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        # No /proc: lifetime peak is the best available (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if peak > 1 << 32 else peak * 1024
+
+class ClaimMemoryTracker:
+    """
+    Memory high-water marks for one claim, per stage.
+
+    A sampler thread reads RSS every sample_interval seconds (the event
+    loop is often busy in OCR or spaCy, so it cannot sample itself) and
+    charges it to every open stage, so a stage's peak includes its nested
+    stages: the explicit stages of the claim task plus every
+    instrumentation span, in whichever task opened it. Each task keeps its
+    own stack of open stages. With trace_allocations, tracemalloc also
+    records each top-level stage's traced peak and the allocation sites
+    that grew most.
+
+    When RSS grows more than budget_bytes above its level at the start
+    of the claim, the next stage or span boundary raises
+    MemoryBudgetExceeded, so the claim unwinds instead of the worker being
+    OOM-killed. Memory is process-wide: with several claims in flight the
+    figures include the others' usage.
+    """
+
+    def __init__(
+        self,
+        claim_id: str,
+        budget_bytes: Optional[int] = None,
+        trace_allocations: bool = False,
+        sample_interval: float = 0.25,
+        top_allocations: int = 10,
+        traceback_frames: int = 1
+    ):
+        self.claim_id = claim_id
+        self.budget_bytes = budget_bytes
+        self.trace_allocations = trace_allocations
+        self.sample_interval = sample_interval
+        self.top_allocations = top_allocations
+        self.traceback_frames = traceback_frames
+        self.start_rss = rss_bytes()
+        self.peak_rss = self.start_rss
+        self.exceeded_at: Optional[str] = None
+        self._open: Dict[str, int] = {}  # Stage -> times it is open across the claim's tasks
+        self._open_lock = threading.Lock()
+        self._stage_peaks: Dict[str, int] = {}
+        self._traced: Dict[str, Dict] = {}
+        self._allocations: Dict[str, Dict] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.trace_allocations:
+            _acquire_tracing(self.traceback_frames)
+        self._thread = threading.Thread(target=self._sample_loop, name=f"memory-{self.claim_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+        if self.trace_allocations:
+            _release_tracing()
+
+    @contextmanager
+    def stage(self, name: str):
+        """A top-level stage; also snapshots allocations when tracing"""
+        self.check()
+        baseline = None
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.take_snapshot()
+        token = self._push(name)
+        try:
+            yield
+        finally:
+            self._pop(token)
+            self._sample()
+            if baseline is not None:
+                self._record_allocations(name, baseline)
+        self.check()
+
+    def enter_span(self, name: str) -> contextvars.Token:
+        """Open a span stage in the current task; pass the returned token to exit_span()"""
+        self.check()
+        return self._push(name)
+
+    def exit_span(self, token: contextvars.Token):
+        self._pop(token)
+
+    def check(self):
+        """Raise MemoryBudgetExceeded if the budget has been passed"""
+        growth = self.peak_rss - self.start_rss
+        if self.budget_bytes and growth > self.budget_bytes:
+            stages = _open_stages.get()
+            self.exceeded_at = self.exceeded_at or (stages[-1] if stages else "claim")
+            raise MemoryBudgetExceeded(
+                f"Claim {self.claim_id} exceeded its memory budget "
+                f"(+{growth / _MB:.0f} MB > {self.budget_bytes / _MB:.0f} MB) during {self.exceeded_at}"
+            )
+
+    def report(self) -> Dict:
+        return {
+            "start_rss_mb": round(self.start_rss / _MB, 1),
+            "peak_rss_mb": round(self.peak_rss / _MB, 1),
+            "budget_mb": round(self.budget_bytes / _MB, 1) if self.budget_bytes else None,
+            "exceeded_at": self.exceeded_at,
+            "stages": {
+                name: {"peak_rss_mb": round(peak / _MB, 1), **self._traced.get(name, {})}
+                for name, peak in self._stage_peaks.items()
+            },
+            "top_allocations": sorted(
+                self._allocations.values(), key=lambda a: a["size_mb"], reverse=True
+            )[:self.top_allocations]
+        }
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            self._sample()
+
+    def _push(self, name: str) -> contextvars.Token:
+        with self._open_lock:
+            self._open[name] = self._open.get(name, 0) + 1
+        return _open_stages.set(_open_stages.get() + (name,))
+
+    def _pop(self, token: contextvars.Token):
+        name = _open_stages.get()[-1]
+        _open_stages.reset(token)
+        with self._open_lock:
+            remaining = self._open.get(name, 0) - 1
+            if remaining > 0:
+                self._open[name] = remaining
+            else:
+                self._open.pop(name, None)
+
+    def _sample(self):
+        rss = rss_bytes()
+        self.peak_rss = max(self.peak_rss, rss)
+        # The sampler thread cannot see the tasks' stacks, only what is open
+        with self._open_lock:
+            stages = list(self._open)
+        for stage in stages:
+            if rss > self._stage_peaks.get(stage, 0):
+                self._stage_peaks[stage] = rss
+
+    def _record_allocations(self, stage: str, baseline):
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ])
+        self._traced[stage] = {"traced_peak_mb": round(peak / _MB, 1)}
+        for diff in snapshot.compare_to(baseline, "lineno")[:self.top_allocations]:
+            if diff.size_diff <= 0:
+                continue
+            frame = diff.traceback[0]
+            site = f"{frame.filename}:{frame.lineno}"
+            entry = self._allocations.setdefault(site, {"site": site, "stage": stage, "size_mb": 0.0, "count": 0})
+            entry["size_mb"] = round(entry["size_mb"] + diff.size_diff / _MB, 2)
+            entry["count"] += diff.count_diff
+
+@contextmanager
+def track_claim(
+    claim_id: str,
+    enabled: bool = True,
+    budget_mb: Optional[float] = None,
+    trace_allocations: bool = False
+):
+    """Account the enclosed claim processing; yields the tracker (None when disabled)"""
+    if not enabled:
+        yield None
+        return
+
+    tracker = ClaimMemoryTracker(
+        claim_id,
+        budget_bytes=int(budget_mb * _MB) if budget_mb else None,
+        trace_allocations=trace_allocations
+    )
+    token = current_tracker.set(tracker)
+    tracker.start()
+    try:
+        yield tracker
+    finally:
+        tracker.stop()
+        current_tracker.reset(token)
+        if tracker.exceeded_at:
+            gc.collect()  # Return what the aborted claim held before the next one starts
+            logger.warning(f"Claim {claim_id} aborted over memory budget: {tracker.report()}")
+
+@contextmanager
+def stage(name: str):
+    """Top-level stage of the current claim (no-op when not tracking)"""
+    tracker = current_tracker.get()
+    if tracker is None:
+        yield
+        return
+    with tracker.stage(name):
+        yield
+
+def _acquire_tracing(frames: int):
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _tracing_users += 1
+
+def _release_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
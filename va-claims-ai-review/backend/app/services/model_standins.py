@@ -0,0 +1,134 @@
+"""
+Model Stand-ins
+Deterministic, lightweight replacements for spaCy, the sentence embedder and the classifier
+
+For benchmarks and load tests (MODEL_STANDINS=true): the pipeline runs
+end to end without downloading or loading models, with stable outputs
+for a given input. Never enabled in production.
+"""
+
+import hashlib
+import re
+from typing import Dict, Iterable, List, Union
+
+import numpy as np
+from anthropic import AsyncAnthropic
+
+from app.services.llm_gateway import LLMGateway
+
+_MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+
+# Base entities the pipeline reads (dates, providers); entity_ruler patterns are added on top
+_BASE_PATTERNS = [
+    ("DATE", re.compile(rf"\b(?:\d{{1,2}}/\d{{1,2}}/\d{{2,4}}|\d{{4}}-\d{{2}}-\d{{2}}|(?:{_MONTHS})\s+\d{{1,2}},\s+\d{{4}})\b")),
+    ("PERSON", re.compile(r"\bDr\.\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?")),
+    ("ORG", re.compile(r"\b(?:[A-Z][A-Za-z]+\s+)+(?:Medical Center|Hospital|Clinic)\b")),
+]
+
+class _Entity:
+    __slots__ = ("label_", "text", "start_char", "end_char")
+
+    def __init__(self, label: str, text: str, start: int, end: int):
+        self.label_ = label
+        self.text = text
+        self.start_char = start
+        self.end_char = end
+
+class _Doc:
+    __slots__ = ("text", "ents")
+
+    def __init__(self, text: str, ents: List[_Entity]):
+        self.text = text
+        self.ents = ents
+
+class StandInNLP:
+    """Regex NER behind spaCy's call interface; entity_ruler patterns are honoured"""
+
+    def __init__(self):
+        self._ruler: List = []
+
+    def add_pipe(self, name: str, **kwargs):
+        return self  # Only the entity ruler is ever added
+
+    def add_patterns(self, patterns: Iterable[Dict]):
+        for pattern in patterns:
+            spec = pattern["pattern"]
+            if isinstance(spec, str):
+                regex = re.compile(rf"(?<!\w){re.escape(spec)}(?!\w)")
+            else:
+                # Token patterns: only single-token REGEX patterns are used by the engine
+                regex = re.compile(spec[0]["TEXT"]["REGEX"])
+            self._ruler.append((pattern["label"], regex))
+
+    def __call__(self, text: str) -> _Doc:
+        found = []
+        # Ruler entities take precedence over the base ones, as before="ner" does in spaCy
+        for priority, (label, regex) in enumerate(self._ruler + _BASE_PATTERNS):
+            for match in regex.finditer(text):
+                found.append((match.start(), -(match.end() - match.start()), priority, label, match))
+
+        ents, end = [], -1
+        for start, _, _, label, match in sorted(found):
+            if start >= end:
+                ents.append(_Entity(label, match.group(), start, match.end()))
+                end = match.end()
+        return _Doc(text, ents)
+
+    def pipe(self, texts: Iterable[str], **kwargs):
+        for text in texts:
+            yield self(text)
+
+class StandInEmbedder:
+    """Signed feature hashing of words and word pairs: shared wording gives similar vectors"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"[a-z0-9]+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dimension] += 1.0 if digest >> 63 else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+        return vectors[0] if single else vectors
+
+class StandInClassifier:
+    """Text-classification pipeline interface with a constant answer"""
+
+    def __call__(self, inputs, **kwargs):
+        if isinstance(inputs, str):
+            return [{"label": "LABEL_0", "score": 1.0}]
+        return [{"label": "LABEL_0", "score": 1.0} for _ in inputs]
+
+async def install_model_standins(engine):
+    """
+    Give an AIEngine stand-in models instead of initialize().
+
+    The LLM gateway is set up as usual; point ANTHROPIC_BASE_URL at
+    benchmarks.fake_llm_server to keep LLM calls local too.
+    """
+    nlp = StandInNLP()
+    await engine._add_va_entities(nlp)
+    engine.nlp = nlp
+    engine._nlp_models = {"en_core_web_lg": nlp, "en_core_web_sm": nlp}
+    engine.embedder = StandInEmbedder()
+    engine.embedder_name = "standin-hash-384"  # Keeps stand-in embeddings apart in the artifact store
+    engine.classifier = StandInClassifier()
+    engine.anthropic = AsyncAnthropic(max_retries=0)
+    engine.llm = LLMGateway(engine.anthropic, **engine.llm_options)
@@ -0,0 +1,303 @@
+"""
+OCR Result Cache
+Pixel-digest keyed page image cache with memory (LRU) and disk tiers
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core.logging import logger
+
+THUMBNAIL_SIZE = 32
+HASH_SIZE = 8
+INK_GRID = 128
+
+@dataclass
+class PageFingerprint:
+    """Perceptual hash of a page, an exact digest of its pixels and its ink mask"""
+    phash: int
+    digest: str
+    ink: float  # Fraction of INK_GRID cells holding ink
+    ink_mask: bytes  # INK_GRID x INK_GRID cells, bit-packed
+
+@dataclass
+class _CacheEntry:
+    phash: int
+    digest: str
+    text: str
+    ocr_seconds: float
+    ink: float = 1.0
+    ink_mask: Optional[bytes] = None
+
+class OCRCache:
+    """
+    Caches OCR text for page images.
+
+    Entries are keyed by a digest of the full-resolution page pixels and
+    the OCR settings. A page with other pixels only gets cached text when
+    both pages are near blank (ink in at most ``max_ink_ratio`` of a
+    128x128 grid, at most ``max_fuzzy_words`` of cached text: separator
+    sheets, fax covers, "this page intentionally left blank") and their
+    ink masks agree: at most ``max_ink_mismatch`` of the inked cells lack
+    ink within one cell on the other page, so rescans may shift slightly
+    but an added line of text fails. Near-blank entries are kept in a
+    small index of their own, since the DCT perceptual hash of an almost
+    uniform page is mostly scanner noise. Filled-in forms carry too much
+    ink to qualify, so two veterans' copies of one template never share
+    text. The perceptual hash indexes the other in-memory entries by
+    16-bit band; pages hashing close to a cached page with other pixels
+    are counted as collisions.
+    """
+
+    BANDS = 4
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_memory_entries: int = 2048,
+        max_hamming_distance: int = 6,
+        max_ink_ratio: float = 0.03,
+        max_fuzzy_words: int = 40,
+        max_ink_mismatch: float = 0.05,
+        max_near_blank_entries: int = 256
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_entries = max_memory_entries
+        self.max_hamming_distance = max_hamming_distance
+        self.max_ink_ratio = max_ink_ratio
+        self.max_fuzzy_words = max_fuzzy_words
+        self.max_ink_mismatch = max_ink_mismatch
+        self.max_near_blank_entries = max_near_blank_entries
+        self._memory: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bands: Dict[str, Set[str]] = {}
+        self._near_blank: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "near_blank_hits": 0,
+            "misses": 0,
+            "collisions": 0,
+            "ocr_seconds_saved": 0.0,
+            "ocr_seconds_spent": 0.0
+        }
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def fingerprint(self, image: Image.Image) -> PageFingerprint:
+        """Perceptual hash, pixel digest and ink mask of a page image"""
+        gray = image.convert("L")
+        thumbnail = np.asarray(gray.resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.BILINEAR), dtype=np.float32)
+        dct = cv2.dct(thumbnail)[:HASH_SIZE, :HASH_SIZE]
+        bits = (dct > np.median(dct.flatten()[1:])).flatten()
+        phash = int("".join("1" if bit else "0" for bit in bits), 2)
+
+        # Ink is judged at full resolution (thin strokes vanish when averaged
+        # down), then a grid cell counts as inked when 5% of its pixels are
+        pixels = np.asarray(gray)
+        background = np.median(pixels[::8, ::8])
+        coverage = cv2.resize(
+            (pixels < background - 64).astype(np.float32), (INK_GRID, INK_GRID), interpolation=cv2.INTER_AREA
+        )
+        mask = coverage >= 0.05
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.mode}:{image.width}x{image.height}:".encode())
+        digest.update(image.tobytes())
+        return PageFingerprint(phash, digest.hexdigest(), float(mask.mean()), np.packbits(mask).tobytes())
+
+    def get(self, fingerprint: PageFingerprint, variant: str = "") -> Optional[str]:
+        """Cached OCR text for a page, or None"""
+        variant_hash = self._variant_hash(variant)
+        key = self._key(fingerprint.digest, variant_hash)
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        tier = "memory_hits"
+
+        if entry is None and self.cache_dir:
+            entry = self._read_disk(key)
+            if entry is not None:
+                tier = "disk_hits"
+                self._remember(key, entry)
+
+        with self._lock:
+            if entry is None or entry.digest != fingerprint.digest:
+                entry = self._near_blank_match(fingerprint, variant_hash)
+                if entry is not None:
+                    self._stats["hits"] += 1
+                    self._stats["near_blank_hits"] += 1
+                    self._stats["ocr_seconds_saved"] += entry.ocr_seconds
+                    return entry.text
+
+                self._stats["misses"] += 1
+                if self._has_lookalike(fingerprint, variant_hash):
+                    self._stats["collisions"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            self._stats[tier] += 1
+            self._stats["ocr_seconds_saved"] += entry.ocr_seconds
+        return entry.text
+
+    def put(self, fingerprint: PageFingerprint, text: str, ocr_seconds: float, variant: str = ""):
+        """Store OCR text for a page in both tiers"""
+        variant_hash = self._variant_hash(variant)
+        key = self._key(fingerprint.digest, variant_hash)
+        entry = _CacheEntry(
+            fingerprint.phash, fingerprint.digest, text, ocr_seconds, fingerprint.ink, fingerprint.ink_mask
+        )
+        self._remember(key, entry)
+
+        with self._lock:
+            self._stats["ocr_seconds_spent"] += ocr_seconds
+
+        if self.cache_dir:
+            self._write_disk(key, entry)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["ocr_seconds_saved"] = round(stats["ocr_seconds_saved"], 3)
+        stats["ocr_seconds_spent"] = round(stats["ocr_seconds_spent"], 3)
+        return stats
+
+    def _variant_hash(self, variant: str) -> str:
+        # OCR settings are part of the key; a different config is a different result
+        return hashlib.blake2b(variant.encode(), digest_size=4).hexdigest()
+
+    def _key(self, digest: str, variant_hash: str) -> str:
+        return f"{digest}-{variant_hash}"
+
+    def _band_ids(self, phash: int, variant_hash: str) -> List[str]:
+        return [
+            f"{band}-{(phash >> (16 * band)) & 0xFFFF:04x}-{variant_hash}"
+            for band in range(self.BANDS)
+        ]
+
+    def _has_lookalike(self, fingerprint: PageFingerprint, variant_hash: str) -> bool:
+        """Whether a cached page with other pixels hashes within max_hamming_distance (lock held)"""
+        keys = set()
+        for band_id in self._band_ids(fingerprint.phash, variant_hash):
+            keys.update(self._bands.get(band_id, ()))
+        return any(
+            bin(self._memory[key].phash ^ fingerprint.phash).count("1") <= self.max_hamming_distance
+            for key in keys
+        )
+
+    def _is_near_blank(self, ink: float, ink_mask: Optional[bytes], text: Optional[str] = None) -> bool:
+        if ink_mask is None or ink > self.max_ink_ratio:
+            return False
+        return text is None or len(text.split()) <= self.max_fuzzy_words
+
+    def _near_blank_match(self, fingerprint: PageFingerprint, variant_hash: str) -> Optional[_CacheEntry]:
+        """A cached near-blank page whose ink mask agrees with this one (lock held)"""
+        if not self._is_near_blank(fingerprint.ink, fingerprint.ink_mask):
+            return None
+        mask = _unpack_mask(fingerprint.ink_mask)
+        for key in reversed(self._near_blank):
+            if not key.endswith(f"-{variant_hash}"):
+                continue
+            entry = self._near_blank[key]
+            if _ink_mismatch(mask, _unpack_mask(entry.ink_mask)) <= self.max_ink_mismatch:
+                self._near_blank.move_to_end(key)
+                return entry
+        return None
+
+    def _remember(self, key: str, entry: _CacheEntry):
+        variant_hash = key.split("-", 1)[1]
+        with self._lock:
+            if key not in self._memory:
+                for band_id in self._band_ids(entry.phash, variant_hash):
+                    self._bands.setdefault(band_id, set()).add(key)
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+
+            if self._is_near_blank(entry.ink, entry.ink_mask, entry.text):
+                self._near_blank[key] = entry
+                self._near_blank.move_to_end(key)
+                while len(self._near_blank) > self.max_near_blank_entries:
+                    self._near_blank.popitem(last=False)
+
+            while len(self._memory) > self.max_memory_entries:
+                evicted_key, evicted = self._memory.popitem(last=False)
+                for band_id in self._band_ids(evicted.phash, evicted_key.split("-", 1)[1]):
+                    keys = self._bands.get(band_id)
+                    if keys is not None:
+                        keys.discard(evicted_key)
+                        if not keys:
+                            del self._bands[band_id]
+
+    # Disk layout: entries/<key[:2]>/<key>.json
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / "entries" / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[_CacheEntry]:
+        path = self._entry_path(key)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return _CacheEntry(
+                int(data["phash"], 16),
+                data["digest"],
+                data["text"],
+                data["ocr_seconds"],
+                # Entries written without an ink mask are only served for identical pixels
+                data.get("ink", 1.0),
+                base64.b64decode(data["ink_mask"]) if data.get("ink_mask") else None
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable OCR cache entry {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, entry: _CacheEntry):
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "phash": f"{entry.phash:016x}",
+                    "digest": entry.digest,
+                    "text": entry.text,
+                    "ocr_seconds": entry.ocr_seconds,
+                    "ink": entry.ink,
+                    "ink_mask": base64.b64encode(entry.ink_mask).decode() if entry.ink_mask else None
+                }, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry {path}: {e}")
+
+def _unpack_mask(ink_mask: bytes) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(ink_mask, dtype=np.uint8))[:INK_GRID * INK_GRID].reshape(INK_GRID, INK_GRID)
+
+def _ink_mismatch(first: np.ndarray, second: np.ndarray) -> float:
+    """Fraction of inked cells with no ink within one cell on the other page"""
+    kernel = np.ones((3, 3), np.uint8)
+    unmatched = (
+        np.count_nonzero(first & ~cv2.dilate(second, kernel))
+        + np.count_nonzero(second & ~cv2.dilate(first, kernel))
+    )
+    inked = np.count_nonzero(first) + np.count_nonzero(second)
+    return unmatched / inked if inked else 0.0
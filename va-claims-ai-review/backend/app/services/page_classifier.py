@@ -0,0 +1,137 @@
+"""
+Page-Level Document Segmentation
+Labels pages from their header region and merges them into sub-documents
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+
+from app.models.documents import DocumentType
+
+# Characters of each page treated as its header region
+HEADER_REGION_CHARS = 600
+
+# Strong form identifiers, checked against the header region in order
+HEADER_PATTERNS: List[Tuple[DocumentType, re.Pattern]] = [
+    (DocumentType.DD214, re.compile(r"\bdd\s*form\s*214\b|\bdd[\s-]?214\b|certificate of release or discharge")),
+    (DocumentType.VA_FORM_526EZ, re.compile(r"\bva\s*form\s*21-526(?:ez)?\b|application for disability compensation")),
+    (DocumentType.DBQ, re.compile(r"disability benefits questionnaire|\bdbq\b")),
+    (DocumentType.RATING_DECISION, re.compile(r"\brating decision\b")),
+    (DocumentType.CP_EXAM, re.compile(r"\bc&p exam|compensation and pension exam")),
+    (DocumentType.SERVICE_TREATMENT_RECORD, re.compile(r"service treatment record|chronological record of medical care|\bsf\s*600\b")),
+    (DocumentType.NEXUS_LETTER, re.compile(r"\bnexus\b.*\bopinion\b|\bmedical opinion\b.*\bnexus\b|independent medical opinion", re.DOTALL)),
+    (DocumentType.BUDDY_STATEMENT, re.compile(r"\bbuddy statement\b|\blay statement\b|statement in support of claim|\bva\s*form\s*21-10210\b")),
+]
+
+# Weak body cues, only used to open a segment when no header matched
+BODY_PATTERNS: List[Tuple[DocumentType, re.Pattern]] = [
+    (DocumentType.MEDICAL_RECORD, re.compile(r"\bdiagnosis\b|\btreatment\b|\bmedical record\b|\bprogress note\b")),
+]
+
+# "Page 1 of N" in the header marks the start of a new physical document
+FIRST_PAGE_PATTERN = re.compile(r"\bpage\s+1\s+of\s+\d+\b")
+
+@dataclass
+class PageLabel:
+    """Classification of a single page"""
+    page_number: int
+    type: DocumentType
+    from_header: bool  # False when inherited from the previous page
+
+@dataclass
+class SubDocument:
+    """Run of consecutive pages belonging to one logical document"""
+    type: DocumentType
+    start_page: int
+    end_page: int
+
+    @property
+    def page_count(self) -> int:
+        return self.end_page - self.start_page + 1
+
+    def to_dict(self) -> Dict:
+        return {
+            "type": self.type,
+            "start_page": self.start_page,
+            "end_page": self.end_page
+        }
+
+def classify_page_header(text: str) -> Tuple[Optional[DocumentType], bool]:
+    """
+    Classify a page from its header region.
+
+    Returns the matched type (None if no strong identifier) and whether the
+    header looks like the first page of a new document.
+    """
+    header = text[:HEADER_REGION_CHARS].lower()
+    starts_document = bool(FIRST_PAGE_PATTERN.search(header))
+
+    for doc_type, pattern in HEADER_PATTERNS:
+        if pattern.search(header):
+            return doc_type, starts_document
+
+    return None, starts_document
+
+class PageSegmenter:
+    """
+    Streaming page classifier.
+
+    Pages are fed in order as they are extracted. A page with a recognised
+    header either extends the current sub-document (same type) or opens a
+    new one; a page without one continues the current sub-document.
+    """
+
+    def __init__(self):
+        self.labels: List[PageLabel] = []
+        self.segments: List[SubDocument] = []
+
+    def feed(self, page_number: int, text: str) -> PageLabel:
+        """Label a page and merge it into the current sub-document"""
+        doc_type, starts_document = classify_page_header(text)
+        return self.feed_label(page_number, doc_type, starts_document, text)
+
+    def feed_label(
+        self,
+        page_number: int,
+        doc_type: Optional[DocumentType],
+        starts_document: bool = False,
+        text: str = ""
+    ) -> PageLabel:
+        """Merge a page whose header was already classified (e.g. by a worker)"""
+        current = self.segments[-1] if self.segments else None
+        from_header = doc_type is not None
+
+        if doc_type is None:
+            if current is not None and current.type != DocumentType.OTHER:
+                doc_type = current.type
+            else:
+                doc_type = self._classify_body(text)
+                from_header = doc_type != DocumentType.OTHER
+
+        if current is not None and current.type == doc_type and not (from_header and starts_document):
+            current.end_page = page_number
+        else:
+            self.segments.append(SubDocument(doc_type, page_number, page_number))
+
+        label = PageLabel(page_number, doc_type, from_header)
+        self.labels.append(label)
+        return label
+
+    def dominant_type(self) -> DocumentType:
+        """Type covering the most pages, ignoring unclassified pages"""
+        coverage: Dict[DocumentType, int] = {}
+        for segment in self.segments:
+            if segment.type != DocumentType.OTHER:
+                coverage[segment.type] = coverage.get(segment.type, 0) + segment.page_count
+
+        if not coverage:
+            return DocumentType.OTHER
+        return max(coverage, key=coverage.get)
+
+    def _classify_body(self, text: str) -> DocumentType:
+        text_lower = text.lower()
+        for doc_type, pattern in BODY_PATTERNS:
+            if pattern.search(text_lower):
+                return doc_type
+        return DocumentType.OTHER
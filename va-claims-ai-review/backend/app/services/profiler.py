@@ -0,0 +1,168 @@
+"""
+Sampling Profiler
+Wall-clock stack sampling of a live worker, labelled with claim ids and pipeline spans
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.progress import current_claim, execution_key, task_claim, thread_claim
+
+class SpanRegistry:
+    """
+    Open instrumentation spans per asyncio task (or thread), readable
+    from the sampler thread. Only maintained while a profile is running,
+    so spans opened before it started are not labelled.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self._stacks: Dict[int, List[Tuple[Optional[str], str]]] = {}
+        self._lock = threading.Lock()
+
+    def push(self, stage: str) -> Tuple[Optional[str], str]:
+        """Open a span; pass the returned entry to pop()"""
+        entry = (current_claim.get(), stage)
+        with self._lock:
+            self._stacks.setdefault(execution_key(), []).append(entry)
+        return entry
+
+    def pop(self, entry: Tuple[Optional[str], str]):
+        key = execution_key()
+        with self._lock:
+            stack = self._stacks.get(key)
+            # The entry is gone if the registry was cleared since it was pushed
+            for i in range(len(stack or ()) - 1, -1, -1):
+                if stack[i] is entry:
+                    del stack[i]
+                    break
+            if stack is not None and not stack:
+                del self._stacks[key]
+
+    def lookup(self, key: int) -> List[Tuple[Optional[str], str]]:
+        with self._lock:
+            return list(self._stacks.get(key, ()))
+
+    def start(self):
+        with self._lock:
+            self.active += 1
+
+    def stop(self):
+        with self._lock:
+            self.active -= 1
+            if not self.active:
+                self._stacks.clear()
+
+# Shared registry: instrumentation.span records into it while profiling
+spans = SpanRegistry()
+
+class SamplingProfiler:
+    """
+    Samples every thread's Python stack each `interval` seconds and counts
+    collapsed stacks ("root;...;leaf count" lines, as read by
+    flamegraph.pl, speedscope and similar tools).
+
+    Each stack is prefixed with the claim and open spans of the code
+    being sampled. The claim is read when the sample is taken, from the
+    running task's current_claim (or the claim its thread or spans were
+    entered with), so claims already running when profiling started are
+    attributed too. With claim_id set, only samples taken while that
+    claim's code was running are kept. The sampling interval doubles
+    whenever sampling itself takes more than max_overhead of wall time,
+    so the cost stays bounded under load.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.01,
+        claim_id: Optional[str] = None,
+        max_depth: int = 96,
+        max_overhead: float = 0.05,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        loop_thread: Optional[int] = None
+    ):
+        self.interval = interval
+        self.claim_id = claim_id
+        self.max_depth = max_depth
+        self.max_overhead = max_overhead
+        self.loop = loop
+        self.loop_thread = loop_thread
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self.sampling_seconds = 0.0
+        self.elapsed = 0.0
+
+    def run(self, duration: float, stop: Optional[Callable[[], bool]] = None) -> "SamplingProfiler":
+        """Sample for duration seconds (or until stop() is true); blocks the calling thread"""
+        own_thread = threading.get_ident()
+        spans.start()
+        started = time.perf_counter()
+        deadline = started + duration
+        try:
+            while time.perf_counter() < deadline and not (stop and stop()):
+                tick = time.perf_counter()
+                self._sample(own_thread)
+                cost = time.perf_counter() - tick
+                self.sampling_seconds += cost
+                if cost > self.interval * self.max_overhead:
+                    self.interval = min(self.interval * 2, 1.0)
+                time.sleep(max(0.0, self.interval - cost))
+        finally:
+            spans.stop()
+            self.elapsed = time.perf_counter() - started
+        return self
+
+    def _sample(self, own_thread: int):
+        loop_task = asyncio.current_task(self.loop) if self.loop is not None else None
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            if thread_id == self.loop_thread and loop_task is not None:
+                key, claim = id(loop_task), task_claim(loop_task)
+            else:
+                key, claim = thread_id, thread_claim(thread_id)
+            open_spans = spans.lookup(key)
+            claim = claim or next((c for c, _ in reversed(open_spans) if c), None)
+            if self.claim_id is not None and claim != self.claim_id:
+                self.dropped += 1
+                continue
+
+            frames = []
+            while frame is not None and len(frames) < self.max_depth:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            labels = ([f"claim {claim}"] if claim else []) + [f"span {stage}" for _, stage in open_spans]
+            self.stacks[";".join(labels + frames[::-1])] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict:
+        return {
+            "samples": self.samples,
+            "dropped_samples": self.dropped,
+            "unique_stacks": len(self.stacks),
+            "seconds": round(self.elapsed, 2),
+            "final_interval_ms": round(self.interval * 1000, 2),
+            "overhead": round(self.sampling_seconds / self.elapsed, 4) if self.elapsed else 0.0
+        }
+
+_LIBRARY_MARKERS = ("site-packages" + os.sep, f"python{sys.version_info[0]}.{sys.version_info[1]}" + os.sep)
+
+def _short_path(filename: str) -> str:
+    """Path relative to site-packages, the standard library or the working directory"""
+    for marker in _LIBRARY_MARKERS:
+        if marker in filename:
+            return filename.rsplit(marker, 1)[1]
+    try:
+        return os.path.relpath(filename)
+    except ValueError:
+        return filename
@@ -0,0 +1,223 @@
+"""
+Claim Progress Hub
+Fans out pipeline progress events to SSE / WebSocket subscribers with resumable event ids
+"""
+
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.core.logging import logger
+
+# Claim the current task is working on; pipeline code publishes without passing ids around
+current_claim: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_claim", default=None)
+
+TERMINAL_EVENTS = {"completed", "error", "rejected"}
+
+# Claim per asyncio task (or thread) entered with ProgressHub.claim, for readers on
+# other threads such as the profiler; before Python 3.12 they cannot read a task's context
+_claim_owners: Dict[int, str] = {}
+
+def execution_key() -> int:
+    """Id of the running asyncio task, or of the thread outside an event loop"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # No running loop: a worker thread
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+def task_claim(task: Optional[asyncio.Task]) -> Optional[str]:
+    """Claim a task (possibly running on another thread) is working on right now"""
+    if task is None:
+        return None
+    get_context = getattr(task, "get_context", None)  # Python 3.12+
+    if get_context is not None:
+        return get_context().get(current_claim)
+    return _claim_owners.get(id(task))
+
+def thread_claim(thread_id: int) -> Optional[str]:
+    """Claim entered on a thread outside an event loop"""
+    return _claim_owners.get(thread_id)
+
+@dataclass
+class ProgressEvent:
+    """One progress event; ids increase per claim"""
+    id: int
+    claim_id: str
+    type: str
+    data: Dict[str, Any]
+    timestamp: float
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+class _ClaimChannel:
+    def __init__(self, buffer_size: int):
+        self.events: Deque[ProgressEvent] = deque(maxlen=buffer_size)
+        self.next_id = 1
+        self.closed = False
+        self.updated_at = time.monotonic()
+        # Replaced on every publish: waking all subscribers is a single set()
+        self.wakeup = asyncio.Event()
+
+class ProgressHub:
+    """
+    Per-claim ring buffers of progress events.
+
+    Subscribers replay buffered events after their last seen id, then
+    all wait on one asyncio.Event per claim, so an idle subscriber costs
+    a suspended coroutine and nothing per event published elsewhere.
+    Finished claims are kept for retention_seconds so late or
+    reconnecting clients still see the final events.
+    """
+
+    def __init__(self, buffer_size: int = 256, max_claims: int = 10000, retention_seconds: float = 3600.0):
+        self.buffer_size = buffer_size
+        self.max_claims = max_claims
+        self.retention_seconds = retention_seconds
+        self._channels: "OrderedDict[str, _ClaimChannel]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers = 0
+        self._channel_created = asyncio.Event()  # Replaced whenever a channel is created
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Loop that owns the channels (events published from threads are handed to it)"""
+        self._loop = loop
+
+    @contextmanager
+    def claim(self, claim_id: str):
+        """Attribute events published inside the block to claim_id"""
+        token = current_claim.set(claim_id)
+        key = execution_key()
+        previous = _claim_owners.get(key)
+        _claim_owners[key] = claim_id
+        try:
+            yield
+        finally:
+            current_claim.reset(token)
+            if previous is None:
+                del _claim_owners[key]
+            else:
+                _claim_owners[key] = previous
+
+    def publish(self, event_type: str, data: Optional[Dict] = None, claim_id: Optional[str] = None):
+        """Publish an event for claim_id, or for the current claim if not given"""
+        claim_id = claim_id or current_claim.get()
+        if claim_id is None:
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if self._loop is not None and running is not self._loop:
+            # Called from a worker thread
+            self._loop.call_soon_threadsafe(self._publish, claim_id, event_type, data or {})
+        else:
+            self._publish(claim_id, event_type, data or {})
+
+    def _publish(self, claim_id: str, event_type: str, data: Dict):
+        channel = self._channel(claim_id)
+        event = ProgressEvent(channel.next_id, claim_id, event_type, data, time.time())
+        channel.next_id += 1
+        channel.events.append(event)
+        channel.updated_at = time.monotonic()
+        # A finished claim reopens when it is processed again (added documents)
+        channel.closed = event_type in TERMINAL_EVENTS
+
+        wakeup, channel.wakeup = channel.wakeup, asyncio.Event()
+        wakeup.set()
+
+    async def subscribe(
+        self,
+        claim_id: str,
+        last_event_id: Optional[int] = None,
+        heartbeat_seconds: float = 15.0,
+        wait_for_channel: bool = True
+    ) -> AsyncIterator[Optional[ProgressEvent]]:
+        """
+        Events after last_event_id until the claim finishes.
+
+        Yields None when nothing happened for heartbeat_seconds so the
+        transport can send a keepalive. Subscribing never creates a
+        channel: for a claim that has not published yet the subscriber
+        waits for its first event, or ends at once without
+        wait_for_channel (a finished claim whose channel was pruned).
+        """
+        last_id = last_event_id or 0
+        self._subscribers += 1
+        try:
+            channel = self._channels.get(claim_id)
+            while channel is None:
+                if not wait_for_channel:
+                    return
+                created = self._channel_created
+                try:
+                    await asyncio.wait_for(created.wait(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+                channel = self._channels.get(claim_id)
+
+            while True:
+                if channel.events and channel.events[0].id > last_id + 1 and last_id:
+                    # The ring buffer dropped events this client has not seen
+                    yield ProgressEvent(last_id, claim_id, "gap", {"resume_from": channel.events[0].id}, time.time())
+
+                # Events published while this subscriber was suspended in a
+                # yield are picked up by scanning again before honouring closed
+                new_events = [event for event in channel.events if event.id > last_id]
+                if new_events:
+                    for event in new_events:
+                        last_id = event.id
+                        yield event
+                    continue
+
+                if channel.closed:
+                    return
+
+                wakeup = channel.wakeup
+                try:
+                    await asyncio.wait_for(wakeup.wait(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers -= 1
+
+    def has_channel(self, claim_id: str) -> bool:
+        return claim_id in self._channels
+
+    def stats(self) -> Dict:
+        return {"claims": len(self._channels), "subscribers": self._subscribers}
+
+    def _channel(self, claim_id: str) -> _ClaimChannel:
+        channel = self._channels.get(claim_id)
+        if channel is None:
+            self._prune()
+            channel = self._channels[claim_id] = _ClaimChannel(self.buffer_size)
+            created, self._channel_created = self._channel_created, asyncio.Event()
+            created.set()
+        self._channels.move_to_end(claim_id)
+        return channel
+
+    def _prune(self):
+        now = time.monotonic()
+        for claim_id, channel in list(self._channels.items()):
+            if channel.closed and now - channel.updated_at > self.retention_seconds:
+                del self._channels[claim_id]
+
+        while len(self._channels) >= self.max_claims:
+            claim_id, _ = self._channels.popitem(last=False)
+            logger.debug(f"Dropped progress channel for claim {claim_id}")
+
+# Shared hub: pipeline services publish here, the API streams from here
+progress = ProgressHub()
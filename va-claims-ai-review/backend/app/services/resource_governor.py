@@ -0,0 +1,180 @@
+"""
+Resource Governor
+Per-library thread budgets and CPU affinity for OCR and inference work
+
+Import this before numpy, torch or cv2 and call apply_environment():
+BLAS and OpenMP read their thread counts once, when they are loaded.
+"""
+
+import os
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+
+from app.core.logging import logger
+
+# OpenMP / BLAS runtimes read these when first loaded
+_BLAS_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on (respects cgroup / taskset limits)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+@dataclass
+class ThreadBudget:
+    """
+    Thread counts for one server process and its OCR worker processes.
+
+    Inference (torch, BLAS) runs in the server process; OCR (OpenCV,
+    Tesseract) runs in shard workers that are single-threaded each, so
+    OCR parallelism is the number of workers.
+    """
+    torch_threads: int
+    torch_interop_threads: int
+    blas_threads: int
+    opencv_threads: int
+    tesseract_threads: int
+    ocr_workers: int
+    ocr_cpus: List[int] = field(default_factory=list)  # Empty: no pinning
+    inference_cpus: List[int] = field(default_factory=list)
+
+    @classmethod
+    def split(cls, cpus: List[int], server_workers: int = 1, ocr_share: float = 0.5, pin: bool = False) -> "ThreadBudget":
+        """
+        Divide this server worker's share of cpus between OCR and inference.
+
+        With several server workers each gets cpus // server_workers
+        cores. A worker cannot tell which cores are its own, so pinning
+        only happens with a single worker; pin workers in the deployment
+        (taskset, cgroup cpusets) and run each with WEB_CONCURRENCY=1.
+        """
+        per_worker = max(1, len(cpus) // max(1, server_workers))
+        pin = pin and server_workers <= 1 and per_worker > 1
+        ocr_cores = min(per_worker - 1, max(1, round(per_worker * ocr_share))) if per_worker > 1 else 1
+        inference_cores = max(1, per_worker - ocr_cores)
+        return cls(
+            torch_threads=inference_cores,
+            torch_interop_threads=1,
+            blas_threads=inference_cores,
+            opencv_threads=1,
+            tesseract_threads=1,
+            ocr_workers=ocr_cores,
+            ocr_cpus=cpus[:ocr_cores] if pin else [],
+            inference_cpus=cpus[ocr_cores:ocr_cores + inference_cores] if pin else []
+        )
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        """Budget from RESOURCE_* settings; explicit per-library counts override the split"""
+        budget = cls.split(
+            available_cpus(),
+            server_workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+            ocr_share=float(os.getenv("RESOURCE_OCR_SHARE", "0.5")),
+            pin=os.getenv("RESOURCE_PIN_CPUS", "false").lower() == "true"
+        )
+        overrides = {
+            "torch_threads": "RESOURCE_TORCH_THREADS",
+            "blas_threads": "RESOURCE_BLAS_THREADS",
+            "opencv_threads": "RESOURCE_OPENCV_THREADS",
+            "tesseract_threads": "RESOURCE_TESSERACT_THREADS",
+            "ocr_workers": "PDF_SHARD_WORKERS",
+        }
+        for name, var in overrides.items():
+            if var in os.environ:
+                setattr(budget, name, int(os.environ[var]))
+        return budget
+
+class ResourceGovernor:
+    """Applies a ThreadBudget to the server process and to OCR workers"""
+
+    def __init__(self, budget: ThreadBudget, enabled: bool = True):
+        self.budget = budget
+        self.enabled = enabled
+        self._applied: Dict[str, object] = {}
+        self._blas_limits = None  # threadpoolctl handle; must stay referenced
+        self._operator_env: List[str] = []  # Thread variables the deployment set itself
+
+    @classmethod
+    def from_env(cls) -> "ResourceGovernor":
+        return cls(ThreadBudget.from_env(), enabled=os.getenv("RESOURCE_GOVERNOR_ENABLED", "true").lower() == "true")
+
+    def apply_environment(self):
+        """
+        Set thread variables for libraries not yet imported (call first thing)
+
+        Variables the operator already set are left alone, and the BLAS
+        limit is then not re-applied at runtime either.
+        """
+        if not self.enabled:
+            return
+        self._operator_env = [var for var in (*_BLAS_ENV, "OMP_THREAD_LIMIT") if var in os.environ]
+        for var in _BLAS_ENV:
+            os.environ.setdefault(var, str(self.budget.blas_threads))
+        # Tesseract runs as a subprocess and reads this at every call
+        os.environ.setdefault("OMP_THREAD_LIMIT", str(self.budget.tesseract_threads))
+
+    def apply(self):
+        """Limit already-loaded thread pools in the server process and pin it to the inference CPUs"""
+        if not self.enabled:
+            return
+        budget = self.budget
+        try:
+            import torch
+            torch.set_num_threads(budget.torch_threads)
+            try:
+                torch.set_num_interop_threads(budget.torch_interop_threads)
+            except RuntimeError:
+                pass  # Only settable before the first parallel torch operation
+            self._applied["torch_threads"] = torch.get_num_threads()
+        except ImportError:
+            pass
+
+        self._apply_opencv()
+        if not set(self._operator_env).intersection(_BLAS_ENV):
+            self._apply_blas(budget.blas_threads)
+        self._pin(budget.inference_cpus)
+        logger.info(f"Resource budget applied: {self.state()}")
+
+    def init_ocr_worker(self):
+        """OCR worker process: single-threaded libraries, pinned to the OCR CPUs"""
+        if not self.enabled:
+            return
+        # Inherited from the server when it or the operator set it
+        os.environ.setdefault("OMP_THREAD_LIMIT", str(self.budget.tesseract_threads))
+        self._apply_opencv()
+        self._apply_blas(1)
+        self._pin(self.budget.ocr_cpus)
+
+    def _apply_opencv(self):
+        try:
+            import cv2
+            cv2.setNumThreads(self.budget.opencv_threads)
+            self._applied["opencv_threads"] = cv2.getNumThreads()
+        except ImportError:
+            pass
+
+    def _apply_blas(self, threads: int):
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:  # Optional: the environment variables still apply at import time
+            return
+        self._blas_limits = threadpool_limits(limits=threads)
+        self._applied["blas_threads"] = threads
+
+    def _pin(self, cpus: List[int]):
+        if not cpus or not hasattr(os, "sched_setaffinity"):
+            return
+        try:
+            os.sched_setaffinity(0, cpus)
+            self._applied["cpus"] = cpus
+        except OSError as e:
+            logger.warning(f"Could not pin process {os.getpid()} to CPUs {cpus}: {e}")
+
+    def state(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "budget": asdict(self.budget),
+            "applied": dict(self._applied),
+            "operator_env": {var: os.environ.get(var) for var in self._operator_env}
+        }
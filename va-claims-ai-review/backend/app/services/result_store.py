@@ -0,0 +1,226 @@
+"""
+Claim Result Store
+Indexed, separately encoded claim results for paginated and streaming retrieval
+"""
+
+import gzip
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the standard library encoder
+    orjson = None
+
+def _default(obj: Any):
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if is_dataclass(obj):
+        return asdict(obj)
+    if hasattr(obj, "tolist"):  # numpy scalars and arrays
+        return obj.tolist()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+def dumps(obj: Any) -> bytes:
+    """JSON-encode to bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+class ClaimResult:
+    """
+    One published version of a claim's results.
+
+    Evidence is flattened once and indexed by condition, document and
+    (document, page); a page of results is a slice of an index, so the
+    cost of a request does not grow with the claim. Summary, annotations
+    and exam request are encoded and gzipped on first request and reused.
+    """
+
+    def __init__(self, claim_id: str, status: str, analysis, annotations: Optional[Dict], exam_request: Optional[Dict]):
+        self.claim_id = claim_id
+        self.status = status
+        self.analysis = analysis
+        self.annotations = annotations
+        self.exam_request = exam_request
+        self.evidence = [e for condition in analysis.conditions for e in condition.evidence_items]
+        self.by_condition: Dict[str, List[int]] = {}
+        self.by_document: Dict[str, List[int]] = {}
+        self.by_page: Dict[Tuple[str, int], List[int]] = {}
+        for i, e in enumerate(self.evidence):
+            self.by_condition.setdefault(e.condition, []).append(i)
+            self.by_document.setdefault(e.document_id, []).append(i)
+            self.by_page.setdefault((e.document_id, e.page_number), []).append(i)
+        self._encoded: Dict[str, Tuple[bytes, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def summary(self) -> Dict:
+        analysis = self.analysis
+        return {
+            "claim_id": analysis.claim_id,
+            "status": self.status,
+            "version": analysis.version,
+            "provisional": analysis.provisional,
+            "claim_type": analysis.claim_type,
+            "evidence_strength": analysis.evidence_strength,
+            "confidence_score": analysis.confidence_score,
+            "conditions": [
+                {
+                    "name": c.name,
+                    "icd10_codes": c.icd10_codes,
+                    "evidence_count": len(c.evidence_items),
+                    "has_in_service_event": bool(c.in_service_event),
+                    "has_nexus": bool(c.nexus_statement),
+                    "continuity_count": len(c.continuity_evidence or [])
+                }
+                for c in analysis.conditions
+            ],
+            "evidence_count": len(self.evidence),
+            "timeline_count": len(analysis.timeline),
+            "missing_evidence": analysis.missing_evidence,
+            "recommendations": analysis.recommendations,
+            "dbq_needed": analysis.dbq_needed,
+            "presumptive_conditions": analysis.presumptive_conditions,
+            "processing_time": analysis.processing_time,
+            "processing_report": analysis.processing_report
+        }
+
+    def resource(self, name: str) -> Optional[Tuple[bytes, bytes]]:
+        """(json, gzipped json) for "summary", "annotations" or "exam_request"""
+        with self._lock:
+            if name not in self._encoded:
+                if name == "summary":
+                    value = self.summary()
+                elif name == "annotations":
+                    value = self.annotations
+                elif name == "exam_request":
+                    value = self.exam_request
+                else:
+                    raise KeyError(name)
+                if value is None:
+                    return None
+                body = dumps(value)
+                self._encoded[name] = (body, gzip.compress(body, compresslevel=6))
+            return self._encoded[name]
+
+    def select(
+        self,
+        condition: Optional[str] = None,
+        document_id: Optional[str] = None,
+        page: Optional[int] = None
+    ) -> List[int]:
+        """Evidence indices matching the filters, in result order (page needs document_id)"""
+        if page is not None and document_id is None:
+            raise ValueError("page filter requires document_id")
+        if document_id is not None and page is not None:
+            indices = self.by_page.get((document_id, page), [])
+        elif document_id is not None:
+            indices = self.by_document.get(document_id, [])
+        elif condition is not None:
+            return self.by_condition.get(condition, [])
+        else:
+            return range(len(self.evidence))
+
+        if condition is not None:
+            indices = [i for i in indices if self.evidence[i].condition == condition]
+        return indices
+
+    def evidence_page(self, indices, cursor: int = 0, limit: int = 100) -> Dict:
+        items = [self.evidence_item(i) for i in indices[cursor:cursor + limit]]
+        next_cursor = cursor + limit if cursor + limit < len(indices) else None
+        return {"items": items, "total": len(indices), "next_cursor": next_cursor}
+
+    def timeline_page(self, cursor: int = 0, limit: int = 100) -> Dict:
+        timeline = self.analysis.timeline
+        next_cursor = cursor + limit if cursor + limit < len(timeline) else None
+        return {"items": timeline[cursor:cursor + limit], "total": len(timeline), "next_cursor": next_cursor}
+
+    def evidence_item(self, index: int) -> Dict:
+        e = self.evidence[index]
+        return {
+            "id": index,
+            "document_id": e.document_id,
+            "page_number": e.page_number,
+            "condition": e.condition,
+            "type": e.type,
+            "relevance": e.relevance,
+            "confidence": e.confidence,
+            "date": e.date,
+            "provider": e.provider,
+            "diagnosis_codes": e.diagnosis_codes,
+            "highlights": e.highlights,
+            "text": e.text
+        }
+
+    def iter_ndjson(self, indices, compress: bool = False, batch_size: int = 200) -> Iterator[bytes]:
+        """
+        Evidence as NDJSON, encoded batch by batch as the client reads.
+
+        With compress=True the stream is gzip, flushed after every batch
+        so the client can decode rows as they arrive.
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        for start in range(0, len(indices), batch_size):
+            chunk = b"".join(
+                dumps(self.evidence_item(i)) + b"\n" for i in indices[start:start + batch_size]
+            )
+            if compressor is None:
+                yield chunk
+            else:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressor is not None:
+            yield compressor.flush()
+
+class ResultStore:
+    """
+    Latest published result and status per claim (in memory, LRU-bounded).
+
+    Statuses are kept for more claims than results (max_statuses) since
+    claims that are queued, failed or rejected never publish a result.
+    """
+
+    def __init__(self, max_claims: int = 1000, max_statuses: Optional[int] = None):
+        self.max_claims = max_claims
+        self.max_statuses = max_statuses or max_claims * 10
+        self._results: "OrderedDict[str, ClaimResult]" = OrderedDict()
+        self._status: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, claim_id: str, status: str, analysis, annotations: Optional[Dict] = None, exam_request: Optional[Dict] = None):
+        result = ClaimResult(claim_id, status, analysis, annotations, exam_request)
+        with self._lock:
+            current = self._results.get(claim_id)
+            if current is not None and current.analysis.version > analysis.version:
+                return  # A newer version was published while this one was being saved
+            self._results[claim_id] = result
+            self._results.move_to_end(claim_id)
+            while len(self._results) > self.max_claims:
+                evicted, _ = self._results.popitem(last=False)
+                self._status.pop(evicted, None)
+        self.set_status(claim_id, status, version=analysis.version, provisional=analysis.provisional)
+
+    def set_status(self, claim_id: str, status: str, **details):
+        with self._lock:
+            entry = self._status.setdefault(claim_id, {"claim_id": claim_id})
+            entry.update(details, status=status, updated_at=datetime.utcnow().isoformat())
+            self._status.move_to_end(claim_id)
+            while len(self._status) > self.max_statuses:
+                evicted, _ = self._status.popitem(last=False)
+                self._results.pop(evicted, None)
+
+    def status(self, claim_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._status.get(claim_id)
+            return dict(entry) if entry else None
+
+    def get(self, claim_id: str) -> Optional[ClaimResult]:
+        with self._lock:
+            return self._results.get(claim_id)
@@ -0,0 +1,291 @@
+"""
+Shadow Evaluation
+Runs sampled claims through the baseline and a candidate pipeline configuration and diffs the outcomes
+"""
+
+import asyncio
+import copy
+import hashlib
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from app.core.logging import logger
+from app.services.archive_ingest import ArchiveMember
+from app.services.degradation import PROFILES, FidelityLevel, FidelityProfile
+from app.services.document_processor import DocumentProcessor
+from app.services.instrumentation import collect_stage_times, span
+from app.services.memory_accounting import current_tracker
+from app.services.progress import current_claim
+
+class _ReadOnlyBoilerplate:
+    """The live boilerplate table, without learning from shadow runs"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def session(self, conditions=()):
+        return self.table.session(conditions)
+
+    def commit(self, session):
+        pass
+
+class ShadowEvaluator:
+    """
+    Re-runs a fraction of completed claims through the baseline (full
+    fidelity) and a candidate profile and records how far the candidate's
+    outcome differs and how much faster each stage ran.
+
+    Runs happen after the claim's result is published, on a separate
+    thread and event loop, at most max_concurrent at a time; claims
+    arriving while that many are running, or while the service is
+    degraded, are not sampled. Both runs start cold (no page artifacts,
+    cached embeddings or OCR cache) so their timings are comparable, and
+    neither writes to the artifact store, the boilerplate table, progress
+    streams or the Prometheus metrics. Uploads are held in memory until
+    the claim's runs finish.
+    """
+
+    def __init__(
+        self,
+        candidate: FidelityProfile,
+        fraction: float = 0.0,
+        max_concurrent: int = 1,
+        history: int = 200
+    ):
+        self.baseline = PROFILES[FidelityLevel.FULL]
+        self.candidate = candidate
+        self.fraction = fraction
+        self.max_concurrent = max_concurrent
+        self.reports: deque = deque(maxlen=history)
+        self.counts = {"sampled": 0, "skipped_busy": 0, "skipped_degraded": 0, "failed": 0}
+        self._running = 0
+        self._tasks = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.fraction > 0
+
+    def select(self, claim_id: str, fidelity: Optional[FidelityProfile] = None) -> bool:
+        """Whether to shadow this claim; the same claim id always gets the same answer"""
+        if not self.enabled:
+            return False
+        digest = hashlib.sha256(claim_id.encode()).digest()
+        if int.from_bytes(digest[:8], "big") / 2**64 >= self.fraction:
+            return False
+        with self._lock:
+            if fidelity is not None and fidelity.level != FidelityLevel.FULL:
+                self.counts["skipped_degraded"] += 1
+                return False
+            if self._running >= self.max_concurrent:
+                self.counts["skipped_busy"] += 1
+                return False
+            self._running += 1
+            self.counts["sampled"] += 1
+        return True
+
+    async def start(self, claim_id: str, files, doc_processor: DocumentProcessor, ai_engine):
+        """
+        Start the runs for a claim accepted by select(). The uploads are
+        copied first so the runs can outlive the request; failures are
+        logged and never reach the claim.
+        """
+        try:
+            captured = []
+            for file in files:
+                await file.seek(0)
+                content = await file.read()
+                captured.append(ArchiveMember(file.filename, content, hashlib.sha256(content).hexdigest()))
+        except Exception as e:
+            logger.error(f"Shadow evaluation of claim {claim_id} not started: {e}")
+            self._finished(failed=True)
+            return
+
+        task = asyncio.create_task(asyncio.to_thread(self._run_thread, claim_id, captured, doc_processor, ai_engine))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _finished(self, failed: bool = False):
+        with self._lock:
+            self._running -= 1
+            if failed:
+                self.counts["failed"] += 1
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+    def _run_thread(self, claim_id: str, files: List[ArchiveMember], doc_processor: DocumentProcessor, ai_engine):
+        try:
+            report = asyncio.run(self.evaluate(claim_id, files, doc_processor, ai_engine))
+        except Exception as e:
+            logger.error(f"Shadow evaluation of claim {claim_id} failed: {e}")
+            self._finished(failed=True)
+            return
+        self.reports.append(report)
+        self._finished()
+        logger.info(
+            f"Shadow evaluation of claim {claim_id} ({self.candidate.level.value}): "
+            f"speedup {report['speedup']}x, agreement {report['agreement']}"
+        )
+
+    async def evaluate(
+        self,
+        claim_id: str,
+        files: List[ArchiveMember],
+        doc_processor: DocumentProcessor,
+        ai_engine
+    ) -> Dict:
+        """Run the baseline then the candidate on the claim's uploads and compare them"""
+        # Not part of the claim any more: no progress events or memory accounting
+        current_claim.set(None)
+        current_tracker.set(None)
+
+        engine = copy.copy(ai_engine)
+        engine.artifacts = None
+        engine.boilerplate = _ReadOnlyBoilerplate(ai_engine.boilerplate)
+        for profile in (self.baseline, self.candidate):
+            await engine._get_nlp(profile.spacy_model)  # Model loading is not part of either run
+
+        baseline = await self._run(claim_id, files, doc_processor, engine, self.baseline)
+        candidate = await self._run(claim_id, files, doc_processor, engine, self.candidate)
+        stages = {}
+        for stage in sorted(set(baseline["stages"]) | set(candidate["stages"])):
+            before, after = baseline["stages"].get(stage, 0.0), candidate["stages"].get(stage, 0.0)
+            stages[stage] = {
+                "baseline_s": round(before, 4),
+                "candidate_s": round(after, 4),
+                "speedup": round(before / after, 3) if after else None
+            }
+
+        return {
+            "claim_id": claim_id,
+            "candidate": self.candidate.to_dict(),
+            "finished_at": time.time(),
+            "pages": sum(len(doc["pages"]) for doc in baseline["documents"]),
+            "speedup": round(baseline["seconds"] / candidate["seconds"], 3) if candidate["seconds"] else None,
+            "stages": stages,
+            "agreement": compare_outcomes(baseline, candidate)
+        }
+
+    async def _run(
+        self,
+        claim_id: str,
+        files: List[ArchiveMember],
+        doc_processor: DocumentProcessor,
+        engine,
+        profile: FidelityProfile
+    ) -> Dict:
+        # In-process extraction with an empty OCR cache and no artifact store
+        processor = DocumentProcessor(shard_workers=0)
+        processor.ocr_config = doc_processor.ocr_config
+        processor.min_page_text_chars = doc_processor.min_page_text_chars
+        processor.min_ocr_region_ratio = doc_processor.min_ocr_region_ratio
+
+        started = time.perf_counter()
+        with collect_stage_times(export=False) as stages:
+            documents = []
+            for file in files:
+                await file.seek(0)
+                with span("document"):
+                    documents.append(await processor.process_document(file, fidelity=profile))
+            duplicates = await processor.find_duplicates(claim_id, documents)
+            with span("analysis"):
+                analysis = await engine.analyze_claim_evidence(
+                    claim_id, documents, fidelity=profile, duplicates=duplicates
+                )
+        return {
+            "documents": documents,
+            "analysis": analysis,
+            "stages": dict(stages),
+            "seconds": time.perf_counter() - started
+        }
+
+    def summary(self) -> Dict:
+        """Agreement and speedup over the recent reports"""
+        reports = list(self.reports)
+        agreement, speedups = {}, {}
+        for report in reports:
+            for metric, value in report["agreement"].items():
+                if value is not None:
+                    agreement.setdefault(metric, []).append(value)
+            for stage, timing in report["stages"].items():
+                if timing["speedup"] is not None:
+                    speedups.setdefault(stage, []).append(timing["speedup"])
+        overall = [r["speedup"] for r in reports if r["speedup"] is not None]
+
+        return {
+            "enabled": self.enabled,
+            "fraction": self.fraction,
+            "baseline": self.baseline.to_dict(),
+            "candidate": self.candidate.to_dict(),
+            "claims": len(reports),
+            "counts": dict(self.counts),
+            "running": self._running,
+            "speedup": round(statistics.median(overall), 3) if overall else None,
+            "stage_speedup": {
+                stage: {"median": round(statistics.median(values), 3), "min": round(min(values), 3)}
+                for stage, values in sorted(speedups.items())
+            },
+            "agreement": {
+                metric: {"mean": round(statistics.fmean(values), 4), "min": round(min(values), 4)}
+                for metric, values in sorted(agreement.items())
+            }
+        }
+
+def compare_outcomes(baseline: Dict, candidate: Dict) -> Dict[str, Optional[float]]:
+    """
+    Agreement of the candidate with the baseline, from 0 to 1 (None when
+    neither run produced anything to compare). Documents are matched by
+    upload order, since document ids differ between runs.
+    """
+    before, after = baseline["analysis"], candidate["analysis"]
+    base_docs, cand_docs = baseline["documents"], candidate["documents"]
+    base_pages = [page.get("type") for doc in base_docs for page in doc["pages"]]
+    cand_pages = [page.get("type") for doc in cand_docs for page in doc["pages"]]
+    page_texts = [
+        _jaccard(set(a.split()), set(b.split()))
+        for x, y in zip(base_docs, cand_docs)
+        for (_, a), (_, b) in zip(x["content"].iter_pages(), y["content"].iter_pages())
+    ]
+
+    base_evidence = _evidence_relevance(before, base_docs)
+    cand_evidence = _evidence_relevance(after, cand_docs)
+    shared = set(base_evidence) & set(cand_evidence)
+
+    return {
+        "page_text": round(statistics.fmean(page_texts), 4) if page_texts else None,
+        "document_type": _share_equal([d["type"] for d in base_docs], [d["type"] for d in cand_docs]),
+        "page_type": _share_equal(base_pages, cand_pages),
+        "claimed_conditions": _jaccard({c.name for c in before.conditions}, {c.name for c in after.conditions}),
+        "evidence_recall": round(len(shared) / len(base_evidence), 4) if base_evidence else None,
+        "evidence_precision": round(len(shared) / len(cand_evidence), 4) if cand_evidence else None,
+        "evidence_relevance": (
+            round(sum(base_evidence[k] == cand_evidence[k] for k in shared) / len(shared), 4) if shared else None
+        ),
+        "evidence_strength": round(1 - min(1.0, abs(before.evidence_strength - after.evidence_strength)), 4),
+        "missing_evidence": _jaccard(set(before.missing_evidence), set(after.missing_evidence)),
+        "dbq_needed": _jaccard(set(before.dbq_needed), set(after.dbq_needed))
+    }
+
+def _evidence_relevance(analysis, documents: List[Dict]) -> Dict[Tuple, str]:
+    """(document position, page, condition, text) -> relevance for every evidence item"""
+    position = {doc["id"]: i for i, doc in enumerate(documents)}
+    return {
+        (position.get(e.document_id), e.page_number, e.condition, hashlib.sha1(e.text.encode()).hexdigest()): e.relevance.value
+        for condition in analysis.conditions
+        for e in condition.evidence_items
+    }
+
+def _jaccard(a: set, b: set) -> Optional[float]:
+    if not a and not b:
+        return None
+    return round(len(a & b) / len(a | b), 4)
+
+def _share_equal(a: List, b: List) -> Optional[float]:
+    if not a and not b:
+        return None
+    return round(sum(x == y for x, y in zip(a, b)) / max(len(a), len(b)), 4)
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the VA Claims AI Review backend
+Run modules with `python -m benchmarks.<name>` from the backend directory
+"""
@@ -0,0 +1,243 @@
+"""
+Deterministic synthetic claim corpus
+
+    python -m benchmarks.corpus --pages 500 --seed 7 --output /tmp/claim-500
+
+A claim is a 526EZ, a DD-214, service treatment records, VA treatment
+notes (some with nexus opinions) and a DOCX treatment log with a large
+table. A share of the record pages are scanned: rendered to images with
+noise and skew and stored as image-only PDF pages, so they need OCR.
+The same (pages, seed, scanned_ratio) always gives the same bytes.
+"""
+
+import argparse
+import io
+import math
+import random
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import fitz
+import numpy as np
+from docx import Document
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+CONDITIONS = [
+    ("tinnitus", "H93.13", "Patient reports constant ringing in both ears since weapons qualification and artillery training."),
+    ("hearing loss", "H90.3", "Audiogram shows bilateral sensorineural hearing loss at 3000-4000 Hz."),
+    ("PTSD", "F43.10", "Veteran reports nightmares, hypervigilance and avoidance after convoy IED attack."),
+    ("lumbar strain", "S39.012A", "Low back pain after lifting injury during vehicle maintenance, limited flexion."),
+    ("sleep apnea", "G47.33", "Sleep study confirms obstructive sleep apnea, CPAP prescribed."),
+    ("migraine", "G43.909", "Prostrating migraine headaches two to three times a month."),
+    ("type 2 diabetes", "E11.9", "Elevated A1C of 7.8, started on metformin."),
+    ("hypertension", "I10", "Blood pressure 152/96 on repeated readings, started lisinopril."),
+    ("asthma", "J45.40", "Wheezing and shortness of breath after deployment, albuterol prescribed."),
+]
+PROVIDERS = ["Dr. Alvarez", "Dr. Chen", "Dr. Okafor", "Dr. Patel", "Dr. Smith", "Dr. Nguyen"]
+FACILITIES = ["Tampa VA Medical Center", "Walter Reed Army Medical Center", "Fort Hood Clinic", "Bay Pines VA Hospital"]
+DEPLOYMENTS = [
+    ("Republic of Vietnam", 1968),
+    ("Kuwait and Iraq (Operation Desert Storm)", 1991),
+    ("Afghanistan", 2009),
+    ("Iraq", 2005),
+    ("Germany", 1985),
+]
+ROWS_PER_PAGE = 40  # DOCX table rows to a printed page
+# Fixed timestamps: generated files must not differ between runs
+FIXED_DATE = "D:20240101000000Z"
+FIXED_ZIP_TIME = (2024, 1, 1, 0, 0, 0)
+FILLER = (
+    "Reviewed past medical history and current medications. Vital signs within normal limits "
+    "except as noted. Patient counseled on treatment options and follow-up plan."
+)
+
+@dataclass
+class SyntheticDocument:
+    filename: str
+    content: bytes
+    kind: str
+    pages: int
+    scanned_pages: int = 0
+
+@dataclass
+class SyntheticClaim:
+    seed: int
+    conditions: List[str]
+    deployment: str
+    documents: List[SyntheticDocument] = field(default_factory=list)
+
+    @property
+    def pages(self) -> int:
+        return sum(doc.pages for doc in self.documents)
+
+def generate_claim(pages: int, seed: int = 0, scanned_ratio: float = 0.2, docx_rows: int = 400) -> SyntheticClaim:
+    """A claim of roughly `pages` pages (never fewer than the 526EZ and DD-214)"""
+    rng = random.Random(seed)
+    claimed = rng.sample(CONDITIONS, k=min(len(CONDITIONS), 2 + rng.randint(0, 3)))
+    deployment, year = rng.choice(DEPLOYMENTS)
+    claim = SyntheticClaim(seed, [name for name, _, _ in claimed], deployment)
+
+    claim.documents.append(_text_pdf("526ez.pdf", "526ez", [_form_526ez(rng, claimed)]))
+    claim.documents.append(_text_pdf("dd214.pdf", "dd214", [_dd214(rng, deployment, year)]))
+
+    # The DOCX log takes at most a fifth of the pages; the rest are split
+    # between service treatment records and VA treatment notes
+    docx_rows = min(docx_rows, max(1, pages // 5) * ROWS_PER_PAGE)
+    remaining = max(0, pages - 2 - (docx_rows // ROWS_PER_PAGE if docx_rows else 0))
+    record_docs = max(1, math.ceil(remaining / 60)) if remaining else 0
+    for i in range(record_docs):
+        count = remaining // record_docs + (1 if i < remaining % record_docs else 0)
+        if count == 0:
+            continue
+        kind = "str" if i % 2 == 0 else "treatment"
+        page_texts = [
+            _record_page(rng, kind, claimed, year, n + 1, count) for n in range(count)
+        ]
+        scanned = {n for n in range(count) if rng.random() < scanned_ratio}
+        claim.documents.append(_text_pdf(f"{kind}-{i + 1:03d}.pdf", kind, page_texts, scanned, rng))
+
+    if docx_rows:
+        claim.documents.append(_treatment_log_docx(rng, claimed, year, docx_rows))
+    return claim
+
+def _form_526ez(rng: random.Random, claimed) -> str:
+    lines = [
+        "VA FORM 21-526EZ",
+        "APPLICATION FOR DISABILITY COMPENSATION AND RELATED COMPENSATION BENEFITS",
+        "Page 1 of 1",
+        f"Veteran name: {rng.choice(['John', 'Maria', 'Andre', 'Lisa'])} {rng.choice(['Doe', 'Garcia', 'Brown', 'Lee'])}",
+        "Section V - Claim information",
+        "Conditions claimed: " + ", ".join(name for name, _, _ in claimed) + ".",
+    ]
+    for name, _, _ in claimed:
+        lines.append(f"I am claiming {name}.")
+    return "\n".join(lines)
+
+def _dd214(rng: random.Random, deployment: str, year: int) -> str:
+    return "\n".join([
+        "DD FORM 214",
+        "CERTIFICATE OF RELEASE OR DISCHARGE FROM ACTIVE DUTY",
+        "Page 1 of 1",
+        f"Branch: {rng.choice(['Army', 'Marine Corps', 'Navy', 'Air Force'])}",
+        f"Date entered active duty: {year - 2}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        f"Separation date: {year + 2}-0{rng.randint(1, 9)}-2{rng.randint(0, 8)}",
+        f"Foreign service: {deployment}",
+        "Character of service: Honorable",
+    ])
+
+def _record_page(rng: random.Random, kind: str, claimed, year: int, number: int, total: int) -> str:
+    name, code, finding = rng.choice(claimed)
+    when = date(year, 1, 1) + timedelta(days=rng.randint(0, 365 * 15))
+    provider, facility = rng.choice(PROVIDERS), rng.choice(FACILITIES)
+    header = (
+        "SERVICE TREATMENT RECORD - CHRONOLOGICAL RECORD OF MEDICAL CARE (SF 600)"
+        if kind == "str" else "VA PROGRESS NOTE - MEDICAL RECORD"
+    )
+    lines = [header, f"Page {number} of {total}", f"Date: {when.strftime('%m/%d/%Y')}", f"Provider: {provider}, {facility}"]
+    lines.append(f"Assessment: {name}. {finding} Diagnosis code {code}.")
+    if kind == "treatment" and rng.random() < 0.15:
+        lines.append(
+            f"Medical opinion: it is at least as likely as not that the veteran's {name} was caused by "
+            f"military service (nexus opinion)."
+        )
+    lines += [FILLER] * rng.randint(2, 6)
+    return "\n".join(lines)
+
+def _text_pdf(
+    filename: str,
+    kind: str,
+    page_texts: List[str],
+    scanned: Optional[set] = None,
+    rng: Optional[random.Random] = None
+) -> SyntheticDocument:
+    pdf = fitz.open()
+    for index, text in enumerate(page_texts):
+        page = pdf.new_page(width=612, height=792)
+        if scanned and index in scanned:
+            page.insert_image(page.rect, stream=_scanned_image(text, rng))
+        else:
+            page.insert_textbox(fitz.Rect(54, 54, 558, 738), text, fontsize=10, fontname="helv")
+    pdf.set_metadata({"creationDate": FIXED_DATE, "modDate": FIXED_DATE, "producer": "benchmarks.corpus"})
+    content = pdf.tobytes(deflate=True, no_new_id=True)
+    pdf.close()
+    return SyntheticDocument(filename, content, kind, len(page_texts), len(scanned or ()))
+
+def _scanned_image(text: str, rng: random.Random) -> bytes:
+    """Render text as a noisy, slightly skewed 150 dpi grayscale scan (JPEG, as scanners write)"""
+    width, height = 1275, 1650
+    image = np.full((height, width), 250, np.uint8)
+    y = 90
+    for line in text.split("\n"):
+        for chunk in [line[i:i + 95] for i in range(0, len(line), 95)] or [""]:
+            cv2.putText(image, chunk, (90, y), cv2.FONT_HERSHEY_SIMPLEX, 0.65, 20, 1, cv2.LINE_AA)
+            y += 30
+    angle = rng.uniform(-2.5, 2.5)
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    image = cv2.warpAffine(image, matrix, (width, height), borderValue=250)
+    noise = np.random.default_rng(rng.randint(0, 2**32 - 1)).normal(0, 12, image.shape)
+    image = np.clip(image + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="JPEG", quality=70)
+    return buffer.getvalue()
+
+def _treatment_log_docx(rng: random.Random, claimed, year: int, rows: int) -> SyntheticDocument:
+    document = Document()
+    document.add_heading("Medical Record - Treatment Log", level=1)
+    document.add_paragraph("Summary of treatment and diagnosis history provided by the veteran's clinic.")
+    table = document.add_table(rows=1, cols=5)
+    for cell, title in zip(table.rows[0].cells, ["Date", "Provider", "Condition", "ICD-10", "Notes"]):
+        cell.text = title
+    for _ in range(rows):
+        name, code, finding = rng.choice(claimed)
+        when = date(year, 1, 1) + timedelta(days=rng.randint(0, 365 * 15))
+        values = [when.isoformat(), rng.choice(PROVIDERS), name, code, finding]
+        for cell, value in zip(table.add_row().cells, values):
+            cell.text = value
+    document.core_properties.created = document.core_properties.modified = datetime(2024, 1, 1)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return SyntheticDocument("treatment-log.docx", _fixed_zip_times(buffer.getvalue()), "docx", max(1, rows // ROWS_PER_PAGE))
+
+def _fixed_zip_times(content: bytes) -> bytes:
+    """Rewrite a zip package with fixed member timestamps"""
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(content)) as source, zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            target.writestr(zipfile.ZipInfo(info.filename, FIXED_ZIP_TIME), source.read(info), zipfile.ZIP_DEFLATED)
+    return output.getvalue()
+
+def write_claim(claim: SyntheticClaim, directory: str) -> List[Path]:
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    written = []
+    for doc in claim.documents:
+        target = path / doc.filename
+        target.write_bytes(doc.content)
+        written.append(target)
+    return written
+
+def uploads(claim: SyntheticClaim) -> List[UploadFile]:
+    """The claim's documents as fresh uploads, as the API receives them"""
+    return [UploadFile(io.BytesIO(doc.content), filename=doc.filename) for doc in claim.documents]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scanned-ratio", type=float, default=0.2)
+    parser.add_argument("--docx-rows", type=int, default=400)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    claim = generate_claim(args.pages, args.seed, args.scanned_ratio, args.docx_rows)
+    for path in write_claim(claim, args.output):
+        print(path)
+    print(f"{claim.pages} pages, conditions: {', '.join(claim.conditions)}, deployment: {claim.deployment}")
+
+if __name__ == "__main__":
+    main()
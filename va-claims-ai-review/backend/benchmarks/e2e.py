@@ -0,0 +1,115 @@
+"""
+End-to-end claim benchmarks
+
+    python -m benchmarks.e2e --sizes 10 500 3000 --output e2e.json
+    python -m benchmarks.e2e --sizes 10 500 --baseline e2e-baseline.json
+
+Runs main.process_claim_async on synthetic claims of each size, as the
+API's background task does: documents, analysis, annotations, exam
+request and result storage into a temporary claims database. Models
+are replaced by app.services.model_standins; the OCR cache and artifact
+store start empty for every run. Each result includes the time spent in
+every instrumented stage.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict
+
+from app.services.ai_engine import AIEngine
+from app.services.claim_repository import ClaimRepository
+from app.services.document_processor import DocumentProcessor
+from app.services.instrumentation import STAGE_SECONDS
+from app.services.model_standins import install_model_standins
+from app.services.result_store import ResultStore
+from benchmarks.corpus import generate_claim, uploads
+from benchmarks.report import Report, check_baseline
+
+import main as service
+
+def stage_totals() -> Dict[str, float]:
+    """Seconds spent in each instrumented stage so far in this process"""
+    totals = defaultdict(float)
+    for metric in STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_sum"):
+                totals[sample.labels["stage"]] += sample.value
+    return totals
+
+async def run_claim(claim, ai_engine, shard_workers) -> Dict[str, float]:
+    """Process one claim; returns the seconds spent per stage"""
+    doc_processor = DocumentProcessor(shard_workers=shard_workers)
+    claim_id = await service.create_claim_record(f"BENCH-{claim.seed}-{claim.pages}", "normal")
+    before = stage_totals()
+    try:
+        await service.process_claim_async(claim_id, uploads(claim), doc_processor, ai_engine)
+    finally:
+        doc_processor.close()
+    status = service.app.state.results.status(claim_id)
+    if status["status"] != "completed":
+        raise RuntimeError(f"Claim of {claim.pages} pages finished {status['status']}: {status.get('error')}")
+    after = stage_totals()
+    return {stage: round(after[stage] - before.get(stage, 0.0), 4) for stage in after if after[stage] > before.get(stage, 0.0)}
+
+async def run(args) -> Report:
+    report = Report("e2e", {
+        "sizes": args.sizes,
+        "seed": args.seed,
+        "scanned_ratio": args.scanned_ratio,
+        "repeat": args.repeat,
+        "shard_workers": args.shard_workers
+    })
+
+    with tempfile.TemporaryDirectory() as directory:
+        state = service.app.state
+        state.repository = ClaimRepository(os.path.join(directory, "claims.db"))
+        await state.repository.initialize()
+        state.results = ResultStore()
+        state.memory_accounting = {"enabled": args.memory, "budget_mb": None, "trace_allocations": False}
+
+        ai_engine = AIEngine()
+        await install_model_standins(ai_engine)
+
+        for size in args.sizes:
+            claim = generate_claim(size, args.seed, args.scanned_ratio)
+            samples, stages = [], defaultdict(list)
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                for stage, seconds in (await run_claim(claim, ai_engine, args.shard_workers)).items():
+                    stages[stage].append(seconds)
+                samples.append(time.perf_counter() - started)
+            report.add(
+                f"process_claim.{size}_pages", samples,
+                pages=claim.pages,
+                documents=len(claim.documents),
+                stages={stage: sorted(values)[len(values) // 2] for stage, values in stages.items()}
+            )
+
+        await state.repository.close()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 500, 3000], help="claim sizes in pages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scanned-ratio", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--shard-workers", type=int, default=None, help="PDF shard processes (0 disables)")
+    parser.add_argument("--memory", action="store_true", help="also account per-claim memory")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown of the median")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        report.write(args.output)
+    sys.exit(check_baseline(report, args.baseline, args.threshold))
+
+if __name__ == "__main__":
+    main()
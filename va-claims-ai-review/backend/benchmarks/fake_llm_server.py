@@ -0,0 +1,122 @@
+"""
+Local stand-in for the Anthropic Messages API
+
+    python -m benchmarks.fake_llm_server --port 8089 --latency-ms 400 --error-rate 0.05
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8089 ANTHROPIC_API_KEY=fake uvicorn main:app
+
+Answers POST /v1/messages with deterministic text after a simulated
+latency, fails a fraction of requests with 429/529 (with retry-after),
+rejects requests over its concurrency limit, and reports
+cache_read_input_tokens for system blocks marked with cache_control that
+it has seen before, like the real prompt cache.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from typing import Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+def create_app(
+    latency_ms: float = 400.0,
+    error_rate: float = 0.0,
+    max_concurrency: int = 50,
+    seed: int = 0
+) -> FastAPI:
+    app = FastAPI(title="Fake LLM server")
+    rng = random.Random(seed)
+    cached_prefixes = set()
+    state = {"active": 0}
+    stats: Dict[str, int] = {"requests": 0, "errors": 0, "rejected": 0, "cache_reads": 0}
+
+    def error(status: int, kind: str, message: str) -> JSONResponse:
+        return JSONResponse(
+            {"type": "error", "error": {"type": kind, "message": message}},
+            status_code=status,
+            headers={"retry-after": "1"}
+        )
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+
+        if state["active"] >= max_concurrency:
+            stats["rejected"] += 1
+            return error(429, "rate_limit_error", "Too many concurrent requests")
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return error(rng.choice([429, 529]), "overloaded_error", "Simulated failure")
+
+        state["active"] += 1
+        try:
+            system = body.get("system") or []
+            if isinstance(system, str):
+                system = [{"type": "text", "text": system}]
+            prompt = json.dumps(body["messages"])
+
+            # Tokens approximated as 4 characters; cached prefix = blocks up to the last cache_control
+            input_tokens = (len(prompt) + sum(len(block["text"]) for block in system)) // 4
+            cache_read = 0
+            prefix = ""
+            for block in system:
+                prefix += block["text"]
+                if "cache_control" in block:
+                    key = hashlib.sha256(prefix.encode()).hexdigest()
+                    if key in cached_prefixes:
+                        cache_read = len(prefix) // 4
+                    cached_prefixes.add(key)
+            if cache_read:
+                stats["cache_reads"] += 1
+
+            # Cached prefix tokens are processed faster, as with the real service
+            uncached_share = 1 - cache_read / max(input_tokens, 1)
+            delay = latency_ms * (0.5 + 0.5 * uncached_share) * rng.uniform(0.8, 1.2)
+            await asyncio.sleep(delay / 1000)
+
+            digest = hashlib.sha256((json.dumps(system) + prompt).encode()).hexdigest()[:12]
+            text = f"Fake response {digest}."
+            return {
+                "id": f"msg_{digest}",
+                "type": "message",
+                "role": "assistant",
+                "model": body["model"],
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {
+                    "input_tokens": input_tokens - cache_read,
+                    "output_tokens": len(text) // 4,
+                    "cache_creation_input_tokens": 0,
+                    "cache_read_input_tokens": cache_read
+                }
+            }
+        finally:
+            state["active"] -= 1
+
+    @app.get("/stats")
+    async def get_stats():
+        return {**stats, "active": state["active"], "cached_prefixes": len(cached_prefixes)}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.error_rate, args.max_concurrency, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+LLM gateway throughput against the local fake server
+
+    python -m benchmarks.llm_gateway --claims 20 --prompts 12 --duplicate-rate 0.3 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import uvicorn
+from anthropic import AsyncAnthropic
+
+from app.services.llm_gateway import LLMGateway
+from benchmarks.fake_llm_server import create_app
+
+QUESTIONS = [
+    "Summarize the in-service evidence for {condition}.",
+    "Is there a nexus statement for {condition}? Quote it.",
+    "List treatment dates for {condition}.",
+    "What is missing to establish service connection for {condition}?"
+]
+
+def start_server(port: int, latency_ms: float, error_rate: float, max_concurrency: int) -> uvicorn.Server:
+    config = uvicorn.Config(
+        create_app(latency_ms, error_rate, max_concurrency),
+        host="127.0.0.1", port=port, log_level="error"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def make_workload(claims: int, prompts: int, duplicate_rate: float, seed: int = 0):
+    rng = random.Random(seed)
+    workload = []
+    for c in range(claims):
+        claim_id = f"claim-{c}"
+        context = f"Claim {claim_id} evidence digest. " + "Veteran reports tinnitus since 2004. " * 200
+        issued = []
+        for p in range(prompts):
+            if issued and rng.random() < duplicate_rate:
+                prompt = rng.choice(issued)
+            else:
+                prompt = rng.choice(QUESTIONS).format(condition=f"condition {p}")
+                issued.append(prompt)
+            workload.append((claim_id, context, prompt))
+    rng.shuffle(workload)
+    return workload
+
+async def run(args) -> dict:
+    client = AsyncAnthropic(base_url=f"http://127.0.0.1:{args.port}", api_key="fake", max_retries=0)
+    gateway = LLMGateway(
+        client,
+        max_concurrency=args.concurrency,
+        per_claim_concurrency=args.per_claim,
+        requests_per_minute=args.rpm,
+        backoff_base=0.1
+    )
+    workload = make_workload(args.claims, args.prompts, args.duplicate_rate, args.seed)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(gateway.complete(prompt, context=context, claim_id=claim_id) for claim_id, context, prompt in workload),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+
+    failures = sum(isinstance(r, Exception) for r in results)
+    return {
+        "requests": len(workload),
+        "failures": failures,
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(len(workload) / elapsed, 1),
+        "gateway": gateway.stats()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=20)
+    parser.add_argument("--prompts", type=int, default=12, help="prompts per claim")
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-claim", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=6000)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--server-concurrency", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency_ms, args.error_rate, args.server_concurrency)
+    try:
+        print(json.dumps(asyncio.run(run(args)), indent=2))
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+Load test for the process-claim API
+
+    # Against running instances (claims are spread over the URLs)
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --rates 0.1 0.2 0.5 --duration 120
+
+    # Saturation curves: start 1, 2 and 4 local instances with model stand-ins
+    python -m benchmarks.loadtest --serve 1 2 4 --rates 0.1 0.2 0.5 1 --output load.json
+
+Claims arrive as a Poisson process at each rate for --duration seconds
+and are then drained. Each claim is a synthetic packet (benchmarks.corpus)
+drawn from the --sizes page distribution, submitted with a priority from
+--priorities, polled through the status endpoint until it finishes, and
+its summary fetched. Results are kept in the process that analyzed the
+claim, so every claim is polled on the instance that accepted it.
+
+The report has, per configuration and rate: throughput, client latency
+percentiles (submit, time to completion, status polls) overall and per
+priority, server stage percentiles from the claim_stage_seconds
+histograms, error rates, and whether the rate saturated the
+configuration (completions fell behind arrivals).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.corpus import generate_claim
+from benchmarks.report import environment
+
+TERMINAL = ("completed", "error", "rejected")
+# A rate saturates a configuration when the queue grows during the run (claims
+# arriving late take this many times longer than early ones) or claims fail
+SATURATION_LATENCY_GROWTH = 2.0
+SATURATION_ERROR_RATE = 0.05
+
+@dataclass
+class ClaimOutcome:
+    priority: str
+    pages: int
+    target: str
+    arrived: float  # Seconds into the step
+    status: str = "pending"
+    error: Optional[str] = None
+    submit_s: Optional[float] = None
+    first_result_s: Optional[float] = None
+    completion_s: Optional[float] = None
+    finished_at: Optional[float] = None
+    poll_s: List[float] = field(default_factory=list)
+    summary_s: Optional[float] = None
+
+def parse_mix(spec: str, cast=str) -> List[Tuple]:
+    """Parse "10:0.6,500:0.4" into [(10, 0.6), (500, 0.4)]"""
+    mix = []
+    for part in spec.split(","):
+        value, _, weight = part.partition(":")
+        mix.append((cast(value), float(weight or 1)))
+    return mix
+
+def percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+    return {"count": len(ordered), "p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99), "max": round(ordered[-1], 4)}
+
+class ClaimPool:
+    """
+    Pre-generated synthetic claims per size. Every submission gets unique
+    file bytes (a PDF comment after %%EOF), so the server's page-artifact
+    reuse never serves a repeat upload; the scanned pages keep their
+    pixels, so OCR-cache hits on them remain possible.
+    """
+
+    def __init__(self, sizes: List[int], variants: int, scanned_ratio: float, seed: int):
+        self.claims = {}
+        for size in sizes:
+            print(f"Generating {variants} claim(s) of {size} pages", flush=True)
+            self.claims[size] = [generate_claim(size, seed + i, scanned_ratio) for i in range(variants)]
+        self._serial = 0
+
+    def files(self, size: int, rng: random.Random) -> Tuple[List[Tuple], int]:
+        claim = rng.choice(self.claims[size])
+        self._serial += 1
+        files = []
+        for doc in claim.documents:
+            content = doc.content
+            if doc.filename.endswith(".pdf"):
+                content += f"\n% load test submission {self._serial}\n".encode()
+            files.append(("files", (doc.filename, content, "application/octet-stream")))
+        return files, claim.pages
+
+async def run_claim(
+    client: httpx.AsyncClient,
+    target: str,
+    outcome: ClaimOutcome,
+    files: List[Tuple],
+    claim_number: str,
+    progressive: bool,
+    poll_interval: float,
+    claim_timeout: float
+):
+    started = time.perf_counter()
+    try:
+        response = await client.post(
+            f"{target}/api/v1/process-claim",
+            params={"claim_number": claim_number, "priority": outcome.priority, "progressive": progressive},
+            files=files
+        )
+        outcome.submit_s = time.perf_counter() - started
+        if response.status_code != 200:
+            outcome.status, outcome.error = "submit_error", f"HTTP {response.status_code}"
+            return
+        claim_id = response.json()["claim_id"]
+
+        deadline = started + claim_timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(poll_interval)
+            polled = time.perf_counter()
+            response = await client.get(f"{target}/api/v1/claims/{claim_id}/status")
+            outcome.poll_s.append(time.perf_counter() - polled)
+            if response.status_code == 404:  # Not published yet
+                continue
+            if response.status_code != 200:
+                outcome.status, outcome.error = "poll_error", f"HTTP {response.status_code}"
+                return
+            status = response.json()["status"]
+            if status == "provisional" and outcome.first_result_s is None:
+                outcome.first_result_s = time.perf_counter() - started
+            if status in TERMINAL:
+                break
+        else:
+            outcome.status, outcome.error = "timeout", f"Not finished after {claim_timeout}s"
+            return
+
+        outcome.finished_at = time.perf_counter()
+        outcome.completion_s = outcome.finished_at - started
+        outcome.status = status
+        if status != "completed":
+            outcome.error = response.json().get("error")
+            return
+        if outcome.first_result_s is None:
+            outcome.first_result_s = outcome.completion_s
+
+        fetched = time.perf_counter()
+        response = await client.get(f"{target}/api/v1/claims/{claim_id}/summary")
+        outcome.summary_s = time.perf_counter() - fetched
+        if response.status_code != 200:
+            outcome.status, outcome.error = "summary_error", f"HTTP {response.status_code}"
+    except httpx.HTTPError as e:
+        outcome.status, outcome.error = "transport_error", f"{type(e).__name__}: {e}"
+
+async def scrape_stages(client: httpx.AsyncClient, targets: List[str]) -> Dict[str, Dict]:
+    """claim_stage_seconds bucket counts, summed over the targets: {stage: {le: count}}"""
+    buckets: Dict[str, Dict[float, float]] = defaultdict(lambda: defaultdict(float))
+    for target in targets:
+        response = await client.get(f"{target}/metrics")
+        response.raise_for_status()
+        for family in text_string_to_metric_families(response.text):
+            if family.name != "claim_stage_seconds":
+                continue
+            for sample in family.samples:
+                if sample.name.endswith("_bucket"):
+                    buckets[sample.labels["stage"]][float(sample.labels["le"])] += sample.value
+    return buckets
+
+def stage_percentiles(before: Dict, after: Dict) -> Dict[str, Dict]:
+    """Per-stage p50/p95/p99 of the observations between two scrapes, interpolated within buckets"""
+    stages = {}
+    for stage, counts in after.items():
+        bounds = sorted(counts)
+        cumulative = [counts[b] - before.get(stage, {}).get(b, 0.0) for b in bounds]
+        total = cumulative[-1] if cumulative else 0
+        if total <= 0:
+            continue
+
+        def quantile(q):
+            rank = q * total
+            lower, below = 0.0, 0.0
+            for bound, seen in zip(bounds, cumulative):
+                if seen >= rank:
+                    if bound == float("inf"):
+                        return lower  # Beyond the largest bucket: its lower edge
+                    share = (rank - below) / (seen - below) if seen > below else 1.0
+                    return round(lower + (bound - lower) * share, 4)
+                lower, below = bound, seen
+            return lower
+        stages[stage] = {"count": int(total), "p50": quantile(0.50), "p95": quantile(0.95), "p99": quantile(0.99)}
+    return stages
+
+def latency_growth(completed: List[ClaimOutcome]) -> Optional[float]:
+    """Median completion time of the last quarter of arrivals over the first quarter's"""
+    if len(completed) < 8:
+        return None
+    ordered = sorted(completed, key=lambda o: o.arrived)
+    quarter = len(ordered) // 4
+    early = sorted(o.completion_s for o in ordered[:quarter])[quarter // 2]
+    late = sorted(o.completion_s for o in ordered[-quarter:])[quarter // 2]
+    return round(late / early, 3) if early else None
+
+def summarize_step(rate: float, outcomes: List[ClaimOutcome], elapsed: float, stages: Dict) -> Dict:
+    completed = [o for o in outcomes if o.status == "completed"]
+    errors = Counter(o.status for o in outcomes if o.status != "completed")
+    throughput = len(completed) / elapsed if elapsed else 0.0
+    growth = latency_growth(completed)
+
+    by_priority = {}
+    for priority in sorted({o.priority for o in outcomes}):
+        group = [o for o in outcomes if o.priority == priority]
+        done = [o for o in group if o.status == "completed"]
+        by_priority[priority] = {
+            "claims": len(group),
+            "error_rate": round(1 - len(done) / len(group), 4),
+            "submit_s": percentiles([o.submit_s for o in group if o.submit_s is not None]),
+            "completion_s": percentiles([o.completion_s for o in done]),
+            "first_result_s": percentiles([o.first_result_s for o in done])
+        }
+
+    return {
+        "rate": rate,
+        "offered": len(outcomes),
+        "completed": len(completed),
+        "errors": dict(errors),
+        "error_rate": round(1 - len(completed) / len(outcomes), 4) if outcomes else 0.0,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_claims_per_s": round(throughput, 4),
+        "throughput_pages_per_s": round(sum(o.pages for o in completed) / elapsed, 2) if elapsed else 0.0,
+        "latency_growth": growth,
+        "saturated": bool(outcomes) and (
+            (growth is not None and growth > SATURATION_LATENCY_GROWTH)
+            or 1 - len(completed) / len(outcomes) > SATURATION_ERROR_RATE
+        ),
+        "latency": {
+            "submit_s": percentiles([o.submit_s for o in outcomes if o.submit_s is not None]),
+            "completion_s": percentiles([o.completion_s for o in completed]),
+            "first_result_s": percentiles([o.first_result_s for o in completed]),
+            "status_poll_s": percentiles([s for o in outcomes for s in o.poll_s]),
+            "summary_s": percentiles([o.summary_s for o in completed if o.summary_s is not None])
+        },
+        "by_priority": by_priority,
+        "server_stages": stages,
+        "error_samples": sorted({o.error for o in outcomes if o.error})[:5]
+    }
+
+async def run_step(args, targets: List[str], pool: ClaimPool, rate: float, rng: random.Random) -> Dict:
+    """Poisson arrivals at `rate` claims/s for args.duration seconds, then drain"""
+    sizes = parse_mix(args.sizes, int)
+    priorities = parse_mix(args.priorities)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client:
+        before = await scrape_stages(client, targets)
+        outcomes, tasks = [], []
+        started = time.perf_counter()
+        next_arrival = started
+        while True:
+            next_arrival += rng.expovariate(rate)
+            if next_arrival - started > args.duration:
+                break
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+
+            size = rng.choices([s for s, _ in sizes], [w for _, w in sizes])[0]
+            priority = rng.choices([p for p, _ in priorities], [w for _, w in priorities])[0]
+            files, pages = pool.files(size, rng)
+            target = targets[len(outcomes) % len(targets)]
+            outcome = ClaimOutcome(priority, pages, target, next_arrival - started)
+            outcomes.append(outcome)
+            tasks.append(asyncio.create_task(run_claim(
+                client, target, outcome, files, f"LOAD-{rate}-{len(outcomes):06d}",
+                rng.random() < args.progressive_share, args.poll_interval, args.claim_timeout
+            )))
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        finished = [o.finished_at for o in outcomes if o.finished_at is not None]
+        elapsed = (max(finished) if finished else time.perf_counter()) - started
+        stages = stage_percentiles(before, await scrape_stages(client, targets))
+    return summarize_step(rate, outcomes, elapsed, stages)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextmanager
+def local_instances(count: int, extra_env: Dict[str, str]):
+    """Start `count` single-process instances with model stand-ins; yields their URLs"""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as directory:
+        processes, urls = [], []
+        try:
+            for i in range(count):
+                state = os.path.join(directory, f"instance-{i}")
+                env = {
+                    **os.environ,
+                    "MODEL_STANDINS": "true",
+                    "WEB_CONCURRENCY": str(count),  # Thread budgets split the host between instances
+                    "CLAIMS_DB_PATH": os.path.join(state, "claims.db"),
+                    "ARTIFACT_STORE_DIR": os.path.join(state, "artifacts"),
+                    "OCR_CACHE_DIR": os.path.join(state, "ocr-cache"),
+                    "EVIDENCE_STORE_DIR": os.path.join(state, "evidence"),
+                    "BOILERPLATE_TABLE_PATH": os.path.join(state, "boilerplate.json"),
+                    **extra_env
+                }
+                port = _free_port()
+                processes.append(subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                     "--log-level", "warning"],
+                    cwd=backend, env=env
+                ))
+                urls.append(f"http://127.0.0.1:{port}")
+            _wait_healthy(urls, processes)
+            yield urls
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+def _wait_healthy(urls: List[str], processes: List[subprocess.Popen], timeout: float = 180.0):
+    deadline = time.monotonic() + timeout
+    pending = list(urls)
+    while pending:
+        if any(process.poll() is not None for process in processes):
+            raise RuntimeError("A local instance exited during startup")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Instances not healthy after {timeout}s: {pending}")
+        for url in list(pending):
+            try:
+                if httpx.get(f"{url}/health", timeout=5).status_code == 200:
+                    pending.remove(url)
+            except httpx.HTTPError:
+                pass
+        time.sleep(1)
+
+async def sweep(args, targets: List[str], pool: ClaimPool, label: str) -> Dict:
+    rng = random.Random(args.seed)
+    steps = []
+    for rate in args.rates:
+        print(f"[{label}] {rate} claims/s for {args.duration}s", flush=True)
+        step = await run_step(args, targets, pool, rate, rng)
+        steps.append(step)
+        completion = step["latency"]["completion_s"]
+        print(
+            f"[{label}] {rate:>6} claims/s offered -> {step['throughput_claims_per_s']:.3f} completed/s, "
+            f"{step['throughput_pages_per_s']:.1f} pages/s, p95 {completion.get('p95', '-')}s, "
+            f"errors {step['error_rate']:.1%}{'  SATURATED' if step['saturated'] else ''}",
+            flush=True
+        )
+        if step["saturated"] and args.stop_at_saturation:
+            break
+    tipping = next((step["rate"] for step in steps if step["saturated"]), None)
+    return {"label": label, "targets": targets, "steps": steps, "saturation_rate": tipping}
+
+async def run(args) -> Dict:
+    pool = ClaimPool([size for size, _ in parse_mix(args.sizes, int)], args.variants, args.scanned_ratio, args.seed)
+    configurations = []
+    if args.serve:
+        extra_env = dict(item.split("=", 1) for item in args.server_env)
+        for count in args.serve:
+            with local_instances(count, extra_env) as urls:
+                configurations.append(await sweep(args, urls, pool, f"{count} instance(s)"))
+    else:
+        configurations.append(await sweep(args, args.url, pool, args.label or ", ".join(args.url)))
+
+    return {
+        "suite": "loadtest",
+        "environment": environment(),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key not in ("output",)
+        },
+        "configurations": configurations
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", action="append", help="base URL of a running instance (repeatable)")
+    target.add_argument("--serve", type=int, nargs="+", help="start this many local instances per configuration")
+    parser.add_argument("--server-env", action="append", default=[], help="KEY=VALUE for --serve instances")
+    parser.add_argument("--label", help="name of the configuration under test (with --url)")
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.1, 0.2, 0.5], help="arrival rates, claims/s")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of arrivals per rate")
+    parser.add_argument("--sizes", default="10:0.6,100:0.3,500:0.1", help="pages:weight claim size mix")
+    parser.add_argument("--priorities", default="normal:0.7,high:0.2,urgent:0.1", help="priority:weight mix")
+    parser.add_argument("--progressive-share", type=float, default=0.0, help="share of claims submitted progressive")
+    parser.add_argument("--variants", type=int, default=3, help="pre-generated claims per size")
+    parser.add_argument("--scanned-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--claim-timeout", type=float, default=1800.0)
+    parser.add_argument("--request-timeout", type=float, default=300.0)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--stop-at-saturation", action="store_true", help="skip higher rates once saturated")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    for configuration in report["configurations"]:
+        print(f"{configuration['label']}: saturates at {configuration['saturation_rate'] or 'none of the tested'} claims/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark reports and baseline comparison
+
+    python -m benchmarks.report compare results.json baseline.json --threshold 0.15
+
+Reports are JSON: environment details plus one entry per benchmark with
+timing statistics in seconds. A benchmark regresses when its median is
+more than `threshold` slower than the baseline's; compare exits with
+status 1 if any benchmark regressed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+REPORT_VERSION = 1
+
+def summarize(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "median_s": statistics.median(ordered),
+        "mean_s": statistics.fmean(ordered),
+        "min_s": ordered[0],
+        "max_s": ordered[-1],
+        "p95_s": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))],
+        "stdev_s": statistics.stdev(ordered) if len(ordered) > 1 else 0.0
+    }
+
+class Report:
+    """Benchmark results collected by a run, written as one JSON document"""
+
+    def __init__(self, suite: str, parameters: Optional[Dict] = None):
+        self.suite = suite
+        self.parameters = parameters or {}
+        self.results: Dict[str, Dict] = {}
+
+    def add(self, name: str, samples: List[float], **extra):
+        """Record timing samples (seconds); extra values (pages, items) are kept alongside"""
+        self.results[name] = {**summarize(samples), **extra}
+        line = f"{name:<40} median {self.results[name]['median_s'] * 1000:10.2f} ms"
+        if "pages" in extra and self.results[name]["median_s"]:
+            line += f"  {extra['pages'] / self.results[name]['median_s']:8.1f} pages/s"
+        print(line, flush=True)
+
+    def measure(self, name: str, func: Callable, repeat: int = 5, warmup: int = 1, **extra):
+        """Time a no-argument callable `repeat` times after `warmup` untimed calls"""
+        for _ in range(warmup):
+            func()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        self.add(name, samples, **extra)
+
+    async def measure_async(self, name: str, func: Callable, repeat: int = 5, warmup: int = 1, **extra):
+        """measure() for a no-argument coroutine function"""
+        for _ in range(warmup):
+            await func()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await func()
+            samples.append(time.perf_counter() - started)
+        self.add(name, samples, **extra)
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": REPORT_VERSION,
+            "suite": self.suite,
+            "created_at": datetime.utcnow().isoformat(),
+            "environment": environment(),
+            "parameters": self.parameters,
+            "results": self.results
+        }
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        print(f"Report written to {path}")
+
+def environment() -> Dict:
+    """Enough about the machine and tree to tell whether two reports are comparable"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.15) -> List[Dict]:
+    """
+    Per-benchmark change in median time against the baseline.
+
+    Entries are marked "regression" above +threshold, "improvement" below
+    -threshold and "ok" otherwise; benchmarks missing from either side
+    are "new" or "missing".
+    """
+    rows = []
+    for name in sorted(set(current["results"]) | set(baseline["results"])):
+        now, before = current["results"].get(name), baseline["results"].get(name)
+        if before is None or now is None:
+            rows.append({"name": name, "status": "new" if before is None else "missing"})
+            continue
+        change = now["median_s"] / before["median_s"] - 1 if before["median_s"] else 0.0
+        status = "regression" if change > threshold else "improvement" if change < -threshold else "ok"
+        rows.append({
+            "name": name,
+            "status": status,
+            "baseline_s": before["median_s"],
+            "current_s": now["median_s"],
+            "change": round(change, 4)
+        })
+    return rows
+
+def print_comparison(rows: List[Dict]):
+    for row in rows:
+        if "change" in row:
+            print(
+                f"{row['name']:<40} {row['baseline_s'] * 1000:10.2f} -> {row['current_s'] * 1000:10.2f} ms "
+                f"{row['change']:+8.1%}  {row['status']}"
+            )
+        else:
+            print(f"{row['name']:<40} {row['status']}")
+
+def check_baseline(report: Report, baseline_path: Optional[str], threshold: float) -> int:
+    """Compare a finished run against a stored baseline; returns the exit status"""
+    if not baseline_path:
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    rows = compare(report.to_dict(), baseline, threshold)
+    print_comparison(rows)
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compare_parser = subparsers.add_parser("compare", help="compare a report against a baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--threshold", type=float, default=0.15)
+    compare_parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args()
+
+    with open(args.current) as f:
+        current = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_comparison(rows)
+    sys.exit(1 if any(row["status"] == "regression" for row in rows) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Claim repository write throughput
+
+    python -m benchmarks.repository_writes --claims 20 --evidence 5000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.models.claims import ClaimType, EvidenceType
+from app.services.ai_engine import ClaimAnalysis, Evidence, EvidenceRelevance, MedicalCondition
+from app.services.claim_repository import ClaimRepository
+
+CONDITIONS = ["tinnitus", "ptsd", "lumbar strain", "sleep apnea", "hearing loss", "migraine"]
+
+def make_analysis(claim_id: str, evidence_count: int, version: int = 1) -> ClaimAnalysis:
+    rng = random.Random(claim_id)
+    evidence = [
+        Evidence(
+            document_id=f"doc-{i % 40}",
+            page_number=i % 300 + 1,
+            text="Patient reports ringing in both ears since artillery training. " * 4,
+            type=rng.choice(list(EvidenceType)),
+            relevance=rng.choice([EvidenceRelevance.DIRECT, EvidenceRelevance.SUPPORTING]),
+            confidence=rng.random(),
+            condition=CONDITIONS[i % len(CONDITIONS)],
+            date=date(2005, 1, 1) + timedelta(days=i % 6000),
+            provider="Dr. Smith, VA Medical Center",
+            diagnosis_codes=["H93.1"],
+            highlights=[(0, 7), (25, 32)]
+        )
+        for i in range(evidence_count)
+    ]
+    conditions = [
+        MedicalCondition(
+            name=name,
+            icd10_codes=["H93.1"],
+            evidence_items=[e for e in evidence if e.condition == name],
+            continuity_evidence=[]
+        )
+        for name in CONDITIONS
+    ]
+    timeline = [
+        {"date": e.date.isoformat(), "event": e.text[:200], "type": e.type.value, "condition": e.condition, "source": e.document_id}
+        for e in evidence
+    ]
+    return ClaimAnalysis(
+        claim_id=claim_id,
+        claim_type=ClaimType.INITIAL,
+        conditions=conditions,
+        timeline=timeline,
+        evidence_strength=0.5,
+        missing_evidence=[],
+        recommendations=[],
+        dbq_needed=[],
+        presumptive_conditions=[],
+        confidence_score=0.5,
+        processing_time=1.0,
+        version=version
+    )
+
+def make_annotations(analysis: ClaimAnalysis) -> dict:
+    return {
+        "tabs": [{"name": c.name, "pages": [], "color": "red"} for c in analysis.conditions],
+        "bookmarks": [],
+        "highlights": [
+            {"page": e.page_number, "start": s, "end": t, "color": "yellow", "note": e.condition}
+            for c in analysis.conditions for e in c.evidence_items for s, t in e.highlights
+        ]
+    }
+
+async def run(claims: int, evidence: int, concurrency: int, pool_size: int, batch_size: int):
+    with tempfile.TemporaryDirectory() as directory:
+        repository = ClaimRepository(os.path.join(directory, "claims.db"), pool_size=pool_size, batch_size=batch_size)
+        await repository.initialize()
+
+        claim_ids = [await repository.create_claim(f"C{i:06d}", "normal") for i in range(claims)]
+        work = [(claim_id, make_analysis(claim_id, evidence)) for claim_id in claim_ids]
+        work = [(claim_id, analysis, make_annotations(analysis)) for claim_id, analysis in work]
+
+        semaphore = asyncio.Semaphore(concurrency)
+        rows = 0
+
+        async def save(claim_id, analysis, annotations):
+            nonlocal rows
+            async with semaphore:
+                saved = await repository.save_analysis(claim_id, "completed", analysis, annotations)
+            rows += saved
+
+        started = time.perf_counter()
+        await asyncio.gather(*(save(*item) for item in work))
+        elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for claim_id in claim_ids:
+            await repository.update_status(claim_id, "reviewed")
+        status_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for claim_id in claim_ids:
+            await repository.list_evidence(claim_id, condition="tinnitus", limit=50)
+        query_elapsed = time.perf_counter() - started
+
+        await repository.close()
+
+    print(f"analysis writes: {rows} rows in {elapsed:.2f}s = {rows / elapsed:,.0f} rows/sec")
+    print(f"status updates:  {claims / status_elapsed:,.0f} updates/sec")
+    print(f"evidence query:  {query_elapsed / claims * 1000:.2f} ms/query")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=20)
+    parser.add_argument("--evidence", type=int, default=5000, help="evidence items per claim")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.claims, args.evidence, args.concurrency, args.pool_size, args.batch_size))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Stage micro-benchmarks for DocumentProcessor and AIEngine
+
+    python -m benchmarks.stages --pages 60 --repeat 5 --output stages.json
+    python -m benchmarks.stages --baseline stages-baseline.json
+
+Each pipeline stage is timed on its own over a synthetic claim
+(benchmarks.corpus). Caches are disabled and AIEngine runs with the
+model stand-ins (app.services.model_standins), so timings measure this
+code rather than model downloads or earlier runs. OCR stages need the
+tesseract binary; --skip-ocr leaves them out.
+"""
+
+import argparse
+import asyncio
+import sys
+
+import fitz
+import pytesseract
+from PIL import Image
+
+from app.services.ai_engine import AIEngine
+from app.services.degradation import PROFILES, FidelityLevel
+from app.services.document_processor import DocumentProcessor
+from app.services.model_standins import install_model_standins
+from benchmarks.corpus import generate_claim, uploads
+from benchmarks.report import Report, check_baseline
+
+def _first(claim, kind: str):
+    return next(doc for doc in claim.documents if doc.kind == kind)
+
+def _scanned_page_image(claim) -> Image.Image:
+    """The first scanned record page, rasterized the way extraction does (2x)"""
+    for doc in claim.documents:
+        if not doc.filename.endswith(".pdf") or not doc.scanned_pages:
+            continue
+        with fitz.open(stream=doc.content, filetype="pdf") as pdf:
+            for page in pdf:
+                if not page.get_text().strip():
+                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+                    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    raise ValueError("Claim has no scanned pages; raise --scanned-ratio")
+
+async def document_stages(report: Report, claim, repeat: int, skip_ocr: bool):
+    processor = DocumentProcessor(shard_workers=0)
+    records = _first(claim, "str")
+    docx = _first(claim, "docx")
+
+    await report.measure_async(
+        "document.pdf_text_layer",
+        lambda: processor._process_pdf(records.content, "bench", ocr=False),
+        repeat, pages=records.pages
+    )
+
+    def rasterize():
+        with fitz.open(stream=records.content, filetype="pdf") as pdf:
+            pix = pdf[0].get_pixmap(matrix=fitz.Matrix(2, 2))
+            Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    report.measure("document.rasterize_page", rasterize, repeat, pages=1)
+
+    image = _scanned_page_image(claim)
+    for tier in ("full", "fast", "grayscale"):
+        report.measure(
+            f"document.preprocess_{tier}",
+            lambda tier=tier: processor._preprocess_image_for_ocr(image, tier),
+            repeat, pages=1
+        )
+    report.measure("document.ocr_cache_fingerprint", lambda: processor.ocr_cache.fingerprint(image), repeat)
+    if not skip_ocr:
+        preprocessed = processor._preprocess_image_for_ocr(image, "full")
+        report.measure(
+            "document.ocr_page",
+            lambda: pytesseract.image_to_string(preprocessed, config=processor.ocr_config),
+            repeat, pages=1
+        )
+
+    await report.measure_async(
+        "document.docx_tables", lambda: processor._process_docx(docx.content, "bench"), repeat, pages=docx.pages
+    )
+
+    extracted = await processor._process_pdf(records.content, "bench", ocr=False)
+    text = extracted["content"].text
+    await report.measure_async(
+        "document.segment_pages", lambda: processor._segment_pages(extracted), repeat, pages=records.pages
+    )
+    await report.measure_async("document.classify", lambda: processor._classify_document(text), repeat)
+    await report.measure_async("document.metadata", lambda: processor._extract_metadata(text), repeat)
+
+    processor.close()
+
+    async def whole_claim():
+        # A new processor each run: its in-memory OCR cache would serve every page after the first run
+        fresh = DocumentProcessor(shard_workers=0)
+        for upload in uploads(claim):
+            await fresh.process_document(upload, ocr=not skip_ocr)
+    await report.measure_async("document.process_claim_documents", whole_claim, repeat, warmup=0, pages=claim.pages)
+
+async def ai_stages(report: Report, claim, repeat: int, skip_ocr: bool):
+    processor = DocumentProcessor(shard_workers=0)
+    documents = [await processor.process_document(upload, ocr=not skip_ocr) for upload in uploads(claim)]
+    processor.close()
+
+    engine = AIEngine()
+    await install_model_standins(engine)
+    fidelity = PROFILES[FidelityLevel.FULL]
+    claimed = await engine._extract_claimed_conditions(documents)
+    records = [doc for doc in documents if doc["format"] == ".pdf" and len(doc["pages"]) > 1]
+    paragraphs = [p for doc in records for _, p in doc["content"].iter_paragraphs(min_length=20)]
+
+    await report.measure_async(
+        "ai.claimed_conditions", lambda: engine._extract_claimed_conditions(documents), repeat
+    )
+    await report.measure_async("ai.service_info", lambda: engine._extract_service_info(documents), repeat)
+    report.measure("ai.embeddings", lambda: engine._embed(paragraphs), repeat, items=len(paragraphs))
+    report.measure("ai.ner", lambda: [engine.nlp(p) for p in paragraphs], repeat, items=len(paragraphs))
+
+    async def evidence_records():
+        return [await engine._build_evidence_record(doc, claimed, None, fidelity) for doc in records]
+    await report.measure_async(
+        "ai.evidence_records", evidence_records, repeat, pages=sum(len(doc["pages"]) for doc in records)
+    )
+
+    evidence = [e for record in await evidence_records() for e in record.evidence]
+    service_info = await engine._extract_service_info(documents)
+
+    async def aggregation():
+        conditions = await engine._group_evidence_by_condition(evidence, claimed)
+        await engine._build_timeline(evidence)
+        strength = await engine._calculate_evidence_strength(conditions)
+        missing = await engine._identify_missing_evidence(conditions, claimed)
+        await engine._generate_recommendations(conditions, missing)
+        await engine._determine_dbqs(conditions)
+        await engine._check_presumptive_conditions(documents, conditions, service_info)
+        await engine._calculate_confidence(conditions, strength)
+    await report.measure_async("ai.aggregation", aggregation, repeat, items=len(evidence))
+
+    analysis = await engine.analyze_claim_evidence("bench", documents)
+    await report.measure_async("ai.annotations", lambda: engine.generate_annotations(analysis), repeat)
+    await report.measure_async(
+        "ai.analyze_claim", lambda: engine.analyze_claim_evidence("bench", documents), repeat, pages=claim.pages
+    )
+
+async def run(args) -> Report:
+    claim = generate_claim(args.pages, args.seed, args.scanned_ratio, args.docx_rows)
+    report = Report("stages", {
+        "pages": claim.pages,
+        "seed": args.seed,
+        "scanned_ratio": args.scanned_ratio,
+        "docx_rows": args.docx_rows,
+        "repeat": args.repeat,
+        "skip_ocr": args.skip_ocr
+    })
+    print(f"Claim: {claim.pages} pages in {len(claim.documents)} documents")
+    if args.only in (None, "document"):
+        await document_stages(report, claim, args.repeat, args.skip_ocr)
+    if args.only in (None, "ai"):
+        await ai_stages(report, claim, args.repeat, args.skip_ocr)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scanned-ratio", type=float, default=0.2)
+    parser.add_argument("--docx-rows", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", choices=["document", "ai"])
+    parser.add_argument("--skip-ocr", action="store_true", help="leave out stages that run tesseract")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown of the median")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        report.write(args.output)
+    sys.exit(check_baseline(report, args.baseline, args.threshold))
+
+if __name__ == "__main__":
+    main()
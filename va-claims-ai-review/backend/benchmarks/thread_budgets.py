@@ -0,0 +1,116 @@
+"""
+OCR and inference throughput under different thread budgets
+
+    python -m benchmarks.thread_budgets --shares 0.25 0.5 0.75 --seconds 20 --pin
+
+Each configuration runs in a fresh interpreter (thread variables only
+take effect before numpy / torch / cv2 load). OCR workers preprocess
+(and with --tesseract, OCR) synthetic scanned pages while the main
+thread runs embedding-sized matrix multiplies, both for a fixed time.
+"unmanaged" is the previous behaviour: one OCR worker per core and
+every library at its default thread count.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from app.services.resource_governor import ResourceGovernor, ThreadBudget, available_cpus
+
+def _ocr_worker(budget, seconds: float, tesseract: bool) -> int:
+    if budget is not None:
+        ResourceGovernor(budget).init_ocr_worker()
+
+    import numpy as np
+    import cv2
+    from PIL import Image
+    from app.services.document_processor import DocumentProcessor
+
+    processor = DocumentProcessor(shard_workers=0)
+    page = np.full((2200, 1700, 3), 255, np.uint8)
+    for line in range(60):
+        cv2.putText(page, "Patient reports ringing in both ears since 2004", (80, 60 + line * 34),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 0), 2)
+    noise = np.random.default_rng(0).integers(0, 40, page.shape, dtype=np.uint8)
+    image = Image.fromarray(cv2.subtract(page, noise))
+
+    pages = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        prepared = processor._preprocess_image_for_ocr(image, "full")
+        if tesseract:
+            import pytesseract
+            pytesseract.image_to_string(prepared, config=processor.ocr_config)
+        pages += 1
+    return pages
+
+def run_child(args):
+    cpus = available_cpus()
+    if args.share is None:
+        governor = None
+        ocr_workers = len(cpus)
+    else:
+        governor = ResourceGovernor(ThreadBudget.split(cpus, ocr_share=args.share, pin=args.pin))
+        governor.apply_environment()
+        ocr_workers = governor.budget.ocr_workers
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    import torch
+
+    if governor is not None:
+        governor.apply()
+
+    budget = governor.budget if governor else None
+    with ProcessPoolExecutor(ocr_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_ocr_worker, budget, args.seconds, args.tesseract) for _ in range(ocr_workers)]
+
+        # Inference stand-in: MiniLM-sized feed-forward blocks over 256-token batches
+        x = torch.randn(256, 384)
+        w1, w2 = torch.randn(384, 1536), torch.randn(1536, 384)
+        batches = 0
+        deadline = time.perf_counter() + args.seconds
+        with torch.no_grad():
+            while time.perf_counter() < deadline:
+                torch.relu(x @ w1) @ w2
+                batches += 1
+        pages = sum(f.result() for f in futures)
+
+    print(json.dumps({
+        "config": "unmanaged" if governor is None else f"ocr_share={args.share}",
+        "ocr_workers": ocr_workers,
+        "torch_threads": torch.get_num_threads(),
+        "pages_per_second": round(pages / args.seconds, 2),
+        "inference_batches_per_second": round(batches / args.seconds, 1)
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shares", type=float, nargs="+", default=[0.25, 0.5, 0.75], help="OCR share of the cores")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--pin", action="store_true", help="pin OCR and inference to separate CPUs")
+    parser.add_argument("--tesseract", action="store_true", help="run Tesseract, not just preprocessing")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--share", type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(f"{len(available_cpus())} CPUs available")
+    for share in [None, *args.shares]:
+        command = [sys.executable, "-m", "benchmarks.thread_budgets", "--child", "--seconds", str(args.seconds)]
+        if share is not None:
+            command += ["--share", str(share)]
+        command += ["--pin"] * args.pin + ["--tesseract"] * args.tesseract
+        # A clean environment per run: no thread variables left over from this process
+        env = {k: v for k, v in os.environ.items() if not k.endswith("_NUM_THREADS") and k != "OMP_THREAD_LIMIT"}
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        print(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,45 @@ VA Claims AI Document Review System
 Main FastAPI Application
 """
 
-from fastapi import FastAPI, File, UploadFile, BackgroundTasks, HTTPException
+from fastapi import FastAPI, File, UploadFile, BackgroundTasks, HTTPException, Query, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from contextlib import asynccontextmanager
 import uvicorn
 from typing import List, Optional
 import asyncio
 from datetime import datetime
 import os
+import time
+import zipfile
 from dotenv import load_dotenv
 
+# Load environment variables
+load_dotenv()
+
+# Thread budgets must be in the environment before numpy, torch and cv2 load
+from app.services.resource_governor import ResourceGovernor
+governor = ResourceGovernor.from_env()
+governor.apply_environment()
+
 # Import custom modules
 from app.core.config import settings
 from app.core.logging import setup_logging, logger
-from app.api import claims, documents, analysis, examinations, admin
+from app.api import claims, documents, analysis, examinations, admin, diagnostics
 from app.models.database import init_db
 from app.services.ai_engine import AIEngine
 from app.services.document_processor import DocumentProcessor
-
-# Load environment variables
-load_dotenv()
+from app.services.archive_ingest import ArchiveIngestor, ArchiveLimits, ArchiveLimitExceeded
+from app.services.evidence_store import EvidenceStore
+from app.services.degradation import DegradationController, PROFILES, FidelityLevel
+from app.services.progress import progress, TERMINAL_EVENTS
+from app.services.result_store import ResultStore, dumps
+from app.services.artifact_store import ArtifactStore
+from app.services.claim_repository import ClaimRepository
+from app.services.instrumentation import span, render_metrics, QUEUE_DEPTH, CLAIMS_PROCESSED
+from app.services.memory_accounting import MemoryBudgetExceeded, track_claim, stage as memory_stage
+from app.services.model_standins import install_model_standins
+from app.services.shadow import ShadowEvaluator
 
 # Setup logging
 setup_logging()
@@ -34,15 +52,97 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting VA Claims AI Review System...")
     
+    # Cap torch / OpenCV / BLAS thread pools and pin inference CPUs
+    governor.apply()
+    app.state.governor = governor
+    
     # Initialize database
     await init_db()
+    app.state.repository = ClaimRepository(
+        os.getenv("CLAIMS_DB_PATH", "processed/claims.db"),
+        pool_size=int(os.getenv("CLAIMS_DB_POOL_SIZE", "4"))
+    )
+    await app.state.repository.initialize()
+    
+    # Per-document pipeline outputs (page text, embeddings, entities) reused across runs
+    app.state.artifacts = ArtifactStore(os.getenv("ARTIFACT_STORE_DIR", "processed/artifacts"))
     
     # Initialize AI models
-    app.state.ai_engine = AIEngine()
-    await app.state.ai_engine.initialize()
+    app.state.ai_engine = AIEngine(
+        boilerplate_path=os.getenv("BOILERPLATE_TABLE_PATH", "processed/boilerplate.json"),
+        artifacts=app.state.artifacts,
+        knowledge_index_path=os.getenv("KNOWLEDGE_INDEX_PATH", "processed/knowledge-index.pkl"),
+        llm_options={
+            "model": os.getenv("LLM_MODEL", "claude-3-5-sonnet-20241022"),
+            "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+            "per_claim_concurrency": int(os.getenv("LLM_PER_CLAIM_CONCURRENCY", "4")),
+            "requests_per_minute": float(os.getenv("LLM_REQUESTS_PER_MINUTE", "1000")),
+            "input_tokens_per_minute": float(os.getenv("LLM_INPUT_TOKENS_PER_MINUTE", "400000"))
+        }
+    )
+    if os.getenv("MODEL_STANDINS", "false").lower() == "true":
+        # Load tests and benchmarks: deterministic stand-ins, no model downloads
+        logger.warning("MODEL_STANDINS is set: analysis uses stand-in models")
+        await install_model_standins(app.state.ai_engine)
+    else:
+        await app.state.ai_engine.initialize()
+    
+    # Per-document evidence kept for incremental re-analysis
+    app.state.evidence_store = EvidenceStore(os.getenv("EVIDENCE_STORE_DIR", "processed/evidence"))
     
     # Initialize document processor
-    app.state.doc_processor = DocumentProcessor()
+    app.state.doc_processor = DocumentProcessor(
+        ocr_cache_dir=os.getenv("OCR_CACHE_DIR", "processed/ocr-cache"),
+        shard_page_threshold=int(os.getenv("PDF_SHARD_PAGE_THRESHOLD", "200")),
+        shard_workers=shard_workers(),
+        artifacts=app.state.artifacts,
+        thread_budget=governor.budget if governor.enabled else None
+    )
+    
+    # Initialize claim packet (ZIP) ingestion
+    app.state.archive_ingestor = ArchiveIngestor(
+        app.state.doc_processor.supported_formats,
+        limits=ArchiveLimits(
+            max_members=int(os.getenv("ARCHIVE_MAX_MEMBERS", "2000")),
+            max_member_bytes=int(os.getenv("ARCHIVE_MAX_MEMBER_MB", "200")) * 1024 * 1024,
+            max_total_bytes=int(os.getenv("ARCHIVE_MAX_TOTAL_MB", "2048")) * 1024 * 1024
+        ),
+        concurrency=int(os.getenv("ARCHIVE_CONCURRENCY", "4"))
+    )
+    
+    # Switch new work to cheaper analysis while queue wait or stage latency is over SLO
+    app.state.degradation = DegradationController(
+        queue_wait_slo=float(os.getenv("QUEUE_WAIT_SLO_SECONDS", "30")),
+        stage_slos={
+            # Seconds per page: stage time grows with document size, not only with load
+            "document": float(os.getenv("DOCUMENT_STAGE_SLO_SECONDS_PER_PAGE", "3")),
+            "analysis": float(os.getenv("ANALYSIS_STAGE_SLO_SECONDS_PER_PAGE", "1"))
+        },
+        enabled=os.getenv("DEGRADATION_ENABLED", "true").lower() == "true"
+    )
+    
+    # Opt-in: a fraction of claims is re-run at full fidelity and with a candidate
+    # profile, after their result is published, to prove the candidate's outcomes
+    app.state.shadow = ShadowEvaluator(
+        candidate=PROFILES[FidelityLevel(os.getenv("SHADOW_CANDIDATE", "reduced"))],
+        fraction=float(os.getenv("SHADOW_FRACTION", "0")),
+        max_concurrent=int(os.getenv("SHADOW_MAX_CONCURRENT", "1"))
+    )
+    
+    # Opt-in per-claim memory high-water marks; a budget aborts claims that exceed it
+    memory_budget = os.getenv("CLAIM_MEMORY_BUDGET_MB")
+    app.state.memory_accounting = {
+        "enabled": os.getenv("MEMORY_ACCOUNTING", "false").lower() == "true" or bool(memory_budget),
+        "budget_mb": float(memory_budget) if memory_budget else None,
+        "trace_allocations": os.getenv("MEMORY_TRACE_ALLOCATIONS", "false").lower() == "true"
+    }
+    
+    # Latest results per claim, served paginated and streamed
+    app.state.results = ResultStore(max_claims=int(os.getenv("RESULT_STORE_MAX_CLAIMS", "1000")))
+    
+    # Progress events pushed to SSE / WebSocket subscribers
+    progress.bind_loop(asyncio.get_running_loop())
+    app.state.progress = progress
     
     logger.info("✅ System initialized successfully")
     
@@ -50,7 +150,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🔄 Shutting down system...")
+    await app.state.shadow.close()
     await app.state.ai_engine.cleanup()
+    app.state.doc_processor.close()
+    await app.state.repository.close()
     logger.info("👋 System shutdown complete")
 
 # Create FastAPI app
@@ -76,6 +179,7 @@ app.include_router(documents.router, prefix="/api/v1/documents", tags=["Document
 app.include_router(analysis.router, prefix="/api/v1/analysis", tags=["Analysis"])
 app.include_router(examinations.router, prefix="/api/v1/examinations", tags=["Examinations"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
+app.include_router(diagnostics.router, prefix="/api/v1/admin", tags=["Admin"])
 
 @app.get("/")
 async def root():
@@ -112,21 +216,41 @@ async def health_check():
                 "ai_engine": ai_status,
                 "document_processor": "operational",
                 "database": "operational"
+            },
+            "metrics": {
+                "ocr_cache": app.state.doc_processor.ocr_cache.stats(),
+                "artifacts": app.state.artifacts.stats(),
+                "llm": app.state.ai_engine.llm.stats(),
+                "resources": app.state.governor.state(),
+                "degradation": app.state.degradation.state(),
+                "progress": app.state.progress.stats()
             }
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, throughput counters, queue depth"""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
 @app.post("/api/v1/process-claim")
 async def process_claim(
     background_tasks: BackgroundTasks,
     claim_number: str,
     files: List[UploadFile] = File(...),
-    priority: str = "normal"
+    priority: str = "normal",
+    claimant_id: Optional[str] = None,
+    progressive: bool = False
 ):
     """
     Process a complete VA disability claim
+    
+    In progressive mode a provisional triage result (claimed conditions,
+    document inventory, presumptive flags) is published from the text
+    layer first, then refined by the full OCR and evidence pass.
     """
     try:
         logger.info(f"Processing claim {claim_number} with {len(files)} documents")
@@ -140,7 +264,13 @@ async def process_claim(
             claim_id,
             files,
             app.state.doc_processor,
-            app.state.ai_engine
+            app.state.ai_engine,
+            claimant_id,
+            app.state.evidence_store,
+            progressive=progressive,
+            degradation=app.state.degradation,
+            queued_at=mark_queued(),
+            shadow=app.state.shadow
         )
         
         return {
@@ -148,6 +278,7 @@ async def process_claim(
             "claim_number": claim_number,
             "status": "processing",
             "document_count": len(files),
+            "progressive": progressive,
             "message": "Claim queued for processing"
         }
         
@@ -155,47 +286,467 @@ async def process_claim(
         logger.error(f"Error processing claim: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def process_claim_async(claim_id, files, doc_processor, ai_engine):
-    """Background task to process claim"""
+@app.post("/api/v1/process-claim-archive")
+async def process_claim_archive(
+    background_tasks: BackgroundTasks,
+    claim_number: str,
+    archive: UploadFile = File(...),
+    priority: str = "normal",
+    claimant_id: Optional[str] = None
+):
+    """
+    Process a VA disability claim packet uploaded as a ZIP archive
+    
+    The whole upload is received (Starlette spools the multipart body to
+    a temporary file) before this endpoint runs, and a ZIP's member index
+    sits at its end, so processing starts only once the archive has
+    arrived. From then on members are processed while later ones are
+    still being decompressed.
+    """
+    if not zipfile.is_zipfile(archive.file):
+        raise HTTPException(status_code=400, detail="Upload is not a ZIP archive")
+    archive.file.seek(0)
+    
     try:
-        # Process documents
-        documents = []
-        for file in files:
-            doc = await doc_processor.process_document(file)
-            documents.append(doc)
-        
-        # Analyze evidence
-        analysis = await ai_engine.analyze_claim_evidence(claim_id, documents)
+        logger.info(f"Processing claim {claim_number} from archive {archive.filename}")
         
-        # Generate annotations
-        annotations = await ai_engine.generate_annotations(analysis)
-        
-        # Create examination request
-        exam_request = await ai_engine.generate_exam_request(analysis)
+        # Create claim record
+        claim_id = await create_claim_record(claim_number, priority)
         
-        # Update claim status
-        await update_claim_status(claim_id, "completed", {
-            "analysis": analysis,
-            "annotations": annotations,
-            "exam_request": exam_request
-        })
+        # Queue background processing
+        background_tasks.add_task(
+            process_archive_async,
+            claim_id,
+            archive,
+            app.state.archive_ingestor,
+            app.state.doc_processor,
+            app.state.ai_engine,
+            claimant_id,
+            app.state.evidence_store,
+            degradation=app.state.degradation,
+            queued_at=mark_queued()
+        )
         
-        logger.info(f"Successfully processed claim {claim_id}")
+        return {
+            "claim_id": claim_id,
+            "claim_number": claim_number,
+            "status": "processing",
+            "archive": archive.filename,
+            "message": "Claim packet queued for processing"
+        }
         
     except Exception as e:
-        logger.error(f"Error in background processing: {e}")
-        await update_claim_status(claim_id, "error", {"error": str(e)})
+        logger.error(f"Error processing claim archive: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/claims/{claim_id}/documents")
+async def add_claim_documents(
+    claim_id: str,
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    replaces: Optional[List[str]] = Query(None),
+    claimant_id: Optional[str] = None
+):
+    """
+    Add evidence to an existing claim and re-analyze it incrementally
+    
+    Only the new documents are extracted; evidence from documents already
+    analyzed for the claim is reused. A new version of a document replaces
+    the old one only when the old document's id is listed in `replaces`;
+    file names are not unique enough to decide that.
+    """
+    if await app.state.repository.get_claim(claim_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown claim")
+    
+    logger.info(f"Adding {len(files)} documents to claim {claim_id}")
+    
+    # In flight again: status readers, event streams and claim profiles must not see it finished
+    await update_claim_status(claim_id, "processing", {})
+    
+    background_tasks.add_task(
+        process_claim_async,
+        claim_id,
+        files,
+        app.state.doc_processor,
+        app.state.ai_engine,
+        claimant_id,
+        app.state.evidence_store,
+        replaces,
+        degradation=app.state.degradation,
+        queued_at=mark_queued()
+    )
+    
+    return {
+        "claim_id": claim_id,
+        "status": "processing",
+        "document_count": len(files),
+        "message": "Documents queued for incremental analysis"
+    }
+
+@app.get("/api/v1/claims/{claim_id}/events")
+async def claim_events(
+    claim_id: str,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-Sent Events stream of claim progress
+    
+    Reconnecting clients resume after the Last-Event-ID header (sent by
+    browsers automatically) or the last_event_id query parameter.
+    """
+    if last_event_id is None and last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    claim = await app.state.repository.get_claim(claim_id)
+    if claim is None:
+        raise HTTPException(status_code=404, detail="Unknown claim")
+    
+    async def stream():
+        yield "retry: 3000\n\n"
+        async for event in app.state.progress.subscribe(
+            claim_id, last_event_id, wait_for_channel=claim["status"] not in TERMINAL_EVENTS
+        ):
+            yield event.to_sse() if event else ": keepalive\n\n"
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/v1/claims/{claim_id}/ws")
+async def claim_events_ws(websocket: WebSocket, claim_id: str, last_event_id: Optional[int] = None):
+    """WebSocket stream of claim progress (same events and ids as the SSE stream)"""
+    claim = await app.state.repository.get_claim(claim_id)
+    if claim is None:
+        await websocket.close(code=4404, reason="Unknown claim")
+        return
+    await websocket.accept()
+    try:
+        async for event in app.state.progress.subscribe(
+            claim_id, last_event_id, wait_for_channel=claim["status"] not in TERMINAL_EVENTS
+        ):
+            if event is None:
+                await websocket.send_json({"type": "keepalive"})
+            else:
+                await websocket.send_json(event.to_dict())
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+async def get_claim_result(claim_id: str):
+    """Latest published result; the claim repository decides whether the claim exists"""
+    result = app.state.results.get(claim_id)
+    if result is None:
+        claim = await app.state.repository.get_claim(claim_id)
+        if claim is None:
+            raise HTTPException(status_code=404, detail="Unknown claim")
+        raise HTTPException(status_code=404, detail="No results for claim")
+    return result
+
+def select_evidence(result, condition: Optional[str], document_id: Optional[str], page: Optional[int]):
+    try:
+        return result.select(condition, document_id, page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def json_resource(body: bytes, gzipped: bytes, accept_encoding: Optional[str]) -> Response:
+    """Serve a pre-encoded JSON resource, compressed when the client accepts gzip"""
+    if accept_encoding and "gzip" in accept_encoding:
+        return Response(gzipped, media_type="application/json", headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    return Response(body, media_type="application/json", headers={"Vary": "Accept-Encoding"})
+
+@app.get("/api/v1/claims/{claim_id}/status")
+async def claim_status(claim_id: str):
+    """Current processing status and published result version"""
+    claim = await app.state.repository.get_claim(claim_id)
+    if claim is None:
+        raise HTTPException(status_code=404, detail="Unknown claim")
+    
+    # The claim row is authoritative; in-memory details (memory report, timings) are extras
+    status = app.state.results.status(claim_id) or {}
+    status.update(
+        claim_id=claim_id,
+        status=claim["status"],
+        version=claim["version"],
+        provisional=bool(claim["provisional"]),
+        error=claim["error"],
+        updated_at=claim["updated_at"]
+    )
+    return status
+
+@app.get("/api/v1/claims/{claim_id}/summary")
+async def claim_summary(claim_id: str, accept_encoding: Optional[str] = Header(None)):
+    """Claim-level results without evidence items"""
+    return json_resource(*(await get_claim_result(claim_id)).resource("summary"), accept_encoding)
+
+@app.get("/api/v1/claims/{claim_id}/annotations")
+async def claim_annotations(claim_id: str, accept_encoding: Optional[str] = Header(None)):
+    resource = (await get_claim_result(claim_id)).resource("annotations")
+    if resource is None:
+        raise HTTPException(status_code=404, detail="Annotations not available yet")
+    return json_resource(*resource, accept_encoding)
+
+@app.get("/api/v1/claims/{claim_id}/exam-request")
+async def claim_exam_request(claim_id: str, accept_encoding: Optional[str] = Header(None)):
+    resource = (await get_claim_result(claim_id)).resource("exam_request")
+    if resource is None:
+        raise HTTPException(status_code=404, detail="Exam request not available yet")
+    return json_resource(*resource, accept_encoding)
+
+@app.get("/api/v1/claims/{claim_id}/evidence")
+async def claim_evidence(
+    claim_id: str,
+    condition: Optional[str] = None,
+    document_id: Optional[str] = None,
+    page: Optional[int] = None,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """One page of evidence, filtered by condition, document or document page"""
+    result = await get_claim_result(claim_id)
+    indices = select_evidence(result, condition, document_id, page)
+    return Response(dumps(result.evidence_page(indices, cursor, limit)), media_type="application/json")
+
+@app.get("/api/v1/claims/{claim_id}/evidence.ndjson")
+async def claim_evidence_stream(
+    claim_id: str,
+    condition: Optional[str] = None,
+    document_id: Optional[str] = None,
+    page: Optional[int] = None,
+    accept_encoding: Optional[str] = Header(None)
+):
+    """All matching evidence as newline-delimited JSON, streamed"""
+    result = await get_claim_result(claim_id)
+    indices = select_evidence(result, condition, document_id, page)
+    compress = bool(accept_encoding and "gzip" in accept_encoding)
+    headers = {"X-Total-Count": str(len(indices)), "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        result.iter_ndjson(indices, compress=compress),
+        media_type="application/x-ndjson",
+        headers=headers
+    )
+
+@app.get("/api/v1/claims/{claim_id}/timeline")
+async def claim_timeline(
+    claim_id: str,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    result = await get_claim_result(claim_id)
+    return Response(dumps(result.timeline_page(cursor, limit)), media_type="application/json")
+
+async def process_claim_async(
+    claim_id, files, doc_processor, ai_engine, claimant_id=None, evidence_store=None, removed_documents=None,
+    progressive=False, degradation=None, queued_at=None, shadow=None
+):
+    """Background task to process claim"""
+    with progress.claim(claim_id), track_claim(claim_id, **app.state.memory_accounting) as memory, span("claim"):
+        try:
+            fidelity = start_work(degradation, queued_at)
+            
+            if progressive:
+                progress.publish("stage", {"stage": "triage"})
+                with memory_stage("triage"):
+                    await publish_triage(claim_id, files, doc_processor, ai_engine)
+            
+            # Process documents
+            progress.publish("stage", {"stage": "documents", "documents": len(files)})
+            documents = []
+            with memory_stage("documents"):
+                for file in files:
+                    started = time.monotonic()
+                    with span("document"):
+                        doc = await doc_processor.process_document(file, fidelity=fidelity)
+                    documents.append(doc)
+                    if degradation:
+                        degradation.record_stage("document", time.monotonic() - started, len(doc["pages"]))
+            
+            if progressive and any(doc.get("needs_ocr") for doc in documents):
+                # OCR'd pages can reveal conditions and service history the text layer lacked
+                analysis = await ai_engine.triage_claim(claim_id, documents)
+                analysis.processing_report["stage"] = "documents"
+                await update_claim_status(claim_id, "provisional", {"analysis": analysis})
+            
+            await analyze_claim_documents(
+                claim_id, documents, doc_processor, ai_engine, claimant_id,
+                evidence_store=evidence_store, removed_documents=removed_documents,
+                fidelity=fidelity, degradation=degradation, memory=memory, progressive=progressive
+            )
+            
+            # Off the critical path: the claim's result is already published
+            if shadow is not None and shadow.select(claim_id, fidelity):
+                await shadow.start(claim_id, files, doc_processor, ai_engine)
+            
+        except MemoryBudgetExceeded as e:
+            logger.warning(str(e))
+            await update_claim_status(claim_id, "rejected", {"error": str(e), "memory": memory.report()})
+        except Exception as e:
+            logger.error(f"Error in background processing: {e}")
+            await update_claim_status(claim_id, "error", {"error": str(e)})
+        finally:
+            QUEUE_DEPTH.labels("running").dec()
+
+def mark_queued() -> float:
+    """Count a claim as waiting for a worker; returns the enqueue time"""
+    QUEUE_DEPTH.labels("queued").inc()
+    return time.monotonic()
+
+def start_work(degradation, queued_at):
+    """Record how long the task waited and pick the fidelity for it"""
+    if queued_at is not None:
+        QUEUE_DEPTH.labels("queued").dec()
+    QUEUE_DEPTH.labels("running").inc()
+    if degradation is None:
+        return None
+    if queued_at is not None:
+        degradation.record_queue_wait(time.monotonic() - queued_at)
+    return degradation.current()
+
+async def publish_triage(claim_id, files, doc_processor, ai_engine):
+    """
+    Publish a provisional result from the text layer alone
+    
+    Documents with nothing to OCR are stored in the artifact store here,
+    so the deep pass only extracts the ones that need OCR.
+    """
+    started = datetime.utcnow()
+    documents = []
+    for file in files:
+        documents.append(await doc_processor.process_document(file, ocr=False))
+        await file.seek(0)  # The deep pass reads the upload again
+    
+    analysis = await ai_engine.triage_claim(claim_id, documents)
+    await update_claim_status(claim_id, "provisional", {"analysis": analysis})
+    logger.info(f"Published triage for claim {claim_id} in {(datetime.utcnow() - started).total_seconds():.2f}s")
+
+async def process_archive_async(
+    claim_id, archive, archive_ingestor, doc_processor, ai_engine, claimant_id=None, evidence_store=None,
+    degradation=None, queued_at=None
+):
+    """Background task to process a claim packet archive"""
+    with progress.claim(claim_id), track_claim(claim_id, **app.state.memory_accounting) as memory, span("claim"):
+        try:
+            fidelity = start_work(degradation, queued_at)
+            
+            # Members are processed as they are extracted
+            progress.publish("stage", {"stage": "documents"})
+            with memory_stage("documents"):
+                documents, ingest_report = await archive_ingestor.process(archive.file, doc_processor, fidelity)
+            
+            await analyze_claim_documents(
+                claim_id, documents, doc_processor, ai_engine, claimant_id, ingest_report,
+                evidence_store=evidence_store, fidelity=fidelity, degradation=degradation, memory=memory
+            )
+            
+        except MemoryBudgetExceeded as e:
+            logger.warning(str(e))
+            await update_claim_status(claim_id, "rejected", {"error": str(e), "memory": memory.report()})
+        except ArchiveLimitExceeded as e:
+            logger.warning(f"Rejected archive for claim {claim_id}: {e}")
+            await update_claim_status(claim_id, "rejected", {"error": str(e)})
+        except Exception as e:
+            logger.error(f"Error in archive processing: {e}")
+            await update_claim_status(claim_id, "error", {"error": str(e)})
+        finally:
+            QUEUE_DEPTH.labels("running").dec()
+
+async def analyze_claim_documents(
+    claim_id, documents, doc_processor, ai_engine, claimant_id=None, ingest_report=None,
+    evidence_store=None, removed_documents=None, fidelity=None, degradation=None, memory=None,
+    progressive=False
+):
+    """
+    Analyze processed documents and store the claim results
+    
+    In progressive mode the evidence extracted so far is published as
+    further provisional versions while extraction runs. Versions are
+    numbered by the claim repository when each one is saved.
+    """
+    async def publish_partial(partial):
+        await update_claim_status(claim_id, "provisional", {"analysis": partial})
+    
+    # Link duplicate copies within the claim and the claimant's history
+    duplicates = await doc_processor.find_duplicates(claim_id, documents, claimant_id)
+    
+    # Analyze evidence
+    started = time.monotonic()
+    with memory_stage("analysis"), span("analysis", claim_id=claim_id, documents=len(documents)):
+        analysis = await ai_engine.analyze_claim_evidence(
+            claim_id, documents, store=evidence_store, removed_documents=removed_documents, fidelity=fidelity,
+            duplicates=duplicates, on_partial=publish_partial if progressive else None
+        )
+    if degradation:
+        degradation.record_stage(
+            "analysis", time.monotonic() - started, sum(len(doc["pages"]) for doc in documents)
+        )
+    analysis.processing_report["stage"] = "complete"
+    if ingest_report:
+        analysis.processing_report["archive"] = ingest_report
+    
+    # Generate annotations
+    with memory_stage("annotation"), span("annotation"):
+        annotations = await ai_engine.generate_annotations(analysis)
+    
+    # Create examination request
+    with span("exam_request"):
+        exam_request = await ai_engine.generate_exam_request(analysis)
+    
+    # Peak memory per stage and the allocation sites behind it
+    if memory is not None:
+        analysis.processing_report["memory"] = memory.report()
+    
+    # Update claim status
+    await update_claim_status(claim_id, "completed", {
+        "analysis": analysis,
+        "annotations": annotations,
+        "exam_request": exam_request
+    })
+    
+    logger.info(f"Successfully processed claim {claim_id}")
+
+def shard_workers() -> Optional[int]:
+    """OCR shard processes: PDF_SHARD_WORKERS when set, with or without the resource governor"""
+    if "PDF_SHARD_WORKERS" in os.environ:
+        return int(os.environ["PDF_SHARD_WORKERS"])
+    return governor.budget.ocr_workers if governor.enabled else None
 
 async def create_claim_record(claim_number: str, priority: str):
     """Create initial claim record in database"""
-    # Implementation would go here
-    import uuid
-    return str(uuid.uuid4())
+    return await app.state.repository.create_claim(claim_number, priority)
 
 async def update_claim_status(claim_id: str, status: str, data: dict):
     """Update claim processing status"""
-    # Implementation would go here
-    pass
+    # Analysis rows are written once per published version; plain status
+    # changes only touch the claim row
+    if "analysis" in data:
+        await app.state.repository.save_analysis(
+            claim_id, status, data["analysis"], data.get("annotations"), data.get("exam_request")
+        )
+    else:
+        await app.state.repository.update_status(claim_id, status, data.get("error"))
+    
+    # Results are indexed for paginated retrieval instead of served as one blob
+    if "analysis" in data:
+        app.state.results.publish(
+            claim_id, status, data["analysis"], data.get("annotations"), data.get("exam_request")
+        )
+    else:
+        app.state.results.set_status(claim_id, status, **data)
+    
+    if status in TERMINAL_EVENTS:
+        CLAIMS_PROCESSED.labels(status).inc()
+    
+    # Terminal statuses end the claim's progress stream
+    event = {"status": status}
+    if "analysis" in data:
+        event["version"] = data["analysis"].version
+        event["provisional"] = data["analysis"].provisional
+    if "error" in data:
+        event["error"] = data["error"]
+    progress.publish(status if status in TERMINAL_EVENTS else "status", event, claim_id)
 
 if __name__ == "__main__":
     uvicorn.run(
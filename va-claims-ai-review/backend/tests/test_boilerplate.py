@@ -0,0 +1,74 @@
+"""
+Corpus-level boilerplate paragraph table
+"""
+
+import pytest
+
+boilerplate = pytest.importorskip("app.services.boilerplate")
+
+NOTICE = "The Privacy Act of 1974 requires that we tell you how this information will be used."
+
+def one_off(n: int) -> str:
+    # Digits are normalised away, so the paragraph is told apart by letters
+    tag = "".join("abcdefghij"[int(d)] for d in str(n))
+    return f"Unique narrative paragraph {tag} describing an unrelated treatment visit"
+
+def observe(table, *paragraphs, conditions=()):
+    session = table.session(conditions)
+    flags = [session.is_boilerplate(p) for p in paragraphs]
+    table.commit(session)
+    return flags
+
+def test_paragraph_becomes_boilerplate_at_threshold():
+    table = boilerplate.BoilerplateFilter(threshold=3)
+    assert [observe(table, NOTICE)[0] for _ in range(4)] == [False, False, False, True]
+
+def test_numbers_and_punctuation_do_not_split_fingerprints():
+    table = boilerplate.BoilerplateFilter()
+    assert table.fingerprint("Page 1 of 12: " + NOTICE) == table.fingerprint("Page 7 of 30 -- " + NOTICE)
+    assert table.fingerprint("too short") is None
+
+def test_evidence_paragraphs_are_kept_however_common():
+    table = boilerplate.BoilerplateFilter(threshold=1)
+    dated = "Veteran was seen for follow up of the lumbar spine on 03/14/2019 at the clinic."
+    named = "Veteran reports ongoing tinnitus since returning from deployment overseas."
+    observe(table, NOTICE, dated, named)
+
+    session = table.session(conditions=["Tinnitus"])
+    assert session.is_boilerplate(NOTICE)
+    assert not session.is_boilerplate(dated)
+    assert not session.is_boilerplate(named)
+    assert session.report()["evidence_kept"] == 2
+
+def test_pruning_cuts_in_one_batch():
+    table = boilerplate.BoilerplateFilter(max_entries=100, prune_to=0.5)
+    for n in range(101):
+        observe(table, one_off(n))
+    assert table.stats()["fingerprints"] == 50
+
+def test_new_recurring_paragraph_survives_pruning():
+    table = boilerplate.BoilerplateFilter(threshold=10, max_entries=200, half_life_claims=50)
+    # An established table of paragraphs seen a few times each, long ago
+    for n in range(200):
+        for _ in range(3):
+            observe(table, one_off(n))
+
+    # A new form notice appears alongside a stream of one-off paragraphs
+    for n in range(10):
+        observe(table, NOTICE, *(one_off(1000 + 30 * n + i) for i in range(30)))
+
+    assert table.count(table.fingerprint(NOTICE)) == 10
+    assert observe(table, NOTICE) == [True]
+
+def test_save_merges_counts_from_other_workers(tmp_path):
+    path = tmp_path / "boilerplate.json"
+    first = boilerplate.BoilerplateFilter(str(path), save_every=1000)
+    second = boilerplate.BoilerplateFilter(str(path), save_every=1000)
+    observe(first, NOTICE)
+    observe(second, NOTICE)
+    first.save()
+    second.save()
+
+    reloaded = boilerplate.BoilerplateFilter(str(path))
+    assert reloaded.count(reloaded.fingerprint(NOTICE)) == 2
+    assert reloaded.stats()["claims_observed"] == 2
@@ -0,0 +1,104 @@
+"""
+MinHash/LSH near-duplicate detection
+"""
+
+import pytest
+
+deduplication = pytest.importorskip("app.services.deduplication")
+
+from app.services.document_text import DocumentText
+
+def words(start: int, count: int, prefix: str = "record") -> str:
+    return " ".join(f"{prefix}{i}" for i in range(start, start + count))
+
+def make_doc(doc_id: str, pages, content_hash=None):
+    doc = {
+        "id": doc_id,
+        "content": DocumentText(list(pages)),
+        "pages": [{"page_number": n} for n in range(1, len(pages) + 1)]
+    }
+    if content_hash:
+        doc["content_hash"] = content_hash
+    return doc
+
+def test_signature_similarity_tracks_shingle_overlap():
+    hasher = deduplication.MinHasher()
+    text = words(0, 300)
+    edited = text.replace("record150", "amended")
+
+    same = hasher.signature(hasher.tokens(text))
+    assert hasher.similarity(same, hasher.signature(hasher.tokens(text))) == 1.0
+    assert hasher.similarity(same, hasher.signature(hasher.tokens(edited))) > 0.9
+    assert hasher.similarity(same, hasher.signature(hasher.tokens(words(1000, 300)))) < 0.1
+
+def test_lsh_index_returns_near_duplicates_only():
+    hasher = deduplication.MinHasher()
+    index = deduplication.LSHIndex()
+    index.insert("original", hasher.signature(hasher.tokens(words(0, 300))))
+
+    near = hasher.signature(hasher.tokens(words(0, 300).replace("record10 ", "")))
+    match = index.query(near, threshold=0.85)
+    assert match is not None and match[0] == "original"
+    assert index.query(hasher.signature(hasher.tokens(words(5000, 300))), threshold=0.85) is None
+
+def test_copies_within_a_claim_are_skipped():
+    detector = deduplication.DuplicateDetector()
+    text = words(0, 400)
+    edited = text.replace("record200", "amended")
+    documents = [
+        make_doc("a", [text], content_hash="h1"),
+        make_doc("b", [text], content_hash="h1"),
+        make_doc("c", [edited])
+    ]
+
+    report = detector.mark_duplicates("claim-1", documents)
+
+    assert documents[1]["duplicate_of"] == {"claim_id": "claim-1", "document_id": "a", "similarity": 1.0}
+    assert documents[2]["duplicate_of"]["document_id"] == "a"
+    assert report["duplicate_documents"] == 2
+    assert report["chars_skipped"] == len(text) + len(edited)
+
+def test_duplicate_pages_link_to_the_first_copy():
+    detector = deduplication.DuplicateDetector()
+    shared = words(0, 200, "exam")
+    documents = [
+        make_doc("a", [words(0, 200, "intake"), shared]),
+        make_doc("b", [shared, words(0, 200, "followup")])
+    ]
+
+    report = detector.mark_duplicates("claim-1", documents)
+
+    assert "duplicate_of" not in documents[1]
+    assert documents[1]["pages"][0]["duplicate_of"]["document_id"] == "a"
+    assert documents[1]["pages"][0]["duplicate_of"]["page_number"] == 2
+    assert "duplicate_of" not in documents[1]["pages"][1]
+    assert report["duplicate_pages"] == 1
+
+def test_earlier_claim_copies_are_linked_but_analyzed():
+    detector = deduplication.DuplicateDetector()
+    text = words(0, 400)
+    detector.mark_duplicates("claim-1", [make_doc("a", [text])], claimant_id="veteran-1")
+
+    copy = make_doc("b", [text])
+    report = detector.mark_duplicates("claim-2", [copy], claimant_id="veteran-1")
+    assert copy["duplicate_of"]["claim_id"] == "claim-1"
+    assert not deduplication.within_claim(copy["duplicate_of"], "claim-2")
+    assert report["earlier_claim_copies"] >= 1
+    assert report["duplicate_documents"] == 0
+    assert report["chars_skipped"] == 0
+
+    # Another veteran's claim, or one without a claimant, never sees that history
+    for claimant in ("veteran-2", None):
+        other = make_doc("c", [text])
+        detector.mark_duplicates("claim-3", [other], claimant_id=claimant)
+        assert "duplicate_of" not in other
+
+def test_claimant_history_is_bounded():
+    detector = deduplication.DuplicateDetector(max_claimants=2)
+    text = words(0, 400)
+    for claimant in ("veteran-1", "veteran-2", "veteran-3"):
+        detector.mark_duplicates(f"claim-{claimant}", [make_doc("a", [text])], claimant_id=claimant)
+
+    copy = make_doc("b", [text])
+    detector.mark_duplicates("claim-4", [copy], claimant_id="veteran-1")
+    assert "duplicate_of" not in copy
@@ -0,0 +1,118 @@
+"""
+Streaming DOCX reader parity with python-docx
+"""
+
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+
+docx = pytest.importorskip("docx")
+
+from app.services.docx_stream import DocxStreamReader
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Saved with Word's markup: a lastRenderedPageBreak follows every explicit
+# page break, long paragraphs carry one where the layout wrapped, and runs
+# are split by proofing marks and bookmarks
+WORD_DOCX = Path(__file__).parent / "fixtures" / "word_page_breaks.docx"
+
+def python_docx_pages(paragraphs, page_size=3000):
+    """Pages as the python-docx pipeline built them: ~3000 characters of whole paragraphs"""
+    pages, lines, length = [], [], 0
+    for text in paragraphs:
+        if lines and length + len(text) > page_size:
+            pages.append("\n".join(lines))
+            lines, length = [], 0
+        lines.append(text)
+        length += len(text) + 1
+    if lines or not pages:
+        pages.append("\n".join(lines))
+    return pages
+
+def python_docx_break_pages(document):
+    """Paragraph text split at explicit page breaks, read through python-docx"""
+    pages, lines = [], []
+    for paragraph in document.paragraphs:
+        breaks = paragraph._p.findall(f".//{W_NS}br[@{W_NS}type='page']")
+        if breaks and not paragraph.text.strip():
+            pages.append("\n".join(lines))
+            lines = []
+        lines.append(paragraph.text)
+        if breaks and paragraph.text.strip():
+            pages.append("\n".join(lines))
+            lines = []
+    if lines or not pages:
+        pages.append("\n".join(lines))
+    return pages
+
+def python_docx_tables(document):
+    return [
+        {"table_number": number, "data": [[cell.text for cell in row.cells] for row in table.rows]}
+        for number, table in enumerate(document.tables, 1)
+    ]
+
+def stream_blocks(content: bytes):
+    with DocxStreamReader(io.BytesIO(content)) as reader:
+        return list(reader.iter_blocks())
+
+def test_paragraphs_and_tables_match_python_docx():
+    content = WORD_DOCX.read_bytes()
+    document = docx.Document(io.BytesIO(content))
+    blocks = stream_blocks(content)
+
+    assert [b.text for b in blocks if b.kind == "paragraph"] == [p.text for p in document.paragraphs]
+
+    tables = {}
+    for block in blocks:
+        if block.kind == "row":
+            tables.setdefault(block.table_number, []).append(block.cells)
+    assert [{"table_number": n, "data": rows} for n, rows in tables.items()] == python_docx_tables(document)
+
+def test_one_page_break_per_explicit_break():
+    blocks = stream_blocks(WORD_DOCX.read_bytes())
+    kinds = [b.kind for b in blocks if b.kind != "row"]
+
+    # Two Ctrl+Enter breaks; the rendered breaks after them and the one
+    # inside the wrapped paragraph add none
+    assert kinds.count("page_break") == 2
+    assert ("page_break", "page_break") not in zip(kinds, kinds[1:])
+
+def make_docx(paragraphs, page_breaks_after=()):
+    document = docx.Document()
+    for index, text in enumerate(paragraphs):
+        paragraph = document.add_paragraph(text)
+        if index in page_breaks_after:
+            paragraph.add_run().add_break(docx.enum.text.WD_BREAK.PAGE)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+@pytest.fixture(scope="module")
+def processor():
+    document_processor = pytest.importorskip("app.services.document_processor")
+    return document_processor.DocumentProcessor(shard_workers=0)
+
+def process_docx(processor, content: bytes):
+    return asyncio.run(processor._process_docx(content, "doc-1"))
+
+def test_pages_follow_explicit_breaks(processor):
+    content = WORD_DOCX.read_bytes()
+    document = docx.Document(io.BytesIO(content))
+    result = process_docx(processor, content)
+
+    expected = python_docx_break_pages(document)
+    assert [result["content"].page(n) for n in range(1, len(expected) + 1)] == expected
+    assert [p["page_number"] for p in result["pages"]] == list(range(1, len(expected) + 1))
+    assert result["tables"] == python_docx_tables(document)
+
+def test_pages_without_breaks_match_python_docx_pipeline(processor):
+    paragraphs = [f"Paragraph {i}: " + "service treatment record entry " * (i % 7 + 1) for i in range(400)]
+    result = process_docx(processor, make_docx(paragraphs))
+
+    expected = python_docx_pages(paragraphs)
+    assert result["content"].page_count == len(expected)
+    assert [page for _, page in result["content"].iter_pages()] == expected
+    assert result["tables"] == []
@@ -0,0 +1,112 @@
+"""
+LLM gateway coalescing, caching and retries
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+anthropic = pytest.importorskip("anthropic")
+httpx = pytest.importorskip("httpx")
+llm_gateway = pytest.importorskip("app.services.llm_gateway")
+
+def api_error(error_class, status: int, retry_after: str = None):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(status, request=request, headers=headers)
+    return error_class(f"HTTP {status}", response=response, body=None)
+
+class FakeMessages:
+    """Messages API stand-in: raises the queued errors first, then answers after `delay`"""
+
+    def __init__(self, errors=(), delay: float = 0.05):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **request):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(
+            model=request["model"],
+            content=[SimpleNamespace(type="text", text=f"answer to {request['messages'][0]['content']}")],
+            usage=SimpleNamespace(input_tokens=10, output_tokens=5, cache_read_input_tokens=0)
+        )
+
+def make_gateway(messages: FakeMessages, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return llm_gateway.LLMGateway(client=SimpleNamespace(messages=messages), **kwargs)
+
+def test_identical_requests_share_one_call_and_then_the_cache():
+    messages = FakeMessages()
+    gateway = make_gateway(messages)
+
+    async def scenario():
+        first, second = await asyncio.gather(
+            gateway.complete("prompt", claim_id="claim-1"),
+            gateway.complete("prompt", claim_id="claim-1")
+        )
+        third = await gateway.complete("prompt", claim_id="claim-1")
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert messages.calls == 1
+    assert first.text == second.text == third.text == "answer to prompt"
+    assert (first.coalesced, second.coalesced) == (False, True)
+    assert third.cached
+    assert gateway.stats()["inflight"] == 0
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    messages = FakeMessages(delay=0.1)
+    gateway = make_gateway(messages)
+
+    async def scenario():
+        leader = asyncio.create_task(gateway.complete("prompt"))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(gateway.complete("prompt"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    response = asyncio.run(scenario())
+    assert response.text == "answer to prompt" and response.coalesced
+    assert messages.calls == 1
+
+def test_rate_limits_and_overload_are_retried():
+    messages = FakeMessages(errors=[
+        api_error(anthropic.RateLimitError, 429, retry_after="0"),
+        api_error(anthropic.InternalServerError, 529)
+    ])
+    gateway = make_gateway(messages)
+
+    response = asyncio.run(gateway.complete("prompt"))
+    assert response.text == "answer to prompt"
+    assert messages.calls == 3
+    assert gateway.stats()["retries"] == 2 and gateway.stats()["errors"] == 0
+
+def test_client_errors_fail_without_retry_and_are_not_cached():
+    messages = FakeMessages(errors=[api_error(anthropic.BadRequestError, 400)])
+    gateway = make_gateway(messages)
+
+    with pytest.raises(anthropic.BadRequestError):
+        asyncio.run(gateway.complete("prompt"))
+    assert messages.calls == 1
+    assert gateway.stats()["errors"] == 1 and gateway.stats()["cache_entries"] == 0
+
+    # The failure was not cached: the next request calls the API again
+    assert asyncio.run(gateway.complete("prompt")).text == "answer to prompt"
+    assert messages.calls == 2
+
+def test_retries_give_up_after_max_retries():
+    messages = FakeMessages(errors=[api_error(anthropic.RateLimitError, 429, retry_after="0")] * 3)
+    gateway = make_gateway(messages, max_retries=2)
+
+    with pytest.raises(anthropic.RateLimitError):
+        asyncio.run(gateway.complete("prompt"))
+    assert messages.calls == 3
+    assert gateway.stats()["retries"] == 2 and gateway.stats()["errors"] == 1
@@ -0,0 +1,114 @@
+"""
+Claim result pagination and NDJSON streaming
+"""
+
+import gzip
+import json
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.result_store import ClaimResult, ResultStore
+
+def evidence(n: int, condition: str, document_id: str, page_number: int):
+    return SimpleNamespace(
+        document_id=document_id,
+        page_number=page_number,
+        condition=condition,
+        type="medical_record",
+        relevance="direct",
+        confidence=0.9,
+        date=None,
+        provider=None,
+        diagnosis_codes=[],
+        highlights=[],
+        text=f"Evidence {n}"
+    )
+
+def make_analysis(version: int = 1, items: int = 250):
+    conditions = {}
+    for n in range(items):
+        name = ("tinnitus", "lumbar strain")[n % 2]
+        conditions.setdefault(name, []).append(evidence(n, name, f"doc-{n % 3}", n % 5 + 1))
+    return SimpleNamespace(
+        claim_id="claim-1",
+        version=version,
+        provisional=False,
+        conditions=[SimpleNamespace(name=name, evidence_items=items) for name, items in conditions.items()],
+        timeline=[{"date": f"2020-01-{day:02d}"} for day in range(1, 31)]
+    )
+
+def make_result(**kwargs) -> ClaimResult:
+    return ClaimResult("claim-1", "completed", make_analysis(**kwargs), None, None)
+
+def test_cursor_pages_cover_every_item_once():
+    result = make_result()
+    indices = result.select()
+
+    seen, cursor = [], 0
+    while cursor is not None:
+        page = result.evidence_page(indices, cursor, limit=100)
+        assert page["total"] == 250
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+    assert seen == list(range(250))
+
+    timeline = result.timeline_page(cursor=20, limit=20)
+    assert len(timeline["items"]) == 10 and timeline["next_cursor"] is None
+
+def test_filters_select_from_the_indexes():
+    result = make_result()
+
+    by_condition = result.select(condition="tinnitus")
+    assert len(by_condition) == 125
+    assert all(result.evidence[i].condition == "tinnitus" for i in by_condition)
+
+    on_page = result.select(condition="tinnitus", document_id="doc-1", page=2)
+    assert on_page and all(
+        (result.evidence[i].document_id, result.evidence[i].page_number, result.evidence[i].condition)
+        == ("doc-1", 2, "tinnitus")
+        for i in on_page
+    )
+    with pytest.raises(ValueError):
+        result.select(page=2)
+
+def test_ndjson_rows_match_the_paginated_items():
+    result = make_result()
+    indices = result.select(document_id="doc-0")
+
+    rows = [json.loads(line) for line in b"".join(result.iter_ndjson(indices, batch_size=7)).splitlines()]
+    assert rows == result.evidence_page(indices, 0, limit=len(indices))["items"]
+
+def test_gzip_ndjson_decodes_batch_by_batch():
+    result = make_result()
+    indices = result.select()
+    plain = b"".join(result.iter_ndjson(indices, batch_size=50))
+    chunks = list(result.iter_ndjson(indices, compress=True, batch_size=50))
+
+    assert gzip.decompress(b"".join(chunks)) == plain
+
+    # Every flushed batch ends on a complete row
+    decoder = zlib.decompressobj(31)
+    decoded = decoder.decompress(chunks[0])
+    assert decoded.endswith(b"\n") and len(decoded.splitlines()) == 50
+
+def test_older_versions_do_not_replace_newer_results():
+    store = ResultStore()
+    store.publish("claim-1", "completed", make_analysis(version=2))
+    store.publish("claim-1", "completed", make_analysis(version=1))
+
+    assert store.get("claim-1").analysis.version == 2
+    assert store.status("claim-1")["version"] == 2
+
+def test_statuses_outlive_results_and_both_are_bounded():
+    store = ResultStore(max_claims=2, max_statuses=3)
+    for n in range(3):
+        store.publish(f"claim-{n}", "completed", make_analysis(items=1))
+    assert store.get("claim-0") is None
+    assert store.status("claim-1")["status"] == "completed"
+
+    store.set_status("claim-queued", "queued")
+    store.set_status("claim-other", "queued")
+    assert store.status("claim-1") is None and store.get("claim-1") is None
+    assert store.status("claim-queued")["status"] == "queued"